@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""
+WebSocket frame-analysis API for programmatic clients (e.g. the mobile app)
+
+    python api_server.py --port 8760
+
+Connect to ``ws://host:port/ws`` and send frames as binary messages:
+JPEG bytes, or raw BGR pixels after announcing their size. Each frame
+gets a JSON reply with its ``exercise_data``, followed by the annotated
+frame as JPEG unless the connection asked for JSON-only responses.
+Control messages are JSON text:
+
+    {"type": "config", "exercise_type": "squat", "response": "json",
+     "frame_format": "raw", "width": 640, "height": 480}
+    {"type": "reset"}
+
+Clients that estimate poses on the device can send landmarks instead
+of pixels after ``{"type": "config", "frame_format": "landmarks",
+"dtype": "float16"}``. Each binary message is then a batch of N frames:
+N little-endian float64 timestamps (seconds) followed by N x 33 x 4
+landmark values (x, y, z, visibility; NaN for "nobody seen"). With
+``"dtype": "codec"`` a message is instead one or more blocks from
+``landmark_codec``, several times smaller. The reply covers the whole
+batch and skips the model entirely.
+
+Every connection has its own rep counter. ``GET /health`` and
+``GET /stats`` answer plain HTTP.
+"""
+
+import argparse
+import asyncio
+import http
+import json
+import multiprocessing as mp
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+import cv2
+import numpy as np
+import websockets
+from mediapipe.framework.formats import landmark_pb2
+from websockets.asyncio.server import serve
+from websockets.datastructures import Headers
+from websockets.http11 import Response
+
+from camera import StageTimings
+from config import API_CONFIG
+from exercise_recognizer import AUTO_EXERCISE
+from frame_transport import static_pose_model
+from landmark_codec import decode_landmarks
+from pose_detector import LANDMARK_COUNT, LANDMARK_FIELDS, PoseDetector
+
+RESPONSE_MODES = ("annotated", "json")
+FRAME_FORMATS = ("jpeg", "raw", "landmarks")
+LANDMARK_DTYPES = ("float16", "float32", "codec")
+LANDMARK_VALUES = LANDMARK_COUNT * len(LANDMARK_FIELDS)
+
+# Inference process state: one model per pool process
+_model = None
+
+def _init_inference_process(model_factory: Callable):
+    global _model
+    # The pool already uses every core; keep OpenCV from adding threads per process
+    cv2.setNumThreads(1)
+    _model = model_factory()
+
+def _infer(frame: np.ndarray) -> bytes:
+    results = _model.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    landmarks = results.pose_landmarks
+    return landmarks.SerializeToString() if landmarks is not None else b""
+
+class FrameAPIServer:
+    def __init__(self, host: str = API_CONFIG["host"], port: int = API_CONFIG["port"],
+                 decode_threads: int = API_CONFIG["decode_threads"],
+                 inference_processes: int = API_CONFIG["inference_processes"],
+                 pipeline_depth: int = API_CONFIG["pipeline_depth"],
+                 model_factory: Callable = static_pose_model):
+        """asyncio WebSocket server that runs PoseDetector analysis per connection
+
+        Frames are decoded (and replies annotated and encoded) on a thread
+        pool while pose inference runs on a process pool. Each connection
+        keeps at most ``pipeline_depth`` frames in progress. Once they are
+        all taken, the server stops reading that socket, so a fast client
+        is slowed to the rate it is served. Across connections, at most
+        two frames per inference process wait for the pool.
+        """
+        self.host = host
+        self.port = port
+        self.inference_processes = inference_processes or os.cpu_count() or 1
+        self.pipeline_depth = max(1, pipeline_depth)
+        self.model_factory = model_factory
+        self.decode_threads = decode_threads or os.cpu_count() or 1
+        self.timings = StageTimings()
+        self.connections = 0
+        self.frames = 0
+        self.errors = 0
+        self._decode_pool = None
+        self._inference_pool = None
+        self._inference_slots = None
+        self._server = None
+        self._started_at = None
+
+    async def start(self) -> "FrameAPIServer":
+        self._decode_pool = ThreadPoolExecutor(self.decode_threads, thread_name_prefix="frame-decode")
+        # Spawned, not forked: the server process already runs threads and an event loop
+        self._inference_pool = ProcessPoolExecutor(
+            self.inference_processes, mp_context=mp.get_context("spawn"),
+            initializer=_init_inference_process, initargs=(self.model_factory,)
+        )
+        self._inference_slots = asyncio.Semaphore(2 * self.inference_processes)
+        self._server = await serve(
+            self._handle_connection, self.host, self.port,
+            process_request=self._process_http, max_size=API_CONFIG["max_frame_bytes"]
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._started_at = time.monotonic()
+        return self
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._inference_pool is not None:
+            self._inference_pool.shutdown(wait=True, cancel_futures=True)
+        if self._decode_pool is not None:
+            self._decode_pool.shutdown(wait=True)
+
+    async def serve_forever(self):
+        await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+    def stats(self) -> Dict:
+        elapsed = time.monotonic() - self._started_at if self._started_at else 0.0
+        return {
+            "connections": self.connections,
+            "frames": self.frames,
+            "errors": self.errors,
+            "fps": round(self.frames / elapsed, 1) if elapsed > 0 else 0.0,
+            "inference_processes": self.inference_processes,
+            "timings": self.timings.summary()
+        }
+
+    def _process_http(self, connection, request):
+        """Plain HTTP endpoints; anything else continues as a WebSocket handshake"""
+        path = request.path.split("?")[0]
+        if path == "/ws":
+            return None
+        if path == "/health":
+            body = {"status": "ok", "connections": self.connections}
+        elif path == "/stats":
+            body = self.stats()
+        else:
+            return connection.respond(http.HTTPStatus.NOT_FOUND, "Not found\n")
+        headers = Headers([("Content-Type", "application/json")])
+        return Response(http.HTTPStatus.OK, "OK", headers, json.dumps(body).encode())
+
+    async def _handle_connection(self, websocket):
+        self.connections += 1
+        session = {
+            "detector": PoseDetector(load_model=False),
+            "exercise_type": "pushup",
+            "response": "annotated",
+            "frame_format": "jpeg",
+            "dtype": "float32",
+            "shape": None
+        }
+        pending = asyncio.Queue(maxsize=self.pipeline_depth)
+        sender = asyncio.create_task(self._process_frames(websocket, session, pending))
+        reader = asyncio.current_task()
+        reading = True
+
+        def sender_done(task):
+            # A dead sender would leave this loop filling a queue nobody reads
+            # and the client waiting for replies: stop reading and fail the
+            # connection, which websockets closes with 1011
+            if reading and not task.cancelled() and task.exception() is not None:
+                reader.cancel()
+
+        sender.add_done_callback(sender_done)
+        loop = asyncio.get_running_loop()
+        frame_id = 0
+        try:
+            async for message in websocket:
+                if isinstance(message, str):
+                    error = self._apply_control(session, message)
+                    if error:
+                        await websocket.send(json.dumps({"type": "error", "error": error}))
+                    continue
+                frame_id += 1
+                received = time.monotonic()
+                if session["frame_format"] == "landmarks":
+                    # Parsed with the rep logic on a decode thread; no image decode or model
+                    work = (message, session["dtype"])
+                else:
+                    work = loop.run_in_executor(
+                        self._decode_pool, self._decode, message, session["frame_format"], session["shape"]
+                    )
+                # Waits while the connection already has pipeline_depth frames in progress,
+                # which stops reads from this socket until the client is caught up. Landmark
+                # batches queue behind pending frames so rep state is updated in order.
+                await pending.put((frame_id, received, work, session["exercise_type"], session["response"]))
+        except websockets.ConnectionClosed:
+            pass
+        except asyncio.CancelledError:
+            if not sender.done():
+                raise   # Server shutting down
+        finally:
+            reading = False
+            try:
+                if not sender.done():
+                    await pending.put(None)
+                await sender
+            finally:
+                self.connections -= 1
+
+    def _apply_control(self, session: Dict, message: str) -> Optional[str]:
+        try:
+            control = json.loads(message)
+        except ValueError:
+            return "Control messages must be JSON"
+        if control.get("type") == "reset":
+            session["detector"].reset_counter()
+            return None
+        if control.get("type") != "config":
+            return f"Unknown message type: {control.get('type')!r}"
+        exercise_type = control.get("exercise_type", session["exercise_type"])
+        if exercise_type != AUTO_EXERCISE and exercise_type not in session["detector"].angle_thresholds:
+            # Per-exercise state (e.g. compiled form rules) is cached by name
+            return f"Unknown exercise: {exercise_type!r}"
+        if control.get("response", session["response"]) not in RESPONSE_MODES:
+            return f"response must be one of {RESPONSE_MODES}"
+        if control.get("frame_format", session["frame_format"]) not in FRAME_FORMATS:
+            return f"frame_format must be one of {FRAME_FORMATS}"
+        if control.get("dtype", session["dtype"]) not in LANDMARK_DTYPES:
+            return f"dtype must be one of {LANDMARK_DTYPES}"
+        frame_format = control.get("frame_format", session["frame_format"])
+        shape = session["shape"]
+        if frame_format == "raw":
+            try:
+                shape = (int(control["height"]), int(control["width"]), 3)
+            except (KeyError, TypeError, ValueError):
+                if shape is None:
+                    return "Raw frames need integer width and height"
+        session.update(
+            exercise_type=exercise_type,
+            response=control.get("response", session["response"]),
+            frame_format=frame_format,
+            dtype=control.get("dtype", session["dtype"]),
+            shape=shape
+        )
+        return None
+
+    @staticmethod
+    def _decode(data: bytes, frame_format: str, shape) -> np.ndarray:
+        if frame_format == "raw":
+            frame = np.frombuffer(data, dtype=np.uint8)
+            if frame.size != shape[0] * shape[1] * 3:
+                raise ValueError(f"Raw frame has {frame.size} bytes, expected {shape[1]}x{shape[0]}x3")
+            return frame.reshape(shape)
+        frame = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if frame is None:
+            raise ValueError("Could not decode JPEG frame")
+        return frame
+
+    @staticmethod
+    def _parse_landmarks(data: bytes, dtype: str):
+        """Split a landmark batch message into (timestamps, landmarks)"""
+        if dtype == "codec":
+            landmarks, timestamps = decode_landmarks(data)
+            if not len(landmarks):
+                raise ValueError("Empty landmark batch")
+            return timestamps, landmarks
+        values = np.dtype(dtype).newbyteorder("<")
+        frame_bytes = 8 + LANDMARK_VALUES * values.itemsize
+        if not data or len(data) % frame_bytes:
+            raise ValueError(f"Landmark batch must be N x {frame_bytes} bytes for {dtype}, got {len(data)}")
+        count = len(data) // frame_bytes
+        timestamps = np.frombuffer(data, dtype="<f8", count=count)
+        landmarks = np.frombuffer(data, dtype=values, offset=8 * count)
+        return timestamps, landmarks.reshape(count, LANDMARK_COUNT, len(LANDMARK_FIELDS))
+
+    @staticmethod
+    def _analyze(detector: PoseDetector, frame: np.ndarray, landmark_bytes: bytes,
+                 exercise_type: str, response: str):
+        landmarks = None
+        if landmark_bytes:
+            landmarks = landmark_pb2.NormalizedLandmarkList()
+            landmarks.ParseFromString(landmark_bytes)
+        annotated, exercise_data = detector.analyze_landmarks(frame, landmarks, exercise_type)
+        image = None
+        if response == "annotated":
+            ok, encoded = cv2.imencode(".jpg", annotated, [cv2.IMWRITE_JPEG_QUALITY, API_CONFIG["jpeg_quality"]])
+            image = encoded.tobytes() if ok else None
+        return exercise_data, image
+
+    async def _process_frames(self, websocket, session: Dict, pending: asyncio.Queue):
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await pending.get()
+            if item is None:
+                return
+            frame_id, received, work, exercise_type, response = item
+            if isinstance(work, tuple):
+                # A batch of up to max_frame_bytes takes milliseconds to parse and count
+                # (and the first yoga frame builds the pose index): keep it off the event loop
+                try:
+                    count, new_reps, exercise_data = await loop.run_in_executor(
+                        self._decode_pool, self._ingest, session["detector"], work, exercise_type
+                    )
+                except Exception as e:
+                    self.errors += 1
+                    reply = {"type": "error", "frame": frame_id, "error": self._error_message(e)}
+                else:
+                    self.frames += count
+                    latency = time.monotonic() - received
+                    self.timings.record("landmark_batch", latency)
+                    reply = {"type": "result", "frame": frame_id, "frames": count, "new_reps": new_reps,
+                             "exercise_data": exercise_data, "latency_ms": round(latency * 1000, 3)}
+                await self._send(websocket, reply)
+                continue
+            decoded = work
+            try:
+                start = time.monotonic()
+                frame = await decoded
+                self.timings.record("decode_wait", time.monotonic() - start)
+                start = time.monotonic()
+                async with self._inference_slots:
+                    landmark_bytes = await loop.run_in_executor(self._inference_pool, _infer, frame)
+                self.timings.record("inference", time.monotonic() - start)
+                # Frames of a connection are analyzed one at a time, in order, so its rep state stays consistent
+                exercise_data, image = await loop.run_in_executor(
+                    self._decode_pool, self._analyze, session["detector"], frame,
+                    landmark_bytes, exercise_type, response
+                )
+            except Exception as e:
+                # Bad input, a cv2 error or a broken inference pool fails this
+                # frame only; the client still gets a reply for it
+                self.errors += 1
+                reply = {"type": "error", "frame": frame_id, "error": self._error_message(e)}
+                image = None
+            else:
+                self.frames += 1
+                latency = time.monotonic() - received
+                self.timings.record("latency", latency)
+                reply = {"type": "result", "frame": frame_id, "exercise_data": exercise_data,
+                         "latency_ms": round(latency * 1000, 2)}
+            await self._send(websocket, reply, image)
+
+    @classmethod
+    def _ingest(cls, detector: PoseDetector, work, exercise_type: str):
+        """Rep state for a landmark batch: (frames ingested, new reps, last frame's exercise data)"""
+        data, dtype = work
+        timestamps, landmarks = cls._parse_landmarks(data, dtype)
+        reps_before = detector.rep_count
+        results = detector.ingest_landmarks(landmarks, exercise_type, timestamps)
+        return len(results), detector.rep_count - reps_before, results[-1]
+
+    @staticmethod
+    def _error_message(error: Exception) -> str:
+        """Input errors carry their own message; anything else is named too"""
+        if isinstance(error, ValueError):
+            return str(error)
+        return f"{type(error).__name__}: {error}"
+
+    @staticmethod
+    async def _send(websocket, reply: Dict, image: bytes = None):
+        try:
+            await websocket.send(json.dumps(reply, default=float))
+            if image is not None:
+                await websocket.send(image)
+        except websockets.ConnectionClosed:
+            pass    # Keep draining so the reader's final put() is not left waiting
+
+async def _run(args):
+    server = FrameAPIServer(args.host, args.port, args.decode_threads, args.inference_processes, args.pipeline_depth)
+    await server.start()
+    print(f"📡 Frame API on ws://{server.host}:{server.port}/ws with "
+          f"{server.inference_processes} inference processes (Ctrl+C to stop)")
+    try:
+        await asyncio.Future()
+    finally:
+        await server.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="WebSocket frame-analysis API")
+    parser.add_argument("--host", default=API_CONFIG["host"])
+    parser.add_argument("--port", type=int, default=API_CONFIG["port"])
+    parser.add_argument("--decode-threads", type=int, default=API_CONFIG["decode_threads"],
+                        help="Threads for JPEG decode/encode (0: one per CPU core)")
+    parser.add_argument("--inference-processes", type=int, default=API_CONFIG["inference_processes"],
+                        help="Pose model processes (0: one per CPU core)")
+    parser.add_argument("--pipeline-depth", type=int, default=API_CONFIG["pipeline_depth"],
+                        help="Frames in progress per connection before reads pause")
+    args = parser.parse_args()
+    try:
+        asyncio.run(_run(args))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
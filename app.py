@@ -8,8 +8,23 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import pandas as pd
 
-from pose_detector import PoseDetector
-from workout_logger import WorkoutLogger
+from inference_service import make_pose_detector
+from workout_logger import get_workout_logger
+from dashboard_data import DashboardData
+from log_exporter import export_formats
+from camera import CameraManager
+from config import METRICS_CONFIG, STORAGE_CONFIG
+from exercise_recognizer import AUTO_EXERCISE
+from latency import PROCESS_LATENCY, start_metrics_server
+from profiler import profile_frame
+
+HISTORY_SORTS = {
+    "Newest first": ("timestamp", True),
+    "Oldest first": ("timestamp", False),
+    "Most reps": ("reps", True),
+    "Best form": ("form_score", True),
+    "Longest": ("duration_minutes", True)
+}
 
 # Page configuration
 st.set_page_config(
@@ -21,18 +36,35 @@ st.set_page_config(
 
 # Initialize session state
 if 'pose_detector' not in st.session_state:
-    st.session_state.pose_detector = PoseDetector()
-if 'workout_logger' not in st.session_state:
-    st.session_state.workout_logger = WorkoutLogger()
+    st.session_state.pose_detector = make_pose_detector()
+if 'user_id' not in st.session_state:
+    st.session_state.user_id = STORAGE_CONFIG["default_user"]
 if 'workout_start_time' not in st.session_state:
     st.session_state.workout_start_time = None
 if 'is_workout_active' not in st.session_state:
     st.session_state.is_workout_active = False
 if 'current_exercise' not in st.session_state:
     st.session_state.current_exercise = "pushup"
+if METRICS_CONFIG["serve"]:
+    start_metrics_server()
+
+@st.cache_resource
+def get_camera_manager():
+    """One camera manager per server process; devices open on first use and are shared"""
+    return CameraManager()
 
-# Initialize camera
-cap = cv2.VideoCapture(0)
+def show_latency(detector):
+    """Sidebar debug panel with per-stage frame latency for this session and the whole process"""
+    with st.sidebar.expander("🐞 Stage latency"):
+        for title, summary in (("This session", detector.latency.summary()),
+                               ("All sessions", PROCESS_LATENCY.summary())):
+            st.caption(title)
+            if summary:
+                st.dataframe(pd.DataFrame.from_dict(summary, orient="index"), use_container_width=True)
+            else:
+                st.write("No frames processed yet")
+        if METRICS_CONFIG["serve"]:
+            st.caption(f"Prometheus: http://{METRICS_CONFIG['host']}:{METRICS_CONFIG['port']}/metrics")
 
 def main():
     # Header
@@ -41,10 +73,20 @@ def main():
     
     # Sidebar
     with st.sidebar:
+        st.header("👤 Profile")
+        user_id = st.text_input("User", value=st.session_state.user_id).strip()
+        st.session_state.user_id = user_id or STORAGE_CONFIG["default_user"]
+        # Per-user logger from the shared handle cache; only this user's data is read
+        st.session_state.workout_logger = get_workout_logger(st.session_state.user_id)
+        if st.session_state.get('dashboard') is None or \
+                st.session_state.dashboard.logger is not st.session_state.workout_logger:
+            st.session_state.dashboard = DashboardData(st.session_state.workout_logger)
+        
+        st.markdown("---")
         st.header("🏋️ Exercise Settings")
         # Expanded exercise and yoga list
         EXERCISE_LIST = [
-            "pushup", "squat", "plank", "lunge", "burpee", "mountain climber",
+            AUTO_EXERCISE, "pushup", "squat", "plank", "lunge", "burpee", "mountain climber",
             "jumping jack", "crunch", "bicep curl", "tricep dip", "shoulder press",
             # Yoga poses
             "downward dog", "warrior I", "warrior II", "tree pose", "cobra pose",
@@ -55,7 +97,8 @@ def main():
         exercise_type = st.selectbox(
             "Choose Exercise or Yoga Pose:",
             EXERCISE_LIST,
-            index=EXERCISE_LIST.index(st.session_state.current_exercise)
+            index=EXERCISE_LIST.index(st.session_state.current_exercise),
+            format_func=lambda name: "auto-detect" if name == AUTO_EXERCISE else name
         )
         if exercise_type != st.session_state.current_exercise:
             st.session_state.current_exercise = exercise_type
@@ -68,6 +111,10 @@ def main():
         stats = st.session_state.pose_detector.get_exercise_stats()
         st.metric("Current Reps", stats["reps"])
         st.metric("Exercise State", stats["state"].upper())
+        if stats["last_rep"]:
+            last_rep = stats["last_rep"]
+            st.caption(f"Last rep: {last_rep['eccentric']:.1f}s down, {last_rep['concentric']:.1f}s up, "
+                       f"{last_rep['range_of_motion']:.0f}° range")
         
         # Workout controls
         st.markdown("---")
@@ -98,18 +145,38 @@ def main():
     with col1:
         st.header("🎥 Live Pose Detection")
         
-        # Camera input
-        camera_input = st.camera_input("Take a photo for pose detection")
+        # Camera input: browser snapshot, or a camera attached to this machine
+        cv2_img = None
+        use_local_camera = st.checkbox(
+            "Use local camera", help="Capture from a camera connected to the machine running the app"
+        )
         
-        if camera_input is not None:
-            # Convert to OpenCV format
-            bytes_data = camera_input.getvalue()
-            cv2_img = cv2.imdecode(np.frombuffer(bytes_data, np.uint8), cv2.IMREAD_COLOR)
+        if use_local_camera:
+            if st.button("📸 Capture Frame"):
+                try:
+                    ret, frame = get_camera_manager().read()
+                except RuntimeError as e:
+                    st.error(f"❌ {e}")
+                else:
+                    if ret:
+                        cv2_img = frame
+                    else:
+                        st.error("❌ Could not read frame from camera")
+        else:
+            camera_input = st.camera_input("Take a photo for pose detection")
             
-            # Process frame
-            processed_frame, exercise_data = st.session_state.pose_detector.process_frame(
-                cv2_img, st.session_state.current_exercise
-            )
+            if camera_input is not None:
+                # Convert to OpenCV format
+                bytes_data = camera_input.getvalue()
+                with st.session_state.pose_detector.latency.time("decode"):
+                    cv2_img = cv2.imdecode(np.frombuffer(bytes_data, np.uint8), cv2.IMREAD_COLOR)
+        
+        if cv2_img is not None:
+            # Process frame (profiled when FITNESS_COACH_PROFILE is set, see profiler.py)
+            with profile_frame():
+                processed_frame, exercise_data = st.session_state.pose_detector.process_frame(
+                    cv2_img, st.session_state.current_exercise
+                )
             
             # Convert back to display format
             processed_frame_rgb = cv2.cvtColor(processed_frame, cv2.COLOR_BGR2RGB)
@@ -125,6 +192,8 @@ def main():
                 st.metric("State", exercise_data["state"].upper())
             with col_c:
                 st.metric("Angle", f"{exercise_data['angle']:.1f}°")
+            if "exercise" in exercise_data:
+                st.caption(f"Detected exercise: {exercise_data['exercise']}")
             
             # Form feedback
             st.subheader("🎯 Form Assessment")
@@ -151,7 +220,7 @@ def main():
         st.header("📊 Progress Dashboard")
         
         # Weekly summary
-        weekly_summary = st.session_state.workout_logger.get_weekly_summary()
+        weekly_summary = st.session_state.dashboard.weekly_summary()
         st.subheader("📅 This Week")
         st.metric("Workouts", weekly_summary["workouts_this_week"])
         st.metric("Total Reps", weekly_summary["total_reps_this_week"])
@@ -160,15 +229,18 @@ def main():
         
         # Recent workouts
         st.subheader("🕒 Recent Workouts")
-        recent_workouts = st.session_state.workout_logger.get_recent_workouts(days=7)
+        recent_workouts = st.session_state.dashboard.recent_workouts(days=7, limit=5)
         
         if recent_workouts:
-            for workout in recent_workouts[-5:]:  # Show last 5
+            for workout in recent_workouts:
                 workout_date = datetime.fromisoformat(workout["timestamp"]).strftime("%m/%d")
                 st.write(f"**{workout_date}**: {workout['exercise_type'].title()} - {workout['reps']} reps")
         else:
             st.info("No recent workouts")
     
+    # Frame stage timings, after this run's frame was processed
+    show_latency(st.session_state.pose_detector)
+    
     # Progress charts
     st.markdown("---")
     st.header("📈 Progress Charts")
@@ -177,36 +249,19 @@ def main():
     
     with col_chart1:
         st.subheader("Reps Progress (Last 30 Days)")
-        progress_data = st.session_state.workout_logger.get_progress_data(
+        progress_figures = st.session_state.dashboard.progress_figures(
             st.session_state.current_exercise, days=30
         )
         
-        if progress_data:
-            dates = list(progress_data.keys())
-            reps = [progress_data[date]["reps"] for date in dates]
-            
-            fig = px.line(
-                x=dates, 
-                y=reps,
-                title=f"{st.session_state.current_exercise.title()} Reps Over Time"
-            )
-            fig.update_layout(xaxis_title="Date", yaxis_title="Reps")
-            st.plotly_chart(fig, use_container_width=True)
+        if progress_figures:
+            st.plotly_chart(progress_figures["reps"], use_container_width=True)
         else:
             st.info("No progress data available")
     
     with col_chart2:
         st.subheader("Form Score Progress (Last 30 Days)")
-        if progress_data:
-            form_scores = [progress_data[date]["form_score"] for date in dates]
-            
-            fig = px.line(
-                x=dates, 
-                y=form_scores,
-                title=f"{st.session_state.current_exercise.title()} Form Score Over Time"
-            )
-            fig.update_layout(xaxis_title="Date", yaxis_title="Form Score")
-            st.plotly_chart(fig, use_container_width=True)
+        if progress_figures:
+            st.plotly_chart(progress_figures["form_score"], use_container_width=True)
         else:
             st.info("No progress data available")
     
@@ -214,27 +269,74 @@ def main():
     st.markdown("---")
     st.header("📋 Workout History")
     
-    if st.button("Export to CSV"):
-        filename = st.session_state.workout_logger.export_to_csv()
-        st.success(f"Workout data exported to {filename}")
+    history_col1, history_col2, history_col3 = st.columns(3)
+    with history_col1:
+        current_only = st.checkbox(f"Only {st.session_state.current_exercise.title()}")
+    with history_col2:
+        sort_label = st.selectbox("Sort by", list(HISTORY_SORTS))
+    with history_col3:
+        page_sizes = sorted({10, 25, 50, 100, STORAGE_CONFIG["history_page_size"]})
+        page_size = st.selectbox(
+            "Rows per page", page_sizes, index=page_sizes.index(STORAGE_CONFIG["history_page_size"])
+        )
+    history_filter = st.session_state.current_exercise if current_only else None
     
-    # Display workout history
-    all_workouts = st.session_state.workout_logger.logs
+    export_col1, export_col2 = st.columns([1, 3])
+    with export_col1:
+        export_format = st.selectbox("Export format", export_formats())
+    with export_col2:
+        st.write("")
+        if st.button("Export"):
+            export_workouts(export_format, history_filter)
     
-    if all_workouts:
-        # Convert to DataFrame for better display
-        df = pd.DataFrame(all_workouts)
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        df['date'] = df['timestamp'].dt.strftime('%Y-%m-%d %H:%M')
-        
-        # Reorder columns for better display
-        display_df = df[['date', 'exercise_type', 'reps', 'duration_minutes', 'form_score', 'calories_estimate']]
-        display_df.columns = ['Date', 'Exercise', 'Reps', 'Duration (min)', 'Form Score', 'Calories']
+    # Display one page of workout history; start over when the view changes
+    sort_by, descending = HISTORY_SORTS[sort_label]
+    history_view = (st.session_state.user_id, history_filter, sort_label, page_size)
+    if st.session_state.get('history_view') != history_view:
+        st.session_state.history_view = history_view
+        st.session_state.history_page = 0
+    
+    history = st.session_state.dashboard.history_page(
+        st.session_state.history_page, page_size, history_filter, sort_by, descending
+    )
+    
+    if not history["table"].empty:
+        st.dataframe(history["table"], use_container_width=True)
         
-        st.dataframe(display_df, use_container_width=True)
+        nav_col1, nav_col2, nav_col3 = st.columns([1, 2, 1])
+        with nav_col1:
+            if st.button("◀ Previous", disabled=st.session_state.history_page == 0):
+                st.session_state.history_page -= 1
+                st.rerun()
+        with nav_col2:
+            st.caption(f"Page {st.session_state.history_page + 1}")
+        with nav_col3:
+            if st.button("Next ▶", disabled=not history["has_next"]):
+                st.session_state.history_page += 1
+                st.rerun()
+    elif st.session_state.history_page > 0:
+        # The page ran past the end (e.g. the log was cleared); go back to the start
+        st.session_state.history_page = 0
+        st.rerun()
     else:
         st.info("No workout history available")
 
+def export_workouts(export_format, exercise_type=None):
+    """Export the workout log on a background thread while showing progress"""
+    job = st.session_state.workout_logger.export(
+        export_format, exercise_type=exercise_type, background=True
+    )
+    progress_bar = st.progress(0.0, text="Exporting workouts...")
+    while not job.done:
+        progress_bar.progress(job.progress, text="Exporting workouts...")
+        time.sleep(0.1)
+    progress_bar.empty()
+    
+    if job.error is not None:
+        st.error(f"Export failed: {job.error}")
+    else:
+        st.success(f"Exported {job.result['rows']} workouts to {job.result['filename']}")
+
 def start_workout():
     """Start a new workout session"""
     st.session_state.workout_start_time = time.time()
@@ -251,9 +353,12 @@ def stop_workout():
         # Get final stats
         stats = st.session_state.pose_detector.get_exercise_stats()
         
-        # Log the workout
+        # Log the workout (under the recognized exercise when auto-detecting)
+        exercise_type = st.session_state.current_exercise
+        if exercise_type == AUTO_EXERCISE:
+            exercise_type = stats["exercise_type"]
         workout_entry = st.session_state.workout_logger.log_workout(
-            exercise_type=st.session_state.current_exercise,
+            exercise_type=exercise_type,
             reps=stats["reps"],
             duration=duration,
             form_score=100,  # Placeholder - could be improved
@@ -0,0 +1,295 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Union
+
+import cv2
+import numpy as np
+
+from config import CAMERA_CONFIG
+
+Device = Union[int, str]
+
+def open_capture(device: Device) -> cv2.VideoCapture:
+    """Open a camera index or video file and apply CAMERA_CONFIG"""
+    cap = cv2.VideoCapture(device)
+    if not cap.isOpened():
+        cap.release()
+        raise RuntimeError(f"Could not open camera {device!r}")
+    if isinstance(device, int):
+        # Resolution/fps only apply to live devices; files keep their own
+        width, height = CAMERA_CONFIG["default_resolution"]
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        cap.set(cv2.CAP_PROP_FPS, CAMERA_CONFIG["fps"])
+    return cap
+
+class CameraManager:
+    def __init__(self, idle_timeout: float = CAMERA_CONFIG["idle_timeout"]):
+        """Lazily opened camera handles shared by reference count
+
+        Each device is opened on first ``acquire`` and shared by every
+        caller (e.g. all Streamlit sessions in the process). Once nobody
+        holds it for ``idle_timeout`` seconds a background reaper releases
+        the device.
+        """
+        self.idle_timeout = idle_timeout
+        self._devices: Dict[Device, Dict] = {}
+        self._lock = threading.Lock()
+        self._reaper = None
+
+    def acquire(self, device: Device = CAMERA_CONFIG["device"]) -> cv2.VideoCapture:
+        """Get the shared handle for a device, opening it if needed"""
+        with self._lock:
+            state = self._devices.get(device)
+            if state is None:
+                state = {"capture": open_capture(device), "refs": 0, "idle_since": None,
+                         "lock": threading.Lock()}
+                self._devices[device] = state
+            state["refs"] += 1
+            state["idle_since"] = None
+            self._start_reaper()
+            return state["capture"]
+
+    def release(self, device: Device = CAMERA_CONFIG["device"]):
+        """Drop one reference; the device stays open until it has been idle a while"""
+        with self._lock:
+            state = self._devices.get(device)
+            if state is None or state["refs"] == 0:
+                return
+            state["refs"] -= 1
+            if state["refs"] == 0:
+                state["idle_since"] = time.monotonic()
+
+    @contextmanager
+    def camera(self, device: Device = CAMERA_CONFIG["device"]):
+        """Hold a device for the duration of a block, serializing reads on it"""
+        capture = self.acquire(device)
+        try:
+            with self._lock:
+                read_lock = self._devices[device]["lock"]
+            with read_lock:
+                yield capture
+        finally:
+            self.release(device)
+
+    def read(self, device: Device = CAMERA_CONFIG["device"]):
+        """Grab a single frame; returns (ok, frame) like VideoCapture.read"""
+        with self.camera(device) as capture:
+            return capture.read()
+
+    def open_devices(self) -> Dict[Device, int]:
+        """Currently open devices and their reference counts"""
+        with self._lock:
+            return {device: state["refs"] for device, state in self._devices.items()}
+
+    def close_idle(self, now: float = None) -> int:
+        """Release devices idle for longer than the timeout; returns how many"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            idle = [
+                device for device, state in self._devices.items()
+                if state["refs"] == 0 and now - state["idle_since"] >= self.idle_timeout
+            ]
+            captures = [self._devices.pop(device)["capture"] for device in idle]
+        for capture in captures:
+            capture.release()
+        return len(captures)
+
+    def close_all(self):
+        """Release every device regardless of references"""
+        with self._lock:
+            captures = [state["capture"] for state in self._devices.values()]
+            self._devices.clear()
+        for capture in captures:
+            capture.release()
+
+    def _start_reaper(self):
+        # Caller holds self._lock
+        if self._reaper is None or not self._reaper.is_alive():
+            self._reaper = threading.Thread(target=self._reap, name="camera-reaper", daemon=True)
+            self._reaper.start()
+
+    def _reap(self):
+        interval = max(0.05, min(1.0, self.idle_timeout / 2))
+        while True:
+            time.sleep(interval)
+            self.close_idle()
+            with self._lock:
+                if not self._devices:
+                    self._reaper = None
+                    return
+
+class StageTimings:
+    def __init__(self):
+        """Per-stage wall-clock timing (count, total, max) for a frame pipeline"""
+        self._stats: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float):
+        with self._lock:
+            stats = self._stats.setdefault(stage, [0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+
+    @contextmanager
+    def time(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def summary(self) -> Dict[str, Dict]:
+        """Per stage: number of samples, mean and max in milliseconds"""
+        with self._lock:
+            return {
+                stage: {
+                    "count": count,
+                    "mean_ms": round(total / count * 1000, 2),
+                    "max_ms": round(worst * 1000, 2)
+                }
+                for stage, (count, total, worst) in self._stats.items()
+            }
+
+class ThreadedCapture:
+    def __init__(self, source: Device = CAMERA_CONFIG["device"],
+                 buffer_size: int = CAMERA_CONFIG["buffer_size"], realtime: bool = True,
+                 on_frame: Callable[[], None] = None):
+        """Grab frames on a background thread into a ring of preallocated arrays
+
+        ``read()`` always returns the newest frame, so a slow consumer skips
+        stale frames instead of working through a backlog. A video file can
+        stand in for a camera; with ``realtime`` it is paced at its own fps
+        the way a live device would deliver it. ``on_frame`` is called on
+        the capture thread after each new frame and when the source ends.
+        """
+        if buffer_size < 3:
+            raise ValueError("buffer_size must be at least 3 (writer, newest, reader)")
+        self.source = source
+        self.buffer_size = buffer_size
+        self.realtime = realtime and not isinstance(source, int)
+        self.on_frame = on_frame
+        self.timings = StageTimings()
+        self.frames_captured = 0
+        self.frames_dropped = 0
+        self._capture = None
+        self._slots = []
+        self._frame_ids = [0] * buffer_size
+        self._timestamps = [0.0] * buffer_size
+        self._newest = None       # slot holding the newest complete frame
+        self._reading = None      # slot handed out by the last read()
+        self._last_read_id = 0
+        self._running = False
+        self._thread = None
+        self._cond = threading.Condition()
+
+    def start(self) -> "ThreadedCapture":
+        """Open the source, size the ring from the first frame and start grabbing"""
+        self._capture = open_capture(self.source)
+        ret, frame = self._capture.read()
+        if not ret:
+            self._capture.release()
+            raise RuntimeError(f"Could not read from camera {self.source!r}")
+        ring = np.empty((self.buffer_size,) + frame.shape, dtype=frame.dtype)
+        self._slots = list(ring)
+        self._slots[0][...] = frame
+        self._publish(0, time.monotonic())
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="camera-capture", daemon=True)
+        self._thread.start()
+        return self
+
+    def _publish(self, slot: int, timestamp: float):
+        with self._cond:
+            self.frames_captured += 1
+            if self._newest is not None and self._frame_ids[self._newest] > self._last_read_id:
+                # The previous newest frame was never read
+                self.frames_dropped += 1
+            self._frame_ids[slot] = self.frames_captured
+            self._timestamps[slot] = timestamp
+            self._newest = slot
+            self._cond.notify_all()
+
+    def _free_slot(self) -> int:
+        with self._cond:
+            for slot in range(self.buffer_size):
+                if slot != self._newest and slot != self._reading:
+                    return slot
+
+    def _run(self):
+        frame_interval = 0.0
+        if self.realtime:
+            fps = self._capture.get(cv2.CAP_PROP_FPS) or CAMERA_CONFIG["fps"]
+            frame_interval = 1.0 / fps
+        next_frame_at = time.monotonic() + frame_interval
+        while self._running:
+            slot = self._free_slot()
+            start = time.perf_counter()
+            ret, frame = self._capture.read(self._slots[slot])
+            if ret and frame is not self._slots[slot]:
+                # The backend allocated its own buffer; copy into the ring
+                self._slots[slot][...] = frame
+            self.timings.record("capture", time.perf_counter() - start)
+            if not ret:
+                break
+            if frame_interval:
+                delay = next_frame_at - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                next_frame_at = max(next_frame_at + frame_interval, time.monotonic())
+            self._publish(slot, time.monotonic())
+            if self.on_frame is not None:
+                self.on_frame()
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self.on_frame is not None:
+            self.on_frame()
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def has_new_frame(self) -> bool:
+        """Whether a frame newer than the last one read is waiting"""
+        with self._cond:
+            return self._newest is not None and self._frame_ids[self._newest] > self._last_read_id
+
+    def read(self, timeout: float = None):
+        """Wait for a frame newer than the last one read and return it
+
+        Returns ``(ok, frame, frame_id, timestamp)``. ``frame`` is a view
+        into the ring and stays valid until the next ``read()``; copy it
+        to keep it longer. ``ok`` is False once the source is exhausted.
+        """
+        with self._cond:
+            has_new = self._cond.wait_for(
+                lambda: (self._newest is not None and self._frame_ids[self._newest] > self._last_read_id)
+                or not self._running,
+                timeout
+            )
+            if not has_new or self._newest is None or self._frame_ids[self._newest] <= self._last_read_id:
+                return False, None, self._last_read_id, None
+            slot = self._newest
+            self._reading = slot
+            self._last_read_id = self._frame_ids[slot]
+            return True, self._slots[slot], self._last_read_id, self._timestamps[slot]
+
+    def stop(self):
+        """Stop grabbing and release the source"""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+        if self._capture is not None:
+            self._capture.release()
+            self._capture = None
+
+    def __enter__(self) -> "ThreadedCapture":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
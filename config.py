@@ -39,7 +39,8 @@ MEDIAPIPE_CONFIG = {
 FORM_CONFIG = {
     "posture_threshold": 160,           # Minimum angle for good posture
     "depth_threshold": 0.8,             # Minimum depth for exercise completion
-    "stability_threshold": 0.1,         # Maximum movement variance for stability
+    "stability_threshold": 0.1,         # Maximum sway (joint movement std / torso length) for a stable hold
+    "stability_window": 30,             # Frames the running stability statistics roughly average over
     "score_weights": {
         "posture": 0.4,                 # Weight for posture scoring
         "depth": 0.3,                   # Weight for depth scoring
@@ -48,10 +49,44 @@ FORM_CONFIG = {
     }
 }
 
+# Rep Analytics Settings
+ANALYTICS_CONFIG = {
+    "history_frames": 1800,             # Recent rep-angle trajectory kept per session (60 s at 30 fps)
+    "max_reps": 5000,                   # Per-rep records kept per session
+    "angle_history": 8,                 # Recent (timestamp, angle) samples kept for rep reconciliation
+    "max_sample_gap": 0.1,              # Seconds between samples beyond which a rep may hide between them
+    "min_rep_confidence": 0.2           # Count a rep inferred between samples only above this confidence
+}
+
+# Exercise Recognition Settings
+RECOGNITION_CONFIG = {
+    "window_seconds": 2.5,              # Motion window matched against the exercise templates
+    "template_length": 32,              # Samples per window after resampling
+    "components": 24,                   # PCA dimensions of the template index
+    "candidates": 8,                    # Nearest templates checked with DTW
+    "band": 3,                          # DTW warping band (samples on either side of the diagonal)
+    "interval": 0.25,                   # Seconds between recognitions while streaming
+    "votes": 3,                         # Agreeing recognitions in a row before switching exercise
+    "max_distance": 0.12,               # Mean per-sample feature distance (0-1 scale) above which nothing matches
+    "max_frames": 300                   # Recent frames' features kept per session
+}
+
+# Yoga Pose Scoring Settings
+YOGA_CONFIG = {
+    "index_dir": "pose_index",          # Reference pose index, written on first use and when the reference poses change
+    "position_weight": 0.25,            # Weight of joint positions (torso lengths) against joint angles (0-1) in pose vectors
+    "max_distance": 0.5,                # Pose vector distance at which similarity drops to 0
+    "min_similarity": 70,               # Similarity (0-100) to the chosen pose that counts as holding it
+    "deviation_tolerance": 15           # Degrees a joint may differ from the reference before it is pointed out
+}
+
 # Workout Tracking Settings
 WORKOUT_CONFIG = {
     "auto_save": True,                  # Automatically save workout data
     "save_interval": 30,                # Save data every N seconds
+    "batch_size": 50,                   # ...or every N pending log entries, whichever comes first
+    "queue_size": 10000,                # Bounded in-memory queue for the background log writer
+    "durability": "none",               # Per-batch durability: "none" or "fsync"
     "max_workout_duration": 7200,       # Maximum workout duration in seconds (2 hours)
     "calorie_estimation": {
         "pushup": 5,                    # Calories per pushup
@@ -73,19 +108,27 @@ UI_CONFIG = {
 
 # Camera Settings
 CAMERA_CONFIG = {
+    "device": 0,                        # Default camera index (or video file path)
     "default_resolution": (640, 480),   # Default camera resolution
     "fps": 30,                         # Target frames per second
+    "buffer_size": 3,                   # Preallocated frames in the capture ring buffer
     "flip_horizontal": False,           # Flip camera horizontally
     "brightness": 0,                    # Camera brightness adjustment
-    "contrast": 0                       # Camera contrast adjustment
+    "contrast": 0,                      # Camera contrast adjustment
+    "idle_timeout": 30                  # Release a shared camera after N idle seconds
 }
 
 # Data Storage Settings
 STORAGE_CONFIG = {
-    "log_file": "workout_logs.json",    # Workout log file name
+    "log_dir": "workout_logs",          # Workout logs, partitioned as <log_dir>/<user>/<YYYY-MM>.jsonl
+    "default_user": "default",          # User id when no profile is selected
+    "handle_cache_size": 32,            # Per-user loggers kept open (LRU)
+    "query_cache_size": 64,             # Memoized query() results per logger
+    "history_page_size": 25,            # Workout history rows per page
     "backup_interval": 7,               # Backup data every N days
     "max_log_entries": 10000,           # Maximum log entries to keep
-    "export_formats": ["csv", "json"],  # Supported export formats
+    "export_formats": ["csv", "jsonl", "parquet"],  # Export formats offered (parquet only with pyarrow installed)
+    "export_chunk_size": 5000,          # Log entries held in memory per export chunk
     "auto_cleanup": True                # Automatically clean old data
 }
 
@@ -95,7 +138,68 @@ PERFORMANCE_CONFIG = {
     "frame_skip": 1,                    # Process every Nth frame
     "landmark_smoothing": True,         # Enable landmark smoothing
     "cache_size": 100,                  # Cache size for processed frames
-    "parallel_processing": False        # Enable parallel processing
+    "parallel_processing": False,       # Enable parallel processing
+    "model_workers": 0,                 # Gym mode pose model workers shared by all streams (0: one per CPU core)
+    "frame_deadline": 0.25,             # Gym mode drops frames not picked up within N seconds of capture
+    "transport_slots": 0,               # Shared-memory frame slots for worker processes (0: two per worker)
+    "roi_tracking": True,               # Run the pose model on a crop around the person found in the last frame
+    "roi_padding": 0.25,                # Crop padding on each side, as a fraction of the person's size
+    "roi_min_visibility": 0.5,          # Below this mean landmark visibility a crop counts as lost
+    "roi_max_fraction": 0.6,            # Use the whole frame when the crop would cover more than this
+    "motion_gating": True,              # Reuse the last landmarks during holds while the scene is still
+    "motion_threshold": 2.0,            # Mean gray-level change (0-255) of the person's region that counts as motion
+    "motion_refresh": 1.0               # Run the pose model at least every N seconds during holds
+}
+
+# Inference Service Settings
+INFERENCE_CONFIG = {
+    "enabled": False,                   # Send session frames to the local inference service
+    "host": "127.0.0.1",                # Service address (keep it on loopback)
+    "port": 8750,                       # Service port
+    "workers": 0,                       # Pose model threads in the service (0: one per CPU core)
+    "max_batch": 8,                     # Frames grouped into one batch...
+    "batch_deadline": 0.01,             # ...or fewer once the oldest has waited N seconds
+    "timeout": 5.0                      # Seconds a session waits for a result
+}
+
+# Frame API Settings
+API_CONFIG = {
+    "host": "127.0.0.1",                # WebSocket API bind address
+    "port": 8760,                       # WebSocket API port
+    "decode_threads": 0,                # Threads for JPEG decode/encode (0: one per CPU core)
+    "inference_processes": 0,           # Pose model processes (0: one per CPU core)
+    "pipeline_depth": 4,                # Frames in progress per connection before reads pause
+    "max_frame_bytes": 8 * 1024 * 1024, # Largest accepted frame message
+    "jpeg_quality": 80                  # Quality of annotated frames sent back
+}
+
+# Latency Metrics Settings
+METRICS_CONFIG = {
+    "enabled": True,                    # Time each frame processing stage into latency histograms
+    "precision": 7,                     # Histogram bucket precision in bits (7: within ~1.6%)
+    "max_seconds": 60,                  # Longest duration kept apart; anything slower counts as this
+    "serve": True,                      # Serve Prometheus metrics from the apps
+    "host": "127.0.0.1",                # Metrics endpoint address (keep it on loopback)
+    "port": 8770                        # Metrics endpoint port (http://127.0.0.1:8770/metrics)
+}
+
+# Profiling Settings
+PROFILE_CONFIG = {
+    "env_var": "FITNESS_COACH_PROFILE", # Set to N to profile the apps' first N seconds of frames (1: "seconds")
+    "seconds": 30,                      # Profiling window, from the first frame
+    "interval": 0.005,                  # Seconds between stack samples
+    "output_dir": "profiles",           # Collapsed stacks and summaries go here
+    "allocations": True,                # Track per-frame allocations with tracemalloc (slows Python code down)
+    "snapshot_every": 30,               # Frames between tracemalloc snapshot pairs
+    "traceback_frames": 1,              # Stack depth tracemalloc keeps per allocation
+    "top": 25                           # Functions and allocation sites listed in the summary
+}
+
+# Landmark Codec Settings
+LANDMARK_CODEC_CONFIG = {
+    "block_frames": 30,                 # Frames per encoded block (each block decodes on its own)
+    "compress": True,                   # zlib-compress block payloads
+    "compression_level": 6              # zlib level (1 fastest - 9 smallest)
 }
 
 # Notification Settings
@@ -0,0 +1,96 @@
+import time
+from typing import Callable, Dict, Hashable, List, Optional
+
+import pandas as pd
+import plotly.express as px
+
+from config import STORAGE_CONFIG, UI_CONFIG
+from workout_logger import WorkoutLogger
+
+HISTORY_COLUMNS = {
+    "date": "Date",
+    "exercise_type": "Exercise",
+    "reps": "Reps",
+    "duration_minutes": "Duration (min)",
+    "form_score": "Form Score",
+    "calories_estimate": "Calories"
+}
+
+class DashboardData:
+    def __init__(self, logger: WorkoutLogger, max_age: float = UI_CONFIG["refresh_interval"]):
+        """Memoized data and figures for the progress dashboard
+
+        Every value is cached against ``logger.version``, so a Streamlit
+        rerun that did not change the log (e.g. picking another exercise
+        and back) reuses the previous results. Entries also expire after
+        ``max_age`` seconds so rolling "last N days" windows keep moving.
+        """
+        self.logger = logger
+        self.max_age = max_age
+        self._cache = {}
+
+    def _get(self, key: Hashable, compute: Callable):
+        self.logger.refresh()
+        version = self.logger.version
+        now = time.monotonic()
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] == version and now - cached[1] < self.max_age:
+            return cached[2]
+        value = compute()
+        if cached is not None and cached[0] != version:
+            # The log moved on; results for the old version are dead weight
+            self._cache = {k: v for k, v in self._cache.items() if v[0] == version}
+        self._cache[key] = (version, now, value)
+        return value
+
+    def weekly_summary(self) -> Dict:
+        return self._get(("weekly_summary",), self.logger.get_weekly_summary)
+
+    def recent_workouts(self, days: int = 7, limit: int = 5) -> List[Dict]:
+        return self._get(
+            ("recent_workouts", days, limit),
+            lambda: self.logger.get_recent_workouts(days=days)[-limit:]
+        )
+
+    def progress_data(self, exercise_type: str, days: int = 30) -> Dict:
+        return self._get(
+            ("progress_data", exercise_type, days),
+            lambda: self.logger.get_progress_data(exercise_type, days=days)
+        )
+
+    def progress_figures(self, exercise_type: str, days: int = 30) -> Optional[Dict]:
+        """Reps and form-score line charts, or None when there is no data"""
+        def build():
+            progress_data = self.progress_data(exercise_type, days)
+            if not progress_data:
+                return None
+            dates = list(progress_data.keys())
+            figures = {}
+            for metric, label in (("reps", "Reps"), ("form_score", "Form Score")):
+                fig = px.line(
+                    x=dates,
+                    y=[progress_data[date][metric] for date in dates],
+                    title=f"{exercise_type.title()} {label} Over Time"
+                )
+                fig.update_layout(xaxis_title="Date", yaxis_title=label)
+                figures[metric] = fig
+            return figures
+
+        return self._get(("progress_figures", exercise_type, days), build)
+
+    def history_page(self, page: int = 0, page_size: int = STORAGE_CONFIG["history_page_size"],
+                     exercise_type: str = None, sort_by: str = "timestamp",
+                     descending: bool = True) -> Dict:
+        """Display-ready table for one page of the user's workout history"""
+        def build():
+            result = self.logger.get_history_page(page, page_size, exercise_type, sort_by, descending)
+            rows = result["rows"]
+            if rows:
+                df = pd.DataFrame.from_records(rows, columns=["timestamp"] + list(HISTORY_COLUMNS))
+                df['date'] = pd.to_datetime(df['timestamp'], format="ISO8601").dt.strftime('%Y-%m-%d %H:%M')
+                table = df[list(HISTORY_COLUMNS)].rename(columns=HISTORY_COLUMNS)
+            else:
+                table = pd.DataFrame(columns=list(HISTORY_COLUMNS.values()))
+            return dict(result, table=table)
+
+        return self._get(("history_page", page, page_size, exercise_type, sort_by, descending), build)
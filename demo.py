@@ -4,47 +4,56 @@ Demo script for AI Fitness Coach
 Tests pose detection functionality with webcam or sample images
 """
 
+import argparse
 import cv2
 import numpy as np
 import time
 from pose_detector import PoseDetector
+from camera import ThreadedCapture
+from config import CAMERA_CONFIG, PROFILE_CONFIG
+from profiler import enable_profiling, profile_frame
 
-def test_webcam():
-    """Test pose detection with webcam feed"""
+def test_webcam(source=CAMERA_CONFIG["device"]):
+    """Test pose detection with webcam feed (or a video file standing in for one)"""
     print("🎥 Testing webcam pose detection...")
     print("Press 'q' to quit, 'r' to reset counter")
     
     # Initialize pose detector
     detector = PoseDetector()
     
-    # Open webcam
-    cap = cv2.VideoCapture(0)
-    
-    if not cap.isOpened():
+    # Open webcam; frames are grabbed on a background thread so a slow
+    # frame never stalls capture, and we always process the newest one
+    capture = ThreadedCapture(source)
+    try:
+        capture.start()
+    except RuntimeError:
         print("❌ Error: Could not open webcam")
         return
+    timings = capture.timings
     
     print("✅ Webcam opened successfully")
     print("📱 Position yourself in front of the camera")
     print("🏋️ Try doing some pushups or squats")
     
     while True:
-        ret, frame = cap.read()
+        ret, frame, _, _ = capture.read(timeout=2.0)
         if not ret:
-            print("❌ Error: Could not read frame")
+            print("\n❌ Error: Could not read frame")
             break
         
         # Process frame
-        processed_frame, exercise_data = detector.process_frame(frame, "pushup")
+        with timings.time("process"), profile_frame():
+            processed_frame, exercise_data = detector.process_frame(frame, "pushup")
         
         # Display frame
-        cv2.imshow('AI Fitness Coach - Demo', processed_frame)
-        
-        # Print exercise data
-        print(f"\rReps: {exercise_data['reps']} | State: {exercise_data['state']} | Angle: {exercise_data['angle']:.1f}°", end='')
-        
-        # Handle key presses
-        key = cv2.waitKey(1) & 0xFF
+        with timings.time("display"):
+            cv2.imshow('AI Fitness Coach - Demo', processed_frame)
+            
+            # Print exercise data
+            print(f"\rReps: {exercise_data['reps']} | State: {exercise_data['state']} | Angle: {exercise_data['angle']:.1f}°", end='')
+            
+            # Handle key presses
+            key = cv2.waitKey(1) & 0xFF
         if key == ord('q'):
             break
         elif key == ord('r'):
@@ -52,9 +61,14 @@ def test_webcam():
             print("\n🔄 Counter reset!")
     
     # Cleanup
-    cap.release()
+    capture.stop()
     cv2.destroyAllWindows()
-    print("\n✅ Demo completed!")
+    
+    print("\n⏱️ Stage timings:")
+    for stage, stats in timings.summary().items():
+        print(f"   {stage}: {stats['mean_ms']:.1f} ms avg, {stats['max_ms']:.1f} ms max ({stats['count']} frames)")
+    print(f"   Frames captured: {capture.frames_captured}, skipped as stale: {capture.frames_dropped}")
+    print("✅ Demo completed!")
 
 def test_image_processing():
     """Test pose detection with a sample image"""
@@ -78,7 +92,8 @@ def test_image_processing():
             print(f"✅ Image loaded: {image.shape}")
             
             # Process image
-            processed_image, exercise_data = detector.process_frame(image, "pushup")
+            with profile_frame():
+                processed_image, exercise_data = detector.process_frame(image, "pushup")
             
             # Display results
             print(f"📊 Exercise Data:")
@@ -162,4 +177,10 @@ def main():
             print("❌ Invalid choice. Please try again.")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="AI Fitness Coach demo")
+    parser.add_argument("--profile", type=float, nargs="?", const=PROFILE_CONFIG["seconds"], metavar="SECONDS",
+                        help=f"profile the first SECONDS of frame processing into {PROFILE_CONFIG['output_dir']}/")
+    args = parser.parse_args()
+    if args.profile:
+        enable_profiling(args.profile)
+    main()
\ No newline at end of file
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Automatic exercise recognition from motion templates
+
+The last ``window_seconds`` of a session's joint angles (see
+pose_features.py) are resampled to a fixed-length window and compared
+with a library of reference windows, one per exercise, tempo and phase
+of the movement. Matching runs in three steps so it stays well under a
+millisecond per window:
+
+1. PCA-projected nearest neighbours pick a handful of candidate templates
+2. LB_Keogh lower bounds order the candidates and rule out hopeless ones
+3. banded dynamic time warping (DTW) gives the exact distance of the rest
+
+Templates are generated from ``EXERCISE_TEMPLATES``: a few keyframes of
+joint angles per exercise, played as a smooth cycle at several tempos.
+Libraries can be saved, loaded and extended with recorded sequences.
+
+``ExerciseRecognizer`` runs this continuously on a stream of landmarks
+and only switches exercise after several agreeing recognitions.
+"""
+
+from collections import deque
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import RECOGNITION_CONFIG
+from pose_features import FEATURES, REFERENCE_POSES, joint_angles, pose_vector
+
+# Exercise type that asks PoseDetector to recognize the exercise itself
+AUTO_EXERCISE = "auto"
+
+# Keyframes of one rep (joint angles in degrees, see pose_features.FEATURES); one keyframe = a static pose.
+# A bare joint name sets both sides; unset joints are those of a relaxed standing pose.
+EXERCISE_TEMPLATES = {
+    "pushup": [
+        {"torso": 90, "shoulder": 75, "elbow": 170},
+        {"torso": 85, "shoulder": 40, "elbow": 80}
+    ],
+    "squat": [
+        {"shoulder": 20},
+        {"torso": 40, "shoulder": 80, "hip": 80, "knee": 75}
+    ],
+    "plank": [{"torso": 85, "shoulder": 80, "elbow": 90}],
+    "lunge": [
+        {},
+        {"left_hip": 95, "left_knee": 90, "right_hip": 170, "right_knee": 100}
+    ],
+    "burpee": [
+        {"shoulder": 20},
+        {"torso": 50, "shoulder": 60, "hip": 50, "knee": 50},
+        {"torso": 90, "shoulder": 75, "elbow": 170},
+        {"torso": 50, "shoulder": 60, "hip": 50, "knee": 50},
+        {"shoulder": 170}
+    ],
+    "mountain climber": [
+        {"torso": 80, "shoulder": 80, "left_hip": 70, "left_knee": 70},
+        {"torso": 80, "shoulder": 80, "right_hip": 70, "right_knee": 70}
+    ],
+    "jumping jack": [
+        {"shoulder": 15},
+        {"shoulder": 165, "hip": 160}
+    ],
+    "crunch": [
+        {"torso": 95, "shoulder": 150, "elbow": 40, "hip": 110, "knee": 90},
+        {"torso": 60, "shoulder": 150, "elbow": 40, "hip": 75, "knee": 90}
+    ],
+    "bicep curl": [
+        {"elbow": 170},
+        {"elbow": 40}
+    ],
+    "tricep dip": [
+        {"torso": 10, "shoulder": 20, "hip": 90, "knee": 90},
+        {"torso": 10, "shoulder": 60, "elbow": 90, "hip": 90, "knee": 90}
+    ],
+    "shoulder press": [
+        {"shoulder": 90, "elbow": 80},
+        {"shoulder": 170, "elbow": 170}
+    ],
+    # Yoga poses are held: one keyframe, their first reference variant. Cat-cow flows between its two.
+    **{pose: variants[:1] for pose, variants in REFERENCE_POSES.items()},
+    "cat-cow": REFERENCE_POSES["cat-cow"]
+}
+
+# Seconds per rep the dynamic templates are generated at, and phases of the rep a window may start in
+TEMPLATE_PERIODS = (1.0, 1.25, 1.6, 2.0, 2.5, 3.2, 4.0, 5.0)
+TEMPLATE_PHASES = 8
+
+_MIRROR = [FEATURES.index(name.replace("left_", "right_") if name.startswith("left_")
+                          else name.replace("right_", "left_")) for name in FEATURES]
+
+def _cycle(keyframes: np.ndarray, phase: np.ndarray) -> np.ndarray:
+    """Features at ``phase`` (in reps) of a cycle through the keyframes, eased between them"""
+    position = (phase % 1.0) * len(keyframes)
+    index = np.floor(position).astype(int)
+    blend = (1 - np.cos(np.pi * (position - index))) / 2
+    start, end = keyframes[index], keyframes[(index + 1) % len(keyframes)]
+    return start + (end - start) * blend[:, None]
+
+def _envelope(windows: np.ndarray, band: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Running max and min of (T, L, F) windows over +-``band`` samples, for LB_Keogh"""
+    length = windows.shape[1]
+    upper, lower = windows.copy(), windows.copy()
+    for shift in range(1, band + 1):
+        np.maximum(upper[:, shift:], windows[:, :length - shift], out=upper[:, shift:])
+        np.maximum(upper[:, :length - shift], windows[:, shift:], out=upper[:, :length - shift])
+        np.minimum(lower[:, shift:], windows[:, :length - shift], out=lower[:, shift:])
+        np.minimum(lower[:, :length - shift], windows[:, shift:], out=lower[:, :length - shift])
+    return upper, lower
+
+def resample(timestamps: np.ndarray, features: np.ndarray, end: float, duration: float, length: int) -> np.ndarray:
+    """(length, F) features linearly interpolated at evenly spaced times over (end - duration, end]"""
+    grid = np.linspace(end - duration, end, length)
+    right = np.clip(np.searchsorted(timestamps, grid), 1, len(timestamps) - 1)
+    left = right - 1
+    span = timestamps[right] - timestamps[left]
+    weight = np.clip((grid - timestamps[left]) / np.where(span > 0, span, 1.0), 0.0, 1.0)[:, None]
+    return features[left] * (1 - weight) + features[right] * weight
+
+class TemplateLibrary:
+    def __init__(self, windows: np.ndarray, labels: Sequence[str],
+                 components: int = RECOGNITION_CONFIG["components"], band: int = RECOGNITION_CONFIG["band"]):
+        """Index (T, L, F) template windows of features scaled to 0-1, labelled with their exercise"""
+        self.windows = np.ascontiguousarray(windows, dtype=np.float64)
+        self.labels = np.asarray(labels)
+        self.band = band
+        count, length, width = self.windows.shape
+        flat = self.windows.reshape(count, length * width)
+        self.mean = flat.mean(axis=0)
+        _, _, axes = np.linalg.svd(flat - self.mean, full_matrices=False)
+        self.components = axes[:components]
+        self.projected = (flat - self.mean) @ self.components.T
+        self.upper, self.lower = _envelope(self.windows, band)
+        self._norms = np.einsum("tlf,tlf->tl", self.windows, self.windows)
+        # Warping paths leaving the band cost more than any path inside it
+        offsets = np.arange(length)
+        self._outside_band = np.where(np.abs(offsets[:, None] - offsets[None]) > band, 1e3, 0.0)
+
+    @classmethod
+    def build(cls, templates: Dict[str, List[Dict]] = EXERCISE_TEMPLATES,
+              length: int = RECOGNITION_CONFIG["template_length"], **kwargs) -> "TemplateLibrary":
+        """Library of template windows generated from exercise keyframes"""
+        windows, labels = [], []
+        duration = RECOGNITION_CONFIG["window_seconds"]
+        times = np.linspace(0.0, duration, length)
+        for exercise, keyframes in templates.items():
+            poses = np.array([pose_vector(keyframe) for keyframe in keyframes])
+            if len(poses) == 1:
+                generated = [np.repeat(poses, length, axis=0)]
+            else:
+                generated = [_cycle(poses, times / period + start / TEMPLATE_PHASES)
+                             for period in TEMPLATE_PERIODS for start in range(TEMPLATE_PHASES)]
+            for window in generated:
+                # Either side may lead (lunges, mountain climbers, one-sided yoga poses)
+                windows.extend((window, window[:, _MIRROR]))
+                labels.extend((exercise, exercise))
+        return cls(np.array(windows) / 180.0, labels, **kwargs)
+
+    def extend(self, exercise: str, landmarks: np.ndarray, timestamps: np.ndarray,
+               step: float = 0.5) -> "TemplateLibrary":
+        """New library with windows cut every ``step`` seconds from a recorded (N, 33, 4) sequence added"""
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        features = joint_angles(landmarks) / 180.0
+        duration = RECOGNITION_CONFIG["window_seconds"]
+        length = self.windows.shape[1]
+        ends = np.arange(timestamps[0] + duration, timestamps[-1] + 1e-9, step)
+        if not len(ends):
+            raise ValueError(f"Sequence is shorter than one {duration} s window")
+        added = np.array([resample(timestamps, features, end, duration, length) for end in ends])
+        return TemplateLibrary(np.concatenate((self.windows, added, added[..., _MIRROR])),
+                               [*self.labels, *[exercise] * (2 * len(added))],
+                               len(self.components), self.band)
+
+    def save(self, path: str):
+        np.savez(path, windows=self.windows, labels=self.labels,
+                 components=len(self.components), band=self.band)
+
+    @classmethod
+    def load(cls, path: str) -> "TemplateLibrary":
+        with np.load(path) as data:
+            return cls(data["windows"], data["labels"].tolist(), int(data["components"]), int(data["band"]))
+
+    def lower_bounds(self, window: np.ndarray, candidates: np.ndarray) -> np.ndarray:
+        """LB_Keogh: no warping path within the band can cost less than this"""
+        excess = (np.maximum(window - self.upper[candidates], 0.0)
+                  + np.maximum(self.lower[candidates] - window, 0.0))
+        return np.sqrt((excess * excess).sum(axis=2)).sum(axis=1) / len(window)
+
+    def dtw(self, window: np.ndarray, candidates: np.ndarray) -> np.ndarray:
+        """Banded DTW distance (mean Euclidean step cost) from the window to each candidate template"""
+        templates = self.windows[candidates]
+        count, length, width = templates.shape
+        # Squared distances |q|^2 + |t|^2 - 2 q.t as one matrix product, shaped (window sample i, candidate, template sample j)
+        squared = (window @ templates.reshape(-1, width).T).reshape(length, count, length)
+        squared *= -2
+        squared += np.einsum("if,if->i", window, window)[:, None, None]
+        squared += self._norms[candidates]
+        cost = np.sqrt(np.maximum(squared, 0.0, out=squared), out=squared)
+        cost += self._outside_band[:, None, :]
+        # Row by row: D[i, j] = min(a[j], D[i, j-1] + cost[i, j]) with a[j] = cost[i, j] + min(D[i-1, j-1], D[i-1, j]),
+        # which unrolls to the row's prefix sum S plus the running minimum of a - S
+        prefix = np.cumsum(cost, axis=2)
+        offset = cost - prefix
+        total = prefix[0]
+        reach = np.empty_like(total)
+        for i in range(1, len(window)):
+            reach[:, 0] = total[:, 0]
+            np.minimum(total[:, 1:], total[:, :-1], out=reach[:, 1:])
+            reach += offset[i]
+            np.minimum.accumulate(reach, axis=1, out=reach)
+            total = prefix[i] + reach
+        return total[:, -1] / len(window)
+
+    def match(self, window: np.ndarray, candidates: int = RECOGNITION_CONFIG["candidates"],
+              max_distance: float = RECOGNITION_CONFIG["max_distance"]) -> Tuple[str, float]:
+        """Closest template's exercise and distance for an (L, F) window of 0-1 features
+
+        Only candidates whose LB_Keogh bound is within ``max_distance`` go
+        through DTW; if none is, the closest bound decides and is returned
+        as the (lower bound of the) distance.
+        """
+        query = (window.reshape(-1) - self.mean) @ self.components.T
+        nearest = np.einsum("tk,tk->t", self.projected - query, self.projected - query)
+        if candidates < len(nearest):
+            nearest = np.argpartition(nearest, candidates)[:candidates]
+        else:
+            nearest = np.arange(len(nearest))
+        bounds = self.lower_bounds(window, nearest)
+        close = nearest[bounds <= max_distance]
+        if not len(close):
+            best = int(np.argmin(bounds))
+            return str(self.labels[nearest[best]]), float(bounds[best])
+        distances = self.dtw(window, close)
+        best = int(np.argmin(distances))
+        return str(self.labels[close[best]]), float(distances[best])
+
+_default_library: Optional[TemplateLibrary] = None
+
+def default_library() -> TemplateLibrary:
+    """The library built from EXERCISE_TEMPLATES (built once per process)"""
+    global _default_library
+    if _default_library is None:
+        _default_library = TemplateLibrary.build()
+    return _default_library
+
+class ExerciseRecognizer:
+    def __init__(self, library: TemplateLibrary = None):
+        """Recognize the exercise in a stream of landmarks (``library`` defaults to ``default_library()``)"""
+        self._library = library
+        self.window_seconds = RECOGNITION_CONFIG["window_seconds"]
+        self.interval = RECOGNITION_CONFIG["interval"]
+        self.votes = RECOGNITION_CONFIG["votes"]
+        self.max_distance = RECOGNITION_CONFIG["max_distance"]
+        self._timestamps = deque(maxlen=RECOGNITION_CONFIG["max_frames"])
+        self._features = deque(maxlen=RECOGNITION_CONFIG["max_frames"])
+        self.reset()
+
+    @property
+    def library(self) -> TemplateLibrary:
+        if self._library is None:
+            self._library = default_library()
+        return self._library
+
+    def reset(self):
+        self._timestamps.clear()
+        self._features.clear()
+        self._last_match = None
+        self.exercise = None        # recognized exercise, None until one is confirmed
+        self.candidate = None       # latest match, confirmed after ``votes`` agreeing matches
+        self.distance = None
+        self._agreeing = 0
+
+    def update(self, landmarks: np.ndarray, timestamp: float) -> Optional[str]:
+        """Add one frame's (33, >=2) landmarks; returns the recognized exercise (None while unsure)"""
+        self._timestamps.append(timestamp)
+        self._features.append(joint_angles(landmarks[None])[0] / 180.0)
+        if self._last_match is not None and timestamp - self._last_match < self.interval:
+            return self.exercise
+        if timestamp - self._timestamps[0] < self.window_seconds:
+            return self.exercise
+        self._last_match = timestamp
+        label, distance = self.recognize(np.array(self._timestamps), np.array(self._features))
+        self.distance = distance
+        if distance > self.max_distance:
+            self.candidate, self._agreeing = None, 0
+            return self.exercise
+        self._agreeing = self._agreeing + 1 if label == self.candidate else 1
+        self.candidate = label
+        if self._agreeing >= self.votes:
+            self.exercise = label
+        return self.exercise
+
+    def recognize(self, timestamps: np.ndarray, features: np.ndarray) -> Tuple[str, float]:
+        """Best matching exercise and distance for the window ending at the last of (N,) times and (N, F) features"""
+        window = resample(timestamps, features, timestamps[-1], self.window_seconds,
+                          self.library.windows.shape[1])
+        return self.library.match(window)
+
+    def summary(self) -> Dict:
+        return {
+            "exercise": self.exercise,
+            "candidate": self.candidate,
+            "distance": None if self.distance is None else round(self.distance, 4)
+        }
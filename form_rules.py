@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Declarative form rules, compiled into array operations
+
+Every exercise has a list of rules built from three kinds of checks:
+
+- ``angle_range``: the angle at the middle joint of a triplet stays within bounds
+- ``alignment``: a triplet forms a straight line (at least ``posture_threshold``)
+- ``symmetry``: the same angle on the left and right side differs by at most a tolerance
+
+``CompiledRules`` turns a rule list into index arrays: every distinct
+triplet's angle is computed in one vectorized pass and all rules are
+checked with a handful of mask operations, so adding rules adds array
+elements rather than Python work per frame. Each rule belongs to a
+scoring category (posture, depth, stability, range); the form score
+is the ``FORM_CONFIG["score_weights"]`` average of the share of passed
+rules per category, over the categories the exercise has rules for.
+"""
+
+from typing import Dict, List, Sequence
+
+import mediapipe as mp
+import numpy as np
+
+from config import FORM_CONFIG
+
+CATEGORIES = ("posture", "depth", "stability", "range")
+
+# Static poses: their stability counts towards the form score
+HOLD_EXERCISES = {
+    "plank", "downward dog", "warrior I", "warrior II", "tree pose", "cobra pose",
+    "child's pose", "cat-cow", "bridge pose", "seated twist", "triangle pose"
+}
+
+_ANGLE, _SYMMETRY = 0, 1
+
+def _joints(names: Sequence[str]) -> tuple:
+    return tuple(int(mp.solutions.pose.PoseLandmark[name.upper()]) for name in names)
+
+def angle_range(joints: Sequence[str], low: float, high: float, issue: str, tip: str,
+                category: str = "range") -> Dict:
+    """Angle at ``joints[1]`` between ``joints[0]`` and ``joints[2]`` must lie in [low, high] degrees"""
+    return {"kind": _ANGLE, "joints": (_joints(joints),), "low": low, "high": high,
+            "category": category, "issue": issue, "tip": tip}
+
+def alignment(joints: Sequence[str], issue: str, tip: str, category: str = "posture") -> Dict:
+    """Three joints must form a straight line"""
+    return angle_range(joints, FORM_CONFIG["posture_threshold"], 180, issue, tip, category)
+
+def symmetry(joints: Sequence[str], tolerance: float, issue: str, tip: str, category: str = "posture") -> Dict:
+    """The angle at ``left_*`` joints must match the same angle on the right within ``tolerance`` degrees"""
+    mirrored = [name.replace("left_", "right_") for name in joints]
+    return {"kind": _SYMMETRY, "joints": (_joints(joints), _joints(mirrored)), "low": 0, "high": tolerance,
+            "category": category, "issue": issue, "tip": tip}
+
+def both_sides(rule_factory, joints: Sequence[str], *args, **kwargs) -> List[Dict]:
+    """The same rule for the left joints and their right-hand mirror"""
+    mirrored = [name.replace("left_", "right_") for name in joints]
+    return [rule_factory(joints, *args, **kwargs), rule_factory(mirrored, *args, **kwargs)]
+
+_ARM = ("left_shoulder", "left_elbow", "left_wrist")
+_LEG = ("left_hip", "left_knee", "left_ankle")
+_BODY = ("left_shoulder", "left_hip", "left_ankle")
+_TORSO = ("left_shoulder", "left_hip", "left_knee")
+_UPPER_ARM = ("left_elbow", "left_shoulder", "left_hip")
+_NECK = ("left_ear", "left_shoulder", "left_hip")
+
+FORM_RULES = {
+    "pushup": [
+        *both_sides(alignment, _BODY, "Keep your body straight",
+                    "Engage your core and maintain a straight line from head to heels"),
+        alignment(_NECK, "Keep your head in line with your spine", "Look at the floor just ahead of your hands"),
+        symmetry(_ARM, 25, "Arms are bending unevenly", "Lower and push up evenly with both arms")
+    ],
+    "squat": [
+        symmetry(_LEG, 20, "Knees are bending unevenly", "Keep your weight centered over both feet"),
+        *both_sides(angle_range, _TORSO, 45, 180, "Chest is dropping too far forward",
+                    "Keep your chest up and your back neutral", "posture"),
+        *both_sides(angle_range, _LEG, 40, 180, "Knees are over-flexed",
+                    "Stop when your thighs are about parallel to the floor")
+    ],
+    "plank": [
+        *both_sides(alignment, _BODY, "Hips are sagging or piked",
+                    "Squeeze your glutes and keep a straight line from head to heels"),
+        alignment(_NECK, "Keep your head in line with your spine", "Look at the floor between your hands"),
+        *both_sides(angle_range, _UPPER_ARM, 60, 110, "Shoulders are not over your elbows",
+                    "Stack your shoulders directly above your elbows", "posture")
+    ],
+    "lunge": [
+        *both_sides(angle_range, _TORSO, 70, 180, "Leaning too far forward", "Keep your torso upright", "posture"),
+        *both_sides(angle_range, _LEG, 60, 180, "Knee is bending too far",
+                    "Keep your front knee above your ankle")
+    ],
+    "burpee": [
+        symmetry(_LEG, 25, "Legs are moving unevenly", "Jump and land with both feet together"),
+        symmetry(_ARM, 25, "Arms are moving unevenly", "Place both hands flat, shoulder-width apart")
+    ],
+    "mountain climber": [
+        *both_sides(angle_range, _ARM, 150, 180, "Keep your arms straight",
+                    "Lock your elbows and keep your shoulders over your hands", "posture"),
+        *both_sides(angle_range, _UPPER_ARM, 50, 120, "Hips are too high",
+                    "Keep your hips level with your shoulders", "posture")
+    ],
+    "jumping jack": [
+        symmetry(("left_hip", "left_shoulder", "left_elbow"), 25, "Arms are moving unevenly",
+                 "Raise both arms together"),
+        *both_sides(angle_range, _LEG, 150, 180, "Keep your legs straight", "Land softly without bending your knees")
+    ],
+    "crunch": [
+        *both_sides(angle_range, _LEG, 60, 120, "Keep your knees bent", "Feet flat, knees at about 90 degrees"),
+        angle_range(_NECK, 120, 180, "Don't pull on your neck", "Keep a fist's space between chin and chest",
+                    "posture")
+    ],
+    "bicep curl": [
+        *both_sides(angle_range, _UPPER_ARM, 0, 35, "Elbows are drifting forward", "Pin your elbows to your sides",
+                    "posture"),
+        alignment(_BODY, "Don't swing your body", "Keep your torso still and let your arms do the work"),
+        symmetry(_ARM, 25, "Arms are curling unevenly", "Curl both arms at the same pace")
+    ],
+    "tricep dip": [
+        *both_sides(angle_range, _ARM, 60, 180, "Dipping too low",
+                    "Stop when your upper arms are parallel to the floor"),
+        symmetry(_ARM, 20, "Arms are bending unevenly", "Lower and press with both arms evenly")
+    ],
+    "shoulder press": [
+        symmetry(_ARM, 20, "Arms are pressing unevenly", "Press both weights at the same pace"),
+        alignment(_BODY, "Don't arch your back", "Brace your core and keep your ribs down")
+    ],
+    "downward dog": [
+        angle_range(_BODY, 50, 110, "Hips are not high enough", "Push your hips up and back", "depth"),
+        *both_sides(angle_range, _ARM, 150, 180, "Keep your arms straight", "Press the floor away with your hands",
+                    "posture"),
+        *both_sides(angle_range, _LEG, 150, 180, "Knees are bent", "Straighten your legs as far as is comfortable",
+                    "range")
+    ],
+    "warrior I": [
+        *both_sides(angle_range, ("left_hip", "left_shoulder", "left_elbow"), 150, 180, "Raise your arms overhead",
+                    "Reach up through your fingertips", "depth"),
+        *both_sides(angle_range, _ARM, 150, 180, "Keep your arms straight", "Extend through your elbows", "posture")
+    ],
+    "warrior II": [
+        *both_sides(angle_range, ("left_hip", "left_shoulder", "left_elbow"), 75, 105, "Arms are not level",
+                    "Extend your arms parallel to the floor", "posture"),
+        *both_sides(angle_range, _ARM, 160, 180, "Keep your arms straight", "Reach out through your fingertips",
+                    "posture")
+    ],
+    "tree pose": [
+        symmetry(("left_hip", "left_shoulder", "left_elbow"), 20, "Arms are uneven",
+                 "Bring your palms together in front of your chest or overhead"),
+        alignment(_NECK, "Stand tall", "Lengthen your spine and keep your head over your shoulders")
+    ],
+    "cobra pose": [
+        angle_range(_TORSO, 110, 175, "Lift your chest", "Press through your hands and lift your chest forward",
+                    "depth"),
+        symmetry(_ARM, 20, "Arms are uneven", "Press evenly through both hands")
+    ],
+    "child's pose": [
+        angle_range(_TORSO, 0, 60, "Sink your hips toward your heels", "Let your hips settle back and relax",
+                    "depth"),
+        *both_sides(angle_range, _LEG, 0, 60, "Fold your knees fully", "Rest your hips back over your heels")
+    ],
+    "cat-cow": [
+        *both_sides(angle_range, _TORSO, 70, 110, "Keep your hips over your knees", "Set your knees under your hips",
+                    "posture"),
+        *both_sides(angle_range, _ARM, 150, 180, "Keep your shoulders over your wrists",
+                    "Keep your arms straight under your shoulders", "posture")
+    ],
+    "bridge pose": [
+        *both_sides(angle_range, _TORSO, 150, 180, "Lift your hips higher", "Press through your heels and squeeze "
+                    "your glutes", "depth"),
+        *both_sides(angle_range, _LEG, 70, 120, "Feet are too far from or too close to your hips",
+                    "Walk your feet until your knees are above your ankles")
+    ],
+    "seated twist": [
+        alignment(_NECK, "Sit tall", "Lengthen your spine before you twist")
+    ],
+    "triangle pose": [
+        *both_sides(angle_range, _LEG, 160, 180, "Keep both legs straight", "Engage your thighs without locking "
+                    "your knees", "posture"),
+        *both_sides(angle_range, _ARM, 160, 180, "Keep your arms straight", "Reach out through both hands",
+                    "posture")
+    ]
+}
+
+class CompiledRules:
+    def __init__(self, rules: List[Dict]):
+        """Index arrays for evaluating ``rules`` over landmark arrays in one pass"""
+        self.rules = rules
+        triplets = list(dict.fromkeys(triplet for rule in rules for triplet in rule["joints"]))
+        # Only the landmarks the rules use are read from a frame
+        self.landmarks = sorted({index for triplet in triplets for index in triplet})
+        position = {index: i for i, index in enumerate(self.landmarks)}
+        # Rows: end points a and c, then the vertex b, gathered in one indexing operation
+        self._triplets = np.array([[position[t[k]] for t in triplets] for k in (0, 2, 1)], dtype=np.intp)
+
+        slot = {triplet: i for i, triplet in enumerate(triplets)}
+        self._operands = np.array([[slot[rule["joints"][k]] for rule in rules] for k in (0, -1)], dtype=np.intp)
+        self._mirror = np.array([rule["kind"] == _SYMMETRY for rule in rules], dtype=np.float64)
+        # Bounds in radians, so angles never need converting
+        self._low = np.radians([rule["low"] for rule in rules])
+        self._high = np.radians([rule["high"] for rule in rules])
+
+        # Score = weighted mean over categories of the share of passed rules,
+        # folded into one weight per rule so scoring is a single dot product
+        category = np.array([CATEGORIES.index(rule["category"]) for rule in rules], dtype=np.intp)
+        rules_per_category = np.bincount(category, minlength=len(CATEGORIES))
+        weights = np.array([FORM_CONFIG["score_weights"][name] for name in CATEGORIES], dtype=np.float64)
+        weights[rules_per_category == 0] = 0.0
+        total = weights.sum()
+        self._weight_total = total
+        self._rule_weights = (
+            100 * weights[category] / (rules_per_category[category] * total) if total else np.zeros(len(rules))
+        )
+
+    def points(self, landmarks) -> np.ndarray:
+        """(1, K) used landmark positions as x + iy from a NormalizedLandmarkList or (33, 4) array"""
+        if isinstance(landmarks, np.ndarray):
+            return self._complex(landmarks[None])
+        points = landmarks.landmark
+        return np.array([[complex(points[i].x, points[i].y) for i in self.landmarks]])
+
+    def _complex(self, landmarks: np.ndarray) -> np.ndarray:
+        used = np.asarray(landmarks)[:, self.landmarks].astype(np.float64)
+        return used[..., 0] + 1j * used[..., 1]
+
+    def evaluate(self, points: np.ndarray) -> np.ndarray:
+        """(N, R) mask of passed rules for (N, K) complex positions of the used landmarks"""
+        # The angle at b is the argument of conj(a - b) * (c - b), the same as calculate_angle
+        vectors = points[:, self._triplets[:2]] - points[:, None, self._triplets[2]]
+        turn = np.conj(vectors[:, 0]) * vectors[:, 1]
+        angles = np.abs(np.arctan2(turn.imag, turn.real))
+        # Symmetry rules compare against the mirrored angle; plain angle rules subtract nothing
+        values = np.abs(angles[:, self._operands[0]] - self._mirror * angles[:, self._operands[1]])
+        return (values >= self._low) & (values <= self._high)
+
+    def scores(self, passed: np.ndarray) -> np.ndarray:
+        """(N,) form scores from an (N, R) mask of passed rules"""
+        return np.rint(passed @ self._rule_weights).astype(int)
+
+    def feedback(self, landmarks: np.ndarray) -> List[Dict]:
+        """Form feedback for (N, 33, >=2) landmark arrays"""
+        if not self.rules:
+            return [{"score": 100, "issues": [], "tips": []} for _ in range(len(landmarks))]
+        passed = self.evaluate(self._complex(landmarks))
+        return self._feedback(passed)
+
+    def assess(self, landmarks) -> Dict:
+        """Form feedback for one frame's landmarks"""
+        if not self.rules:
+            return {"score": 100, "issues": [], "tips": []}
+        return self._feedback(self.evaluate(self.points(landmarks)))[0]
+
+    def with_stability(self, form: Dict, sway: float) -> Dict:
+        """Fold a hold's sway (see stability.py) into its form feedback as the stability category"""
+        threshold = FORM_CONFIG["stability_threshold"]
+        # Full marks within the threshold, none at twice the threshold
+        stability = min(1.0, max(0.0, 2.0 - sway / threshold))
+        weight = FORM_CONFIG["score_weights"]["stability"]
+        score = round((form["score"] * self._weight_total + 100 * stability * weight) / (self._weight_total + weight))
+        form = {"score": score, "issues": list(form["issues"]), "tips": list(form["tips"])}
+        if sway > threshold:
+            form["issues"].append("Hold still")
+            form["tips"].append("Breathe steadily and keep your body still")
+        return form
+
+    def _feedback(self, passed: np.ndarray) -> List[Dict]:
+        results = []
+        for score, all_passed, row in zip(self.scores(passed).tolist(), passed.all(axis=1).tolist(), passed):
+            issues, tips = [], []
+            if not all_passed:
+                for i in np.flatnonzero(~row).tolist():
+                    rule = self.rules[i]
+                    if rule["issue"] not in issues:
+                        issues.append(rule["issue"])
+                        tips.append(rule["tip"])
+            results.append({"score": score, "issues": issues, "tips": tips})
+        return results
+
+_compiled: Dict[str, CompiledRules] = {}
+
+def compiled_rules(exercise_type: str) -> CompiledRules:
+    """The compiled rule set for an exercise (an empty one for unknown exercises)"""
+    rules = _compiled.get(exercise_type)
+    if rules is None:
+        rules = _compiled[exercise_type] = CompiledRules(FORM_RULES.get(exercise_type, []))
+    return rules
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Shared-memory frame transport between capture and inference processes
+
+Frames live in a ring of fixed-size slots in one shared memory block.
+Only slot indices and small metadata travel through the queues, so a
+1080p frame is never pickled: the producer writes into a free slot, a
+worker reads it in place and hands the slot back for reuse.
+"""
+
+import multiprocessing as mp
+import os
+import queue
+import time
+from multiprocessing import shared_memory
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from config import PERFORMANCE_CONFIG
+from pose_detector import create_pose_model
+
+_STOP = -1
+
+class SharedFrameRing:
+    def __init__(self, shape: Tuple[int, ...], slots: int, dtype=np.uint8, ctx=None):
+        """Create a ring of ``slots`` frames of ``shape`` in shared memory
+
+        Pass the ring to ``multiprocessing.Process`` as an argument; the
+        child attaches to the same memory and queues. The creating process
+        owns the block and unlinks it on ``close()``.
+        """
+        if slots < 1:
+            raise ValueError("A frame ring needs at least one slot")
+        ctx = ctx or mp.get_context()
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.slots = slots
+        self.frame_bytes = int(np.prod(self.shape)) * self.dtype.itemsize
+        self._shm = shared_memory.SharedMemory(create=True, size=self.frame_bytes * slots)
+        # By pid rather than a flag: a forked child inherits this object as is
+        self._owner_pid = os.getpid()
+        # Free slots are tracked with a semaphore and flags rather than a queue:
+        # a Queue's feeder thread makes a non-blocking get miss just-returned slots
+        self._free_count = ctx.Semaphore(slots)
+        self._free_flags = ctx.Array("b", [1] * slots)
+        self._ready = ctx.Queue()
+        self._attach()
+
+    def _attach(self):
+        self._frames = np.ndarray((self.slots,) + self.shape, dtype=self.dtype, buffer=self._shm.buf)
+
+    def __getstate__(self):
+        return {
+            "name": self._shm.name, "shape": self.shape, "dtype": self.dtype.str,
+            "slots": self.slots, "free_count": self._free_count,
+            "free_flags": self._free_flags, "ready": self._ready
+        }
+
+    def __setstate__(self, state):
+        self.shape = state["shape"]
+        self.dtype = np.dtype(state["dtype"])
+        self.slots = state["slots"]
+        self.frame_bytes = int(np.prod(self.shape)) * self.dtype.itemsize
+        self._shm = shared_memory.SharedMemory(name=state["name"])
+        self._owner_pid = None
+        self._free_count = state["free_count"]
+        self._free_flags = state["free_flags"]
+        self._ready = state["ready"]
+        self._attach()
+
+    # Producer side
+
+    def acquire(self, timeout: Optional[float] = None) -> Optional[int]:
+        """Take a free slot to write into; None if none frees up in time"""
+        if not self._free_count.acquire(block=timeout != 0, timeout=timeout or None):
+            return None
+        with self._free_flags.get_lock():
+            slot = self._free_flags[:].index(1)
+            self._free_flags[slot] = 0
+        return slot
+
+    def frame(self, slot: int) -> np.ndarray:
+        """The frame stored in a slot, as a view into shared memory"""
+        return self._frames[slot]
+
+    def publish(self, slot: int, meta: Dict = None):
+        """Hand a filled slot to the consumers"""
+        self._ready.put((slot, meta))
+
+    def put(self, frame: np.ndarray, meta: Dict = None, timeout: Optional[float] = 0) -> bool:
+        """Copy a frame into a free slot and publish it
+
+        By default this never waits: when every slot is still being
+        processed the frame is dropped and False is returned, so capture
+        is never held up by slow consumers.
+        """
+        if frame.shape != self.shape:
+            raise ValueError(f"Frame shape {frame.shape} does not match ring shape {self.shape}")
+        slot = self.acquire(timeout)
+        if slot is None:
+            return False
+        self._frames[slot][...] = frame
+        self.publish(slot, meta)
+        return True
+
+    def stop(self, consumers: int = 1):
+        """Tell ``consumers`` readers that no more frames are coming"""
+        for _ in range(consumers):
+            self._ready.put((_STOP, None))
+
+    # Consumer side
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Tuple[int, Dict]]:
+        """Next published (slot, meta); None on timeout or once the producer stopped"""
+        try:
+            slot, meta = self._ready.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        if slot == _STOP:
+            return None
+        return slot, meta
+
+    def release(self, slot: int):
+        """Return a slot for reuse once its frame is no longer needed"""
+        with self._free_flags.get_lock():
+            self._free_flags[slot] = 1
+        self._free_count.release()
+
+    def close(self):
+        """Detach from the shared memory; the creating process also frees it"""
+        self._frames = None
+        self._shm.close()
+        if self._owner_pid == os.getpid():
+            self._shm.unlink()
+
+def static_pose_model():
+    """Pose model without cross-frame tracking, so frames from any stream can share it"""
+    return create_pose_model(static_image_mode=True)
+
+def pose_worker(ring: SharedFrameRing, results, model_factory=static_pose_model):
+    """Process target: run the pose model on ring frames in place and send back landmarks
+
+    Each result is ``(meta, pose_landmarks)``; the landmarks are a few
+    hundred bytes, so they can go through a normal queue. Workers finish
+    in any order; ``PoseWorkerPool.get_ordered`` puts the results back in
+    submission order before they reach ``PoseDetector.analyze_landmarks``,
+    whose rep state depends on it.
+    """
+    model = model_factory()
+    try:
+        while True:
+            item = ring.get()
+            if item is None:
+                return
+            slot, meta = item
+            try:
+                output = model.process(cv2.cvtColor(ring.frame(slot), cv2.COLOR_BGR2RGB))
+            finally:
+                ring.release(slot)
+            results.put((meta, output.pose_landmarks))
+    finally:
+        if hasattr(model, "close"):
+            model.close()
+        ring.close()
+
+class PoseWorkerPool:
+    def __init__(self, frame_shape: Tuple[int, ...], workers: int = PERFORMANCE_CONFIG["model_workers"],
+                 slots: int = PERFORMANCE_CONFIG["transport_slots"], model_factory=static_pose_model):
+        """Pose model processes fed through a shared-memory frame ring
+
+        ``workers`` defaults to one per CPU core and ``slots`` to two per
+        worker, enough to keep every worker busy while the next frames
+        are written.
+        """
+        ctx = mp.get_context()
+        self.workers = workers or os.cpu_count() or 1
+        self.ring = SharedFrameRing(frame_shape, slots or 2 * self.workers, ctx=ctx)
+        self.results = ctx.Queue()
+        self.submitted = 0
+        self.dropped = 0
+        self._next_seq = 0
+        self._pending: Dict[int, Tuple[Dict, object]] = {}
+        self._processes = [
+            ctx.Process(target=pose_worker, args=(self.ring, self.results, model_factory),
+                        name=f"pose-worker-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+
+    def start(self) -> "PoseWorkerPool":
+        for process in self._processes:
+            process.start()
+        return self
+
+    def submit(self, frame: np.ndarray, timeout: Optional[float] = 0, **meta) -> bool:
+        """Queue a frame for pose detection; False if it was dropped for lack of a free slot
+
+        Accepted frames are numbered in ``meta["seq"]`` in submission order.
+        """
+        meta["seq"] = self.submitted
+        if self.ring.put(frame, meta, timeout):
+            self.submitted += 1
+            return True
+        self.dropped += 1
+        return False
+
+    def get(self, timeout: Optional[float] = None):
+        """Next ``(meta, pose_landmarks)`` result, in completion order; None on timeout"""
+        try:
+            return self.results.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def get_ordered(self, timeout: Optional[float] = None):
+        """Next ``(meta, pose_landmarks)`` result in submission order; None on timeout
+
+        Results that finish ahead of an earlier frame are held back until
+        that frame's result arrives. Use either this or ``get`` on a pool,
+        not both.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._next_seq not in self._pending:
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0.0)
+            result = self.get(remaining)
+            if result is None:
+                return None
+            self._pending[result[0]["seq"]] = result
+        result = self._pending.pop(self._next_seq)
+        self._next_seq += 1
+        return result
+
+    def close(self, timeout: float = 5.0):
+        """Stop the workers once they finish the frames already submitted"""
+        self.ring.stop(len(self._processes))
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        self.ring.close()
+
+    def __enter__(self) -> "PoseWorkerPool":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+def _echo_worker(transport, source, sink, frames, use_ring):
+    for _ in range(frames):
+        if use_ring:
+            slot, meta = transport.get()
+            sink.put(int(transport.frame(slot)[0, 0, 0]))
+            transport.release(slot)
+        else:
+            sink.put(int(source.get()[0, 0, 0]))
+
+def benchmark(shape=(1080, 1920, 3), frames=200):
+    """Compare moving frames to another process by pickling vs through the ring"""
+    ctx = mp.get_context()
+    frame = np.zeros(shape, np.uint8)
+    for use_ring in (False, True):
+        ring = SharedFrameRing(shape, 4, ctx=ctx) if use_ring else None
+        source, sink = ctx.Queue(maxsize=4), ctx.Queue()
+        worker = ctx.Process(target=_echo_worker, args=(ring, source, sink, frames, use_ring))
+        worker.start()
+        start = time.perf_counter()
+        for i in range(frames):
+            frame[0, 0, 0] = i % 256
+            if use_ring:
+                while not ring.put(frame, {"frame_id": i}, timeout=1.0):
+                    pass
+            else:
+                source.put(frame)
+        for _ in range(frames):
+            sink.get()
+        elapsed = time.perf_counter() - start
+        worker.join()
+        if ring is not None:
+            ring.close()
+        label = "shared memory ring" if use_ring else "pickled queue"
+        print(f"{label:>20}: {frames / elapsed:8.1f} frames/s ({elapsed / frames * 1000:.2f} ms/frame)")
+
+if __name__ == "__main__":
+    print("🚚 Frame transport benchmark (1080p frames)")
+    benchmark()
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Gym mode: serve several cameras from one process with a shared pool of pose models
+
+    python gym_mode.py 0 1 floor_cam.mp4 --exercises pushup squat plank --weights 2 1 1
+"""
+
+import argparse
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import cv2
+
+from camera import Device, StageTimings, ThreadedCapture
+from config import PERFORMANCE_CONFIG
+from pose_detector import PoseDetector, create_pose_model
+
+class Stream:
+    def __init__(self, name: str, source: Device, exercise_type: str = "pushup", weight: int = 1,
+                 deadline: float = PERFORMANCE_CONFIG["frame_deadline"], realtime: bool = True):
+        """One camera: its capture thread, its own rep/form state and its metrics"""
+        if weight < 1:
+            raise ValueError("Stream weight must be a positive integer")
+        self.name = name
+        self.source = source
+        self.exercise_type = exercise_type
+        self.weight = weight
+        self.deadline = deadline
+        self.capture = ThreadedCapture(source, realtime=realtime)
+        self.detector = PoseDetector(load_model=False)
+        self.timings = StageTimings()
+        self.result = None            # (annotated frame, exercise data) of the latest processed frame
+        self.in_flight = False
+        self.finished = False
+        self.processed = 0
+        self.deadline_drops = 0
+        self.started_at = None
+
+    def metrics(self) -> Dict:
+        """Processed fps and where the other captured frames went"""
+        elapsed = time.monotonic() - self.started_at if self.started_at else 0.0
+        stale = self.capture.frames_dropped
+        return {
+            "fps": round(self.processed / elapsed, 1) if elapsed > 0 else 0.0,
+            "captured": self.capture.frames_captured,
+            "processed": self.processed,
+            "dropped": stale + self.deadline_drops,
+            "dropped_stale": stale,
+            "dropped_deadline": self.deadline_drops,
+            "latency_ms": self.timings.summary().get("latency", {}).get("mean_ms", 0.0)
+        }
+
+class FairScheduler:
+    def __init__(self, streams: List[Stream]):
+        """Hand fresh frames to model workers by smooth weighted round-robin
+
+        Only streams with a new frame compete; each gets ``weight`` credit
+        per pick and the winner pays back the total, so over any window a
+        stream of weight 2 is served twice as often as one of weight 1
+        without bursts. A stream has at most one frame in flight, which
+        keeps its rep state updates in order. A frame that waited longer
+        than its stream's deadline is dropped instead of processed late.
+        """
+        self.streams = streams
+        self._credit = {stream.name: 0 for stream in streams}
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def notify(self):
+        """Wake waiting workers (called by the captures on every new frame)"""
+        with self._cond:
+            self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def _pick(self) -> Optional[Stream]:
+        # Caller holds self._cond
+        ready = []
+        for stream in self.streams:
+            if stream.in_flight or stream.finished:
+                continue
+            if stream.capture.has_new_frame():
+                ready.append(stream)
+            elif not stream.capture.running:
+                stream.finished = True
+        if not ready:
+            return None
+        total = sum(stream.weight for stream in ready)
+        for stream in ready:
+            self._credit[stream.name] += stream.weight
+        chosen = max(ready, key=lambda stream: self._credit[stream.name])
+        self._credit[chosen.name] -= total
+        return chosen
+
+    def next_job(self):
+        """Block until a stream is due; returns (stream, frame, timestamp) or None when all are done
+
+        ``frame`` stays valid until ``done(stream)``: the capture never
+        overwrites the slot its last read handed out.
+        """
+        with self._cond:
+            while not self._closed:
+                stream = self._pick()
+                if stream is None:
+                    if all(stream.finished for stream in self.streams):
+                        return None
+                    # Captures notify on every frame; the timeout only guards against a missed wakeup
+                    self._cond.wait(timeout=0.1)
+                    continue
+                ok, frame, _, timestamp = stream.capture.read(timeout=0)
+                if not ok:
+                    continue
+                if time.monotonic() - timestamp > stream.deadline:
+                    stream.deadline_drops += 1
+                    continue
+                stream.in_flight = True
+                return stream, frame, timestamp
+            return None
+
+    def done(self, stream: Stream):
+        with self._cond:
+            stream.in_flight = False
+            self._cond.notify_all()
+
+class GymRunner:
+    def __init__(self, streams: List[Stream], workers: int = PERFORMANCE_CONFIG["model_workers"],
+                 model_factory: Callable = lambda: create_pose_model(static_image_mode=True)):
+        """Run pose detection for many streams on a fixed pool of model workers
+
+        Each worker thread owns one model, and ``workers`` defaults to one
+        per CPU core, so adding cameras adds scheduling load rather than
+        models. The models run in static image mode: they keep no tracking
+        state, so any worker can take the next frame of any stream.
+        """
+        names = [stream.name for stream in streams]
+        if len(set(names)) != len(names):
+            raise ValueError("Stream names must be unique")
+        self.streams = streams
+        self.workers = workers or os.cpu_count() or 1
+        self.model_factory = model_factory
+        self.scheduler = FairScheduler(streams)
+        self._threads = []
+
+    def start(self) -> "GymRunner":
+        started = []
+        try:
+            for stream in self.streams:
+                stream.capture.on_frame = self.scheduler.notify
+                stream.capture.start()
+                stream.started_at = time.monotonic()
+                started.append(stream)
+        except RuntimeError:
+            for stream in started:
+                stream.capture.stop()
+            raise
+        self._threads = [
+            threading.Thread(target=self._work, name=f"pose-worker-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def _work(self):
+        model = self.model_factory()
+        try:
+            while True:
+                job = self.scheduler.next_job()
+                if job is None:
+                    return
+                stream, frame, timestamp = job
+                try:
+                    with stream.timings.time("inference"):
+                        results = model.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+                    with stream.timings.time("analysis"):
+                        stream.result = stream.detector.analyze_landmarks(
+                            frame, results.pose_landmarks, stream.exercise_type
+                        )
+                    stream.timings.record("latency", time.monotonic() - timestamp)
+                    stream.processed += 1
+                finally:
+                    self.scheduler.done(stream)
+        finally:
+            if hasattr(model, "close"):
+                model.close()
+
+    @property
+    def running(self) -> bool:
+        return any(thread.is_alive() for thread in self._threads)
+
+    def wait(self, timeout: float = None) -> bool:
+        """Wait for every source to run out; returns False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+        return not self.running
+
+    def stop(self):
+        self.scheduler.close()
+        for thread in self._threads:
+            thread.join(timeout=5.0)
+        for stream in self.streams:
+            stream.capture.stop()
+
+    def metrics(self) -> Dict[str, Dict]:
+        return {stream.name: stream.metrics() for stream in self.streams}
+
+    def __enter__(self) -> "GymRunner":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+def print_metrics(metrics: Dict[str, Dict]):
+    """Print one line of fps and drop counts per stream"""
+    print(f"{'stream':<24} {'fps':>6} {'captured':>9} {'processed':>10} {'stale':>6} {'late':>6} {'latency':>9}")
+    for name, m in metrics.items():
+        print(f"{name:<24} {m['fps']:>6.1f} {m['captured']:>9} {m['processed']:>10} "
+              f"{m['dropped_stale']:>6} {m['dropped_deadline']:>6} {m['latency_ms']:>7.1f}ms")
+
+def parse_source(source: str) -> Device:
+    return int(source) if source.isdigit() else source
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve several cameras with a shared pose model pool")
+    parser.add_argument("sources", nargs="+", help="Camera indexes or video files")
+    parser.add_argument("--exercises", nargs="+", default=["pushup"],
+                        help="Exercise per source (the last one repeats)")
+    parser.add_argument("--weights", nargs="+", type=int, default=[1],
+                        help="Scheduling weight per source (the last one repeats)")
+    parser.add_argument("--workers", type=int, default=PERFORMANCE_CONFIG["model_workers"],
+                        help="Pose model workers (0: one per CPU core)")
+    parser.add_argument("--deadline", type=float, default=PERFORMANCE_CONFIG["frame_deadline"],
+                        help="Drop frames not picked up within N seconds of capture")
+    parser.add_argument("--report-interval", type=float, default=5.0)
+    parser.add_argument("--display", action="store_true", help="Show each stream in a window")
+    args = parser.parse_args()
+
+    # Workers already use every core; keep OpenCV from adding its own thread pool on top
+    cv2.setNumThreads(1)
+
+    streams = [
+        Stream(
+            name=f"{i}:{source}",
+            source=parse_source(source),
+            exercise_type=args.exercises[min(i, len(args.exercises) - 1)],
+            weight=args.weights[min(i, len(args.weights) - 1)],
+            deadline=args.deadline
+        )
+        for i, source in enumerate(args.sources)
+    ]
+    runner = GymRunner(streams, workers=args.workers)
+    try:
+        runner.start()
+    except RuntimeError as e:
+        print(f"❌ Error: {e}")
+        return
+
+    print(f"🏋️ Gym mode: {len(streams)} streams on {runner.workers} model workers (Ctrl+C to stop)")
+    next_report = time.monotonic() + args.report_interval
+    try:
+        while runner.running:
+            if args.display:
+                for stream in streams:
+                    if stream.result is not None:
+                        cv2.imshow(f"AI Fitness Coach - {stream.name}", stream.result[0])
+                if cv2.waitKey(1) & 0xFF == ord('q'):
+                    break
+            else:
+                time.sleep(0.1)
+            if time.monotonic() >= next_report:
+                print_metrics(runner.metrics())
+                next_report += args.report_interval
+    except KeyboardInterrupt:
+        pass
+    finally:
+        runner.stop()
+        cv2.destroyAllWindows()
+
+    print("\n📊 Final stream metrics:")
+    print_metrics(runner.metrics())
+    for stream in streams:
+        print(f"   {stream.name}: {stream.detector.rep_count} {stream.exercise_type} reps")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+Local pose inference service shared by every session on the machine
+
+    python inference_service.py --workers 4
+
+Sessions send frames over a local connection instead of each running its
+own MediaPipe graph. The service groups requests from all sessions into
+small batches under a latency deadline, runs each batch across a fixed
+pool of model workers and sends every result back to the session that
+asked, whose own rep tracker then updates from the landmarks.
+"""
+
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.connection import Client, Listener
+from typing import Callable, Dict, List, Optional
+
+import cv2
+import numpy as np
+from mediapipe.framework.formats import landmark_pb2
+
+from camera import StageTimings
+from config import INFERENCE_CONFIG
+from frame_transport import static_pose_model
+from pose_detector import PoseDetector
+
+# Wire format: every message is raw bytes (never pickles). A request is a
+# JSON header followed, for "infer", by the frame's pixel buffer; a reply
+# is a JSON header followed by the serialized landmarks (empty if none).
+
+class _Request:
+    __slots__ = ("connection", "request_id", "frame", "enqueued")
+
+    def __init__(self, connection, request_id, frame):
+        self.connection = connection
+        self.request_id = request_id
+        self.frame = frame
+        self.enqueued = time.monotonic()
+
+class _Connection:
+    def __init__(self, conn):
+        self.conn = conn
+        self.send_lock = threading.Lock()
+
+    def reply(self, header: Dict, payload: bytes = b""):
+        with self.send_lock:
+            try:
+                self.conn.send_bytes(json.dumps(header).encode())
+                self.conn.send_bytes(payload)
+            except OSError:
+                pass    # The session went away; nothing to deliver to
+
+class InferenceService:
+    def __init__(self, host: str = INFERENCE_CONFIG["host"], port: int = INFERENCE_CONFIG["port"],
+                 workers: int = INFERENCE_CONFIG["workers"], max_batch: int = INFERENCE_CONFIG["max_batch"],
+                 batch_deadline: float = INFERENCE_CONFIG["batch_deadline"],
+                 model_factory: Callable = static_pose_model):
+        """Micro-batching pose inference server on a local address
+
+        A batch closes when it holds ``max_batch`` frames or its oldest
+        frame has waited ``batch_deadline`` seconds. MediaPipe runs one
+        image per graph call, so a batch is fanned out across ``workers``
+        model threads (default one per CPU core) rather than fused into
+        one tensor; the next batch forms while it runs. Use ``port=0`` to
+        pick a free port and read it back from ``address``.
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.max_batch = max(1, max_batch)
+        self.batch_deadline = batch_deadline
+        self.model_factory = model_factory
+        self.timings = StageTimings()
+        self.requests = 0
+        self.completed = 0
+        self.batches = 0
+        self.max_batch_seen = 0
+        # Listener's default backlog of 1 resets sessions that connect at the same time
+        self._listener = Listener((host, port), backlog=64)
+        self.address = self._listener.address
+        self._queue = queue.Queue()
+        self._models = threading.local()
+        self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="pose-model")
+        self._running = False
+        self._started_at = None
+        self._threads = []
+        self._stats_lock = threading.Lock()
+
+    def start(self) -> "InferenceService":
+        self._running = True
+        self._started_at = time.monotonic()
+        for target, name in ((self._accept_loop, "inference-accept"), (self._batch_loop, "inference-batcher")):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        self._running = False
+        try:
+            # Unblock accept() so the accept thread can see the flag
+            Client(self.address).close()
+        except OSError:
+            pass
+        for thread in self._threads:
+            thread.join(timeout=5.0)
+        self._listener.close()
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self) -> "InferenceService":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def stats(self) -> Dict:
+        """Throughput, batch sizes and where request time went"""
+        timings = self.timings.summary()
+        elapsed = time.monotonic() - self._started_at if self._started_at else 0.0
+        with self._stats_lock:
+            return {
+                "requests": self.requests,
+                "completed": self.completed,
+                "pending": self._queue.qsize(),
+                "throughput_fps": round(self.completed / elapsed, 1) if elapsed > 0 else 0.0,
+                "batches": self.batches,
+                "mean_batch_size": round(self.completed / self.batches, 2) if self.batches else 0.0,
+                "max_batch_size": self.max_batch_seen,
+                "queue_wait_ms": timings.get("queue_wait", {}),
+                "inference_ms": timings.get("inference", {})
+            }
+
+    def _accept_loop(self):
+        while self._running:
+            try:
+                conn = self._listener.accept()
+            except OSError:
+                return
+            if not self._running:
+                conn.close()
+                return
+            threading.Thread(
+                target=self._serve_connection, args=(_Connection(conn),), name="inference-session", daemon=True
+            ).start()
+
+    def _serve_connection(self, connection: _Connection):
+        conn = connection.conn
+        try:
+            while self._running:
+                header = json.loads(conn.recv_bytes())
+                if header.get("type") == "stats":
+                    connection.reply({"id": header.get("id"), "stats": self.stats()})
+                    continue
+                data = conn.recv_bytes()
+                try:
+                    shape = tuple(header["shape"])
+                    if len(shape) != 3 or shape[2] != 3:
+                        raise ValueError(f"Expected an HxWx3 BGR frame, got shape {shape}")
+                    frame = np.frombuffer(data, dtype=np.uint8).reshape(shape)
+                except (KeyError, TypeError, ValueError) as e:
+                    connection.reply({"id": header.get("id"), "error": str(e)})
+                    continue
+                with self._stats_lock:
+                    self.requests += 1
+                self._queue.put(_Request(connection, header.get("id"), frame))
+        except (EOFError, OSError, ValueError):
+            pass
+        finally:
+            conn.close()
+
+    def _next_batch(self) -> List[_Request]:
+        try:
+            first = self._queue.get(timeout=0.1)
+        except queue.Empty:
+            return []
+        batch = [first]
+        close_at = first.enqueued + self.batch_deadline
+        while len(batch) < self.max_batch:
+            remaining = close_at - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _batch_loop(self):
+        in_flight = None
+        while self._running:
+            batch = self._next_batch()
+            if not batch:
+                continue
+            # Keep at most one batch running so the next one can fill up meanwhile
+            if in_flight is not None:
+                for future in in_flight:
+                    future.result()
+                while len(batch) < self.max_batch:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+            dispatched = time.monotonic()
+            for request in batch:
+                self.timings.record("queue_wait", dispatched - request.enqueued)
+            with self._stats_lock:
+                self.batches += 1
+                self.max_batch_seen = max(self.max_batch_seen, len(batch))
+            in_flight = [self._executor.submit(self._infer, request, len(batch)) for request in batch]
+
+    def _infer(self, request: _Request, batch_size: int):
+        model = getattr(self._models, "model", None)
+        if model is None:
+            model = self._models.model = self.model_factory()
+        try:
+            start = time.perf_counter()
+            results = model.process(cv2.cvtColor(request.frame, cv2.COLOR_BGR2RGB))
+            self.timings.record("inference", time.perf_counter() - start)
+        except Exception as e:
+            request.connection.reply({"id": request.request_id, "error": str(e)})
+            return
+        with self._stats_lock:
+            self.completed += 1
+        landmarks = results.pose_landmarks
+        request.connection.reply(
+            {"id": request.request_id, "batch_size": batch_size,
+             "queue_ms": round((time.monotonic() - request.enqueued) * 1000, 2)},
+            landmarks.SerializeToString() if landmarks is not None else b""
+        )
+
+class InferenceClient:
+    def __init__(self, address=(INFERENCE_CONFIG["host"], INFERENCE_CONFIG["port"]),
+                 timeout: float = INFERENCE_CONFIG["timeout"]):
+        """Connection from one session to the inference service (one request at a time)"""
+        self.timeout = timeout
+        self._conn = Client(tuple(address))
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self.last_reply = None
+
+    def _request(self, header: Dict, payload: Optional[bytes] = None):
+        with self._lock:
+            self._next_id += 1
+            header["id"] = self._next_id
+            self._conn.send_bytes(json.dumps(header).encode())
+            if payload is not None:
+                self._conn.send_bytes(payload)
+            deadline = time.monotonic() + self.timeout
+            while True:
+                if not self._conn.poll(max(deadline - time.monotonic(), 0.0)):
+                    raise TimeoutError("Inference service did not reply in time")
+                reply = json.loads(self._conn.recv_bytes())
+                data = self._conn.recv_bytes()
+                if reply.get("id") == header["id"]:
+                    break
+                # A late reply to an earlier request that timed out; nobody waits for it any more
+        if "error" in reply:
+            raise RuntimeError(f"Inference failed: {reply['error']}")
+        return reply, data
+
+    def infer(self, frame: np.ndarray):
+        """Pose landmarks for a BGR frame (a NormalizedLandmarkList), or None if nobody was found"""
+        frame = np.ascontiguousarray(frame, dtype=np.uint8)
+        reply, data = self._request({"type": "infer", "shape": frame.shape}, memoryview(frame).cast("B"))
+        self.last_reply = reply
+        if not data:
+            return None
+        landmarks = landmark_pb2.NormalizedLandmarkList()
+        landmarks.ParseFromString(data)
+        return landmarks
+
+    def stats(self) -> Dict:
+        return self._request({"type": "stats"})[0]["stats"]
+
+    def close(self):
+        self._conn.close()
+
+class RemotePoseDetector(PoseDetector):
+    def __init__(self, address=(INFERENCE_CONFIG["host"], INFERENCE_CONFIG["port"])):
+        """PoseDetector whose model runs in the inference service; rep state stays local"""
+        super().__init__(load_model=False)
+        self.client = InferenceClient(address)
+        self.failed_requests = 0
+
+    def _infer(self, image: np.ndarray):
+        with self.latency.time("inference"):
+            try:
+                return self.client.infer(image)
+            except (TimeoutError, RuntimeError, OSError, EOFError):
+                # A slow, failing or vanished service costs this frame its detection, not the session
+                self.failed_requests += 1
+                return None
+
+def make_pose_detector() -> PoseDetector:
+    """Detector for a new session: served by the inference service when enabled and reachable"""
+    if INFERENCE_CONFIG["enabled"]:
+        try:
+            return RemotePoseDetector()
+        except OSError:
+            pass    # Service not running; fall back to a local model
+    return PoseDetector()
+
+def _serve(conn, kwargs):
+    service = InferenceService(**kwargs).start()
+    conn.send(service.address)
+    conn.recv()     # Any message (or EOF) means shut down
+    service.stop()
+
+def start_service_process(**kwargs):
+    """Run an InferenceService in a child process; returns (process, address, stop)"""
+    import multiprocessing as mp
+
+    parent, child = mp.Pipe()
+    process = mp.Process(target=_serve, args=(child, kwargs), name="inference-service", daemon=True)
+    process.start()
+    address = parent.recv()
+
+    def stop(timeout: float = 5.0):
+        try:
+            parent.send(None)
+        except OSError:
+            pass
+        process.join(timeout)
+        if process.is_alive():
+            process.terminate()
+
+    return process, address, stop
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared local pose inference service")
+    parser.add_argument("--host", default=INFERENCE_CONFIG["host"])
+    parser.add_argument("--port", type=int, default=INFERENCE_CONFIG["port"])
+    parser.add_argument("--workers", type=int, default=INFERENCE_CONFIG["workers"],
+                        help="Pose model threads (0: one per CPU core)")
+    parser.add_argument("--max-batch", type=int, default=INFERENCE_CONFIG["max_batch"])
+    parser.add_argument("--batch-deadline", type=float, default=INFERENCE_CONFIG["batch_deadline"],
+                        help="Seconds the oldest frame may wait for its batch to fill")
+    parser.add_argument("--report-interval", type=float, default=10.0)
+    args = parser.parse_args()
+
+    service = InferenceService(args.host, args.port, args.workers, args.max_batch, args.batch_deadline)
+    service.start()
+    print(f"🧠 Inference service on {service.address[0]}:{service.address[1]} "
+          f"with {service.workers} workers (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(args.report_interval)
+            stats = service.stats()
+            wait = stats["queue_wait_ms"]
+            print(f"{stats['throughput_fps']:.1f} fps | {stats['completed']} frames in {stats['batches']} batches "
+                  f"(avg {stats['mean_batch_size']}, max {stats['max_batch_size']}) | "
+                  f"queue wait {wait.get('mean_ms', 0)} ms avg, {wait.get('max_ms', 0)} ms max")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.stop()
+
+if __name__ == "__main__":
+    main()
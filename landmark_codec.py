@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Compact codec for pose landmark streams (recordings and over-the-wire traffic)
+
+Each frame is 33 landmarks x (x, y, z, visibility). Coordinates are
+quantized to int16 in steps of 1/16384 (max error ~3e-5 within
+[-2, 2)), visibility to uint8 in steps of 1/255. Every value is then
+delta-encoded against the previous frame and frames are packed into
+length-prefixed blocks, optionally zlib-compressed:
+
+    uint32 length of the rest of the block
+    uint8  flags (1: zlib, 2: has timestamps)
+    uint16 frame count N
+    payload:
+        uint8[N]         1 if the frame has a pose, 0 if nobody was seen
+        int16[33, 3, N]  coordinate deltas, each landmark's series contiguous
+        uint8[33, N]     visibility deltas
+        float64 + uint32[N]  base timestamp and per-frame offsets in ms (optional)
+
+Every block starts from absolute values, so blocks decode independently
+and a stream can be cut or resumed at any block boundary.
+
+    python landmark_codec.py    # size and throughput benchmark
+"""
+
+import json
+import struct
+import time
+import zlib
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+from mediapipe.framework.formats import landmark_pb2
+
+from config import LANDMARK_CODEC_CONFIG
+from pose_detector import LANDMARK_COUNT, LANDMARK_FIELDS
+
+COORDINATE_SCALE = 16384        # int16 steps per unit of normalized coordinate
+VISIBILITY_SCALE = 255          # uint8 steps per unit of visibility
+MAX_COORDINATE_ERROR = 0.5 / COORDINATE_SCALE
+MAX_VISIBILITY_ERROR = 0.5 / VISIBILITY_SCALE
+
+FLAG_ZLIB = 1
+FLAG_TIMESTAMPS = 2
+
+_HEADER = struct.Struct("<IBH")
+_BLOCK_LIMIT = 0xFFFF           # frames per block (uint16 count)
+
+def landmarks_to_array(landmarks) -> np.ndarray:
+    """(33, 4) float32 array of x, y, z, visibility from a NormalizedLandmarkList"""
+    return np.array(
+        [(point.x, point.y, point.z, point.visibility) for point in landmarks.landmark], dtype=np.float32
+    )
+
+def array_to_landmarks(array: np.ndarray):
+    """NormalizedLandmarkList from a (33, 4) array (None for a NaN frame)"""
+    if not np.isfinite(array).all():
+        return None
+    landmarks = landmark_pb2.NormalizedLandmarkList()
+    for x, y, z, visibility in np.asarray(array, dtype=np.float64).tolist():
+        landmarks.landmark.add(x=x, y=y, z=z, visibility=visibility)
+    return landmarks
+
+def encode_block(frames: np.ndarray, timestamps: np.ndarray = None,
+                 compress: bool = LANDMARK_CODEC_CONFIG["compress"]) -> bytes:
+    """Encode (N, 33, 4) landmark frames (NaN frames = nobody seen) into one block"""
+    frames = np.asarray(frames, dtype=np.float32)
+    if frames.ndim != 3 or frames.shape[1:] != (LANDMARK_COUNT, len(LANDMARK_FIELDS)):
+        raise ValueError(f"Expected landmarks of shape (N, {LANDMARK_COUNT}, 4), got {frames.shape}")
+    count = len(frames)
+    if not 0 < count <= _BLOCK_LIMIT:
+        raise ValueError(f"A block holds 1 to {_BLOCK_LIMIT} frames, got {count}")
+
+    present = np.isfinite(frames).all(axis=(1, 2))
+    frames = np.where(present[:, None, None], frames, 0.0)
+    # Missing frames repeat the last pose so they cost zero deltas
+    last_seen = np.maximum.accumulate(np.where(present, np.arange(count), 0))
+    frames = frames[last_seen]
+
+    coordinates = np.clip(np.rint(frames[..., :3] * COORDINATE_SCALE), -32768, 32767).astype(np.int16)
+    visibility = np.clip(np.rint(frames[..., 3] * VISIBILITY_SCALE), 0, 255).astype(np.uint8)
+    # Deltas wrap around in the integer type, so the decoder's running sum is exact
+    coordinate_deltas = np.diff(coordinates, axis=0, prepend=np.int16(0)).astype(np.int16)
+    visibility_deltas = np.diff(visibility, axis=0, prepend=np.uint8(0)).astype(np.uint8)
+
+    parts = [
+        present.astype(np.uint8).tobytes(),
+        np.ascontiguousarray(coordinate_deltas.transpose(1, 2, 0)).astype("<i2").tobytes(),
+        np.ascontiguousarray(visibility_deltas.T).tobytes()
+    ]
+    flags = 0
+    if timestamps is not None:
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        if timestamps.shape != (count,):
+            raise ValueError("Expected one timestamp per frame")
+        base = float(timestamps[0])
+        offsets = np.rint((timestamps - base) * 1000)
+        if offsets.min() < 0 or offsets.max() > 0xFFFFFFFF:
+            raise ValueError("Timestamps in a block must not go backwards")
+        parts.append(struct.pack("<d", base) + offsets.astype("<u4").tobytes())
+        flags |= FLAG_TIMESTAMPS
+    payload = b"".join(parts)
+    if compress:
+        payload = zlib.compress(payload, LANDMARK_CODEC_CONFIG["compression_level"])
+        flags |= FLAG_ZLIB
+    return _HEADER.pack(len(payload) + _HEADER.size - 4, flags, count) + payload
+
+def decode_block(data, offset: int = 0) -> Tuple[np.ndarray, Optional[np.ndarray], int]:
+    """Decode the block at ``offset``; returns (frames, timestamps or None, offset of the next block)"""
+    if len(data) - offset < _HEADER.size:
+        raise ValueError("Truncated landmark block header")
+    length, flags, count = _HEADER.unpack_from(data, offset)
+    end = offset + 4 + length
+    if end > len(data) or length < _HEADER.size - 4:
+        raise ValueError("Truncated landmark block")
+    payload = bytes(data[offset + _HEADER.size:end])
+
+    coordinate_values = LANDMARK_COUNT * 3 * count
+    expected = count + 2 * coordinate_values + LANDMARK_COUNT * count
+    if flags & FLAG_TIMESTAMPS:
+        expected += 8 + 4 * count
+    if flags & FLAG_ZLIB:
+        # Blocks come from clients: never inflate past the size the header allows
+        decompressor = zlib.decompressobj()
+        try:
+            payload = decompressor.decompress(payload, expected + 1)
+        except zlib.error as e:
+            raise ValueError(f"Corrupt landmark block: {e}") from e
+        if decompressor.unconsumed_tail or decompressor.unused_data:
+            raise ValueError(f"Landmark block inflates past {expected} bytes")
+    if len(payload) != expected:
+        raise ValueError(f"Landmark block payload is {len(payload)} bytes, expected {expected}")
+
+    present = np.frombuffer(payload, dtype=np.uint8, count=count).astype(bool)
+    position = count
+    coordinate_deltas = np.frombuffer(payload, dtype="<i2", count=coordinate_values, offset=position)
+    position += 2 * coordinate_values
+    visibility_deltas = np.frombuffer(payload, dtype=np.uint8, count=LANDMARK_COUNT * count, offset=position)
+    position += LANDMARK_COUNT * count
+
+    coordinates = np.cumsum(coordinate_deltas.reshape(LANDMARK_COUNT, 3, count), axis=2, dtype=np.int16)
+    visibility = np.cumsum(visibility_deltas.reshape(LANDMARK_COUNT, count), axis=1, dtype=np.uint8)
+    frames = np.empty((count, LANDMARK_COUNT, len(LANDMARK_FIELDS)), dtype=np.float32)
+    frames[..., :3] = coordinates.transpose(2, 0, 1) / np.float32(COORDINATE_SCALE)
+    frames[..., 3] = visibility.T / np.float32(VISIBILITY_SCALE)
+    frames[~present] = np.nan
+
+    timestamps = None
+    if flags & FLAG_TIMESTAMPS:
+        (base,) = struct.unpack_from("<d", payload, position)
+        offsets = np.frombuffer(payload, dtype="<u4", count=count, offset=position + 8)
+        timestamps = base + offsets / 1000.0
+    return frames, timestamps, end
+
+def iter_blocks(data) -> Iterator[Tuple[np.ndarray, Optional[np.ndarray]]]:
+    """Decode consecutive blocks from a buffer"""
+    offset = 0
+    while offset < len(data):
+        frames, timestamps, offset = decode_block(data, offset)
+        yield frames, timestamps
+
+def encode_landmarks(frames: np.ndarray, timestamps: np.ndarray = None,
+                     block_frames: int = LANDMARK_CODEC_CONFIG["block_frames"],
+                     compress: bool = LANDMARK_CODEC_CONFIG["compress"]) -> bytes:
+    """Encode any number of frames as a sequence of blocks"""
+    frames = np.asarray(frames, dtype=np.float32)
+    block_frames = min(max(1, block_frames), _BLOCK_LIMIT)
+    return b"".join(
+        encode_block(
+            frames[start:start + block_frames],
+            None if timestamps is None else np.asarray(timestamps)[start:start + block_frames],
+            compress
+        )
+        for start in range(0, len(frames), block_frames)
+    )
+
+def decode_landmarks(data) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Decode a sequence of blocks into (frames, timestamps or None)"""
+    blocks = list(iter_blocks(data))
+    if not blocks:
+        return np.empty((0, LANDMARK_COUNT, len(LANDMARK_FIELDS)), dtype=np.float32), None
+    frames = np.concatenate([block_frames for block_frames, _ in blocks])
+    if any(block_timestamps is None for _, block_timestamps in blocks):
+        return frames, None
+    return frames, np.concatenate([block_timestamps for _, block_timestamps in blocks])
+
+class LandmarkEncoder:
+    def __init__(self, block_frames: int = LANDMARK_CODEC_CONFIG["block_frames"],
+                 compress: bool = LANDMARK_CODEC_CONFIG["compress"]):
+        """Incremental encoder: collect frames as they arrive, emit a block every ``block_frames``"""
+        self.block_frames = min(max(1, block_frames), _BLOCK_LIMIT)
+        self.compress = compress
+        self._frames: List[np.ndarray] = []
+        self._timestamps: List[float] = []
+
+    def add(self, landmarks, timestamp: float = None) -> Optional[bytes]:
+        """Add one frame (NormalizedLandmarkList, (33, 4) array, or None); returns a block when one is full"""
+        if landmarks is None:
+            array = np.full((LANDMARK_COUNT, len(LANDMARK_FIELDS)), np.nan, dtype=np.float32)
+        elif hasattr(landmarks, "landmark"):
+            array = landmarks_to_array(landmarks)
+        else:
+            array = np.asarray(landmarks, dtype=np.float32)
+        self._frames.append(array)
+        self._timestamps.append(time.time() if timestamp is None else timestamp)
+        if len(self._frames) >= self.block_frames:
+            return self.flush()
+        return None
+
+    def flush(self) -> bytes:
+        """Encode whatever is pending (b"" if nothing)"""
+        if not self._frames:
+            return b""
+        block = encode_block(np.stack(self._frames), np.array(self._timestamps), self.compress)
+        self._frames, self._timestamps = [], []
+        return block
+
+def synthetic_motion(frames: int = 900, fps: float = 30.0, noise: float = 0.002, seed: int = 0):
+    """Smooth exercise-like landmark motion with detector jitter, as (frames, timestamps)"""
+    rng = np.random.default_rng(seed)
+    base = rng.uniform(0.2, 0.8, (LANDMARK_COUNT, 3)).astype(np.float32)
+    base[:, 2] -= 0.5
+    phase = rng.uniform(0, 2 * np.pi, (LANDMARK_COUNT, 3))
+    amplitude = rng.uniform(0.0, 0.1, (LANDMARK_COUNT, 3))
+    t = np.arange(frames) / fps
+    motion = amplitude * np.sin(2 * np.pi * 0.5 * t[:, None, None] + phase)
+    data = np.empty((frames, LANDMARK_COUNT, 4), dtype=np.float32)
+    data[..., :3] = base + motion + rng.normal(0, noise, (frames, LANDMARK_COUNT, 3))
+    data[..., 3] = np.clip(0.9 + rng.normal(0, 0.03, (frames, LANDMARK_COUNT)), 0, 1)
+    return data, 1_700_000_000.0 + t
+
+def benchmark(frames: int = 9000):
+    """Compare encoded size and encode/decode throughput against plain representations"""
+    data, timestamps = synthetic_motion(frames)
+    as_json = len(json.dumps([
+        [{"x": float(x), "y": float(y), "z": float(z), "visibility": float(v)} for x, y, z, v in frame]
+        for frame in data[:300].tolist()
+    ]).encode()) * frames / 300
+    sizes = {
+        "JSON": as_json,
+        "float64": data.astype(np.float64).nbytes,
+        "float16": data.astype(np.float16).nbytes
+    }
+    print(f"{'representation':<22} {'bytes/frame':>12} {'KB/s @30fps':>12} {'vs float64':>11}")
+    for label, size in sizes.items():
+        print(f"{label:<22} {size / frames:>12.1f} {size / frames * 30 / 1024:>12.2f} "
+              f"{sizes['float64'] / size:>10.1f}x")
+
+    for compress in (False, True):
+        start = time.perf_counter()
+        encoded = encode_landmarks(data, timestamps, compress=compress)
+        encode_time = time.perf_counter() - start
+        start = time.perf_counter()
+        decoded, _ = decode_landmarks(encoded)
+        decode_time = time.perf_counter() - start
+        error = np.abs(decoded[..., :3] - data[..., :3]).max()
+        label = "codec + zlib" if compress else "codec"
+        print(f"{label:<22} {len(encoded) / frames:>12.1f} {len(encoded) / frames * 30 / 1024:>12.2f} "
+              f"{sizes['float64'] / len(encoded):>10.1f}x | encode {frames / encode_time:,.0f} fps, "
+              f"decode {frames / decode_time:,.0f} fps, max error {error:.1e}")
+
+if __name__ == "__main__":
+    print("🗜️ Landmark codec benchmark (30 fps synthetic motion, 1 s blocks)")
+    benchmark()
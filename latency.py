@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Per-stage frame latency histograms
+
+Each stage of frame processing (decode, color conversion, pose model,
+exercise logic, form rules, annotation) is timed with the monotonic
+``time.perf_counter_ns`` clock and recorded into an HDR-style histogram:
+buckets are exact below 2**precision microseconds and then keep
+``precision`` significant bits, so any latency from a microsecond to
+minutes is kept to within about 1.6% in a fixed array of counters.
+Recording is an index computation and one increment, cheap enough to
+leave on for every frame.
+
+Every ``LatencyRecorder`` (one per session's PoseDetector) also records
+into the process-wide ``PROCESS_LATENCY``, which ``start_metrics_server``
+serves in the Prometheus text format on localhost:
+
+    curl http://127.0.0.1:8770/metrics
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from config import METRICS_CONFIG
+
+# Stages timed by PoseDetector and the apps, in pipeline order
+STAGES = ("decode", "color_convert", "inference", "detect", "assess_form", "annotate", "frame")
+
+class LatencyHistogram:
+    def __init__(self, precision: int = METRICS_CONFIG["precision"],
+                 max_seconds: float = METRICS_CONFIG["max_seconds"]):
+        """Log-linear histogram of durations in microseconds
+
+        Values below ``2**precision`` µs get a bucket each; above that every
+        power of two is split into ``2**(precision-1)`` buckets. Longer
+        durations than ``max_seconds`` land in the last bucket.
+        """
+        self.precision = precision
+        self._half = 1 << (precision - 1)
+        self._max_index = self._index(int(max_seconds * 1e6))
+        self.counts = [0] * (self._max_index + 1)
+        self.count = 0
+        self.total_us = 0
+        self.max_us = 0
+        self._lock = threading.Lock()
+
+    def _index(self, micros: int) -> int:
+        shift = micros.bit_length() - self.precision
+        if shift <= 0:
+            return micros
+        return shift * self._half + (micros >> shift)
+
+    def _upper(self, index: np.ndarray) -> np.ndarray:
+        """Largest value (µs) that falls into each bucket"""
+        index = np.asarray(index, dtype=np.int64)
+        shift = np.maximum(index // self._half - 1, 0)
+        low = np.where(index < 2 * self._half, index, (index % self._half + self._half) << shift)
+        return low + (1 << shift) - 1
+
+    def record(self, nanoseconds: int):
+        micros = nanoseconds // 1000
+        index = self._index(micros)
+        with self._lock:
+            self.counts[index if index < self._max_index else self._max_index] += 1
+            self.count += 1
+            self.total_us += micros
+            if micros > self.max_us:
+                self.max_us = micros
+
+    def quantiles(self, quantiles: List[float]) -> List[float]:
+        """Durations in milliseconds below which each fraction of samples fall"""
+        with self._lock:
+            counts = np.array(self.counts)
+        cumulative = np.cumsum(counts)
+        if not cumulative[-1]:
+            return [0.0] * len(quantiles)
+        ranks = np.maximum(np.ceil(np.asarray(quantiles) * cumulative[-1]), 1)
+        upper = self._upper(np.searchsorted(cumulative, ranks))
+        return (np.minimum(upper, self.max_us) / 1000).tolist()
+
+    def cumulative_counts(self, bounds_seconds: List[float]) -> List[int]:
+        """Samples at or below each bound, for Prometheus histogram buckets"""
+        with self._lock:
+            counts = np.array(self.counts)
+        cumulative = np.cumsum(counts)
+        upper = self._upper(np.arange(len(counts)))
+        return [int(cumulative[i - 1]) if i else 0
+                for i in np.searchsorted(upper, np.asarray(bounds_seconds) * 1e6, side="right").tolist()]
+
+    def summary(self) -> Dict:
+        """Number of samples, mean, p50/p90/p99 and max in milliseconds"""
+        p50, p90, p99 = self.quantiles([0.5, 0.9, 0.99])
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_us / self.count / 1000, 3) if self.count else 0.0,
+            "p50_ms": round(p50, 3),
+            "p90_ms": round(p90, 3),
+            "p99_ms": round(p99, 3),
+            "max_ms": round(self.max_us / 1000, 3)
+        }
+
+class LatencyRecorder:
+    def __init__(self, parent: Optional["LatencyRecorder"] = None):
+        """Histograms per stage; samples are also recorded into ``parent`` (e.g. the process-wide recorder)"""
+        self.parent = parent
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, stage: str) -> LatencyHistogram:
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(stage, LatencyHistogram())
+        return histogram
+
+    def record(self, stage: str, nanoseconds: int):
+        """Record a duration measured with ``time.perf_counter_ns``"""
+        if not METRICS_CONFIG["enabled"]:
+            return
+        self.histogram(stage).record(nanoseconds)
+        if self.parent is not None:
+            self.parent.record(stage, nanoseconds)
+
+    @contextmanager
+    def time(self, stage: str):
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter_ns() - start)
+
+    def summary(self) -> Dict[str, Dict]:
+        """Per stage: number of samples, mean, p50/p90/p99 and max in milliseconds"""
+        order = {stage: i for i, stage in enumerate(STAGES)}
+        return {
+            stage: self.histograms[stage].summary()
+            for stage in sorted(self.histograms, key=lambda stage: order.get(stage, len(order)))
+        }
+
+PROCESS_LATENCY = LatencyRecorder()
+
+# Prometheus histogram bucket bounds (seconds)
+PROMETHEUS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+def prometheus_text(recorder: LatencyRecorder = PROCESS_LATENCY) -> str:
+    """Stage latencies in the Prometheus text exposition format"""
+    name = "fitness_coach_stage_latency_seconds"
+    lines = [f"# HELP {name} Time spent in each frame processing stage.", f"# TYPE {name} histogram"]
+    for stage, histogram in list(recorder.histograms.items()):
+        label = f'stage="{stage}"'
+        for bound, count in zip(PROMETHEUS_BUCKETS, histogram.cumulative_counts(list(PROMETHEUS_BUCKETS))):
+            lines.append(f'{name}_bucket{{{label},le="{bound}"}} {count}')
+        lines.append(f'{name}_bucket{{{label},le="+Inf"}} {histogram.count}')
+        lines.append(f"{name}_sum{{{label}}} {histogram.total_us / 1e6}")
+        lines.append(f"{name}_count{{{label}}} {histogram.count}")
+    return "\n".join(lines) + "\n"
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = prometheus_text().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass    # Scrapes every few seconds would flood the app's console
+
+_server: Optional[ThreadingHTTPServer] = None
+_server_lock = threading.Lock()
+
+def start_metrics_server(host: str = METRICS_CONFIG["host"],
+                         port: int = METRICS_CONFIG["port"]) -> Optional[ThreadingHTTPServer]:
+    """Serve ``/metrics`` for this process on a background thread (once per process)
+
+    Returns None if the port is taken, e.g. by another app on the same
+    machine; ``port=0`` picks a free one (see ``server_address``).
+    """
+    global _server
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError:
+                return None
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+        return _server
+
+def stop_metrics_server():
+    global _server
+    with _server_lock:
+        if _server is not None:
+            _server.shutdown()
+            _server.server_close()
+            _server = None
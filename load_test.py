@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Load test for the WebSocket frame API
+
+    python api_server.py &
+    python load_test.py --clients 8 --duration 20 --json-only
+    python load_test.py --clients 1000 --landmarks 10
+
+Every client streams JPEG frames over its own connection, keeping
+``--in-flight`` frames outstanding, and times each frame from send to
+its JSON result. With ``--landmarks N`` clients send batches of N
+landmark frames instead, as on-device pose estimation would (add
+``--codec`` to send them through ``landmark_codec``). Sustained
+fps and latency percentiles are reported for the whole run.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from typing import Dict, List
+
+import cv2
+import numpy as np
+from websockets.asyncio.client import connect
+from websockets.exceptions import ConnectionClosed
+
+from config import API_CONFIG
+from landmark_codec import encode_block
+
+def load_frames(source: str = None, count: int = 30, size=(640, 480)) -> List[bytes]:
+    """JPEG frames from a video or image file, or synthetic frames without one"""
+    frames = []
+    if source:
+        cap = cv2.VideoCapture(source)
+        while len(frames) < count:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(cv2.imencode(".jpg", frame)[1].tobytes())
+        cap.release()
+        if not frames:
+            raise RuntimeError(f"Could not read frames from {source!r}")
+        return frames
+    rng = np.random.default_rng(0)
+    for _ in range(count):
+        frame = rng.integers(0, 255, (size[1], size[0], 3), dtype=np.uint8)
+        frames.append(cv2.imencode(".jpg", frame)[1].tobytes())
+    return frames
+
+def landmark_batch(batch: int) -> np.ndarray:
+    """Landmarks for a batch of frames alternating between two poses"""
+    rng = np.random.default_rng(0)
+    poses = rng.random((2, 33, 4), dtype=np.float32)
+    return np.stack([poses[i % 2] for i in range(batch)])
+
+def percentile(values: List[float], pct: float) -> float:
+    return float(np.percentile(values, pct)) if values else 0.0
+
+async def run_client(url: str, frames: List[bytes], deadline: float, in_flight: int,
+                     json_only: bool, exercise_type: str, latencies: List[float], counts: Dict,
+                     landmarks: int = 0, codec: bool = False):
+    try:
+        async with connect(url, max_size=API_CONFIG["max_frame_bytes"]) as websocket:
+            config = {
+                "type": "config", "exercise_type": exercise_type,
+                "response": "json" if json_only else "annotated"
+            }
+            if landmarks:
+                config.update(frame_format="landmarks", dtype="codec" if codec else "float16")
+                batch = landmark_batch(landmarks)
+                payload = batch.astype("<f2").tobytes()
+            await websocket.send(json.dumps(config))
+            sent_at = {}
+            window = asyncio.Semaphore(in_flight)
+
+            async def send_frames():
+                frame_id = 0
+                while time.monotonic() < deadline:
+                    await window.acquire()
+                    frame_id += 1
+                    sent_at[frame_id] = time.monotonic()
+                    if landmarks:
+                        timestamps = time.time() + np.arange(landmarks, dtype="<f8") / 30
+                        if codec:
+                            await websocket.send(encode_block(batch, timestamps))
+                        else:
+                            await websocket.send(timestamps.tobytes() + payload)
+                    else:
+                        await websocket.send(frames[frame_id % len(frames)])
+                return frame_id
+
+            sender = asyncio.create_task(send_frames())
+            received = 0
+            try:
+                # A sender that failed (e.g. the connection closed mid-send) ends the loop too
+                while not (sender.done() and (sender.exception() or received >= sender.result())):
+                    try:
+                        message = await asyncio.wait_for(websocket.recv(), timeout=1.0)
+                    except asyncio.TimeoutError:
+                        continue
+                    if isinstance(message, bytes):
+                        continue    # Annotated frame following its JSON result
+                    reply = json.loads(message)
+                    if "frame" not in reply:
+                        counts["errors"] += 1
+                        continue
+                    received += 1
+                    if reply["type"] == "error":
+                        counts["errors"] += 1
+                    else:
+                        latencies.append(time.monotonic() - sent_at.pop(reply["frame"]))
+                        counts["frames"] += reply.get("frames", 1)
+                    window.release()
+            finally:
+                sender.cancel()
+            if sender.exception():
+                raise sender.exception()
+    except (ConnectionClosed, OSError):
+        # A dropped or refused connection counts as an error; the other clients keep going
+        counts["errors"] += 1
+
+async def run_load_test(url: str, clients: int, duration: float, in_flight: int,
+                        json_only: bool, exercise_type: str, frames: List[bytes], landmarks: int = 0,
+                        codec: bool = False) -> Dict:
+    latencies, counts = [], {"frames": 0, "errors": 0}
+    start = time.monotonic()
+    await asyncio.gather(*(
+        run_client(url, frames, start + duration, in_flight, json_only, exercise_type, latencies, counts,
+                   landmarks, codec)
+        for _ in range(clients)
+    ))
+    elapsed = time.monotonic() - start
+    return {
+        "clients": clients,
+        "frames": counts["frames"],
+        "errors": counts["errors"],
+        "fps": round(counts["frames"] / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "max_ms": round(max(latencies, default=0) * 1000, 1)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the WebSocket frame API")
+    parser.add_argument("--url", default=f"ws://{API_CONFIG['host']}:{API_CONFIG['port']}/ws")
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to keep sending")
+    parser.add_argument("--in-flight", type=int, default=2, help="Outstanding frames per client")
+    parser.add_argument("--json-only", action="store_true", help="Skip annotated frames in replies")
+    parser.add_argument("--exercise", default="pushup")
+    parser.add_argument("--source", help="Video or image file to send (default: synthetic frames)")
+    parser.add_argument("--landmarks", type=int, default=0, metavar="N",
+                        help="Send batches of N landmark frames instead of JPEGs")
+    parser.add_argument("--codec", action="store_true", help="Encode landmark batches with landmark_codec")
+    args = parser.parse_args()
+
+    frames = [] if args.landmarks else load_frames(args.source)
+    print(f"🔥 {args.clients} clients x {args.in_flight} in flight for {args.duration:.0f}s against {args.url}")
+    result = asyncio.run(run_load_test(
+        args.url, args.clients, args.duration, args.in_flight, args.json_only, args.exercise, frames,
+        args.landmarks, args.codec
+    ))
+    print(f"📊 {result['frames']} frames, {result['errors']} errors | {result['fps']} fps sustained | "
+          f"latency p50 {result['p50_ms']} ms, p99 {result['p99_ms']} ms, max {result['max_ms']} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+import csv
+import json
+import os
+import threading
+from datetime import date, datetime
+from typing import Callable, Dict, Iterator, List, Optional, Union
+
+from config import STORAGE_CONFIG
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+EXPORT_COLUMNS = [
+    "id", "user_id", "timestamp", "date", "exercise_type", "reps",
+    "duration_minutes", "form_score", "calories_estimate"
+]
+
+def _parquet_schema():
+    return pa.schema([
+        ("id", pa.string()),
+        ("user_id", pa.string()),
+        ("timestamp", pa.string()),
+        ("date", pa.string()),
+        ("exercise_type", pa.string()),
+        ("reps", pa.int64()),
+        ("duration_minutes", pa.float64()),
+        ("form_score", pa.float64()),
+        ("calories_estimate", pa.float64()),
+    ])
+
+def _date_key(value) -> Optional[str]:
+    """Normalize a date/datetime/ISO string to a sortable 'YYYY-MM-DD' key"""
+    if value is None:
+        return None
+    if isinstance(value, (date, datetime)):
+        return value.strftime("%Y-%m-%d")
+    return str(value)[:10]
+
+def iter_log_chunks(log_files: Union[str, List[str]],
+                    chunk_size: int = STORAGE_CONFIG["export_chunk_size"],
+                    start_date=None, end_date=None, exercise_type: str = None,
+                    progress: Callable[[int, int], None] = None) -> Iterator[List[Dict]]:
+    """Stream filtered log entries from one or more log files in chunks
+
+    Only one chunk of at most ``chunk_size`` entries is held in memory at a
+    time. ``progress(bytes_read, total_bytes)`` is called after every chunk.
+    """
+    if isinstance(log_files, str):
+        log_files = [log_files]
+    log_files = [path for path in log_files if os.path.exists(path)]
+    start_key, end_key = _date_key(start_date), _date_key(end_date)
+    total_bytes = sum(os.path.getsize(path) for path in log_files)
+    bytes_read = 0
+    chunk = []
+    for log_file in log_files:
+        with open(log_file, 'rb') as f:
+            for line in f:
+                bytes_read += len(line)
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                entry_date = entry.get("date", "")
+                if start_key and entry_date < start_key:
+                    continue
+                if end_key and entry_date > end_key:
+                    continue
+                if exercise_type and entry.get("exercise_type") != exercise_type:
+                    continue
+                chunk.append(entry)
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+                    if progress:
+                        progress(min(bytes_read, total_bytes), total_bytes)
+    if chunk:
+        yield chunk
+    if progress:
+        progress(total_bytes, total_bytes)
+
+def _write_csv(chunks: Iterator[List[Dict]], filename: str) -> int:
+    rows = 0
+    with open(filename, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=EXPORT_COLUMNS, extrasaction='ignore')
+        writer.writeheader()
+        for chunk in chunks:
+            writer.writerows(chunk)
+            rows += len(chunk)
+    return rows
+
+def _write_jsonl(chunks: Iterator[List[Dict]], filename: str) -> int:
+    rows = 0
+    with open(filename, 'w') as f:
+        for chunk in chunks:
+            f.writelines(json.dumps(entry) + "\n" for entry in chunk)
+            rows += len(chunk)
+    return rows
+
+def _write_parquet(chunks: Iterator[List[Dict]], filename: str) -> int:
+    schema = _parquet_schema()
+    rows = 0
+    # One row group per chunk keeps the writer's buffer bounded by chunk_size
+    with pq.ParquetWriter(filename, schema) as writer:
+        for chunk in chunks:
+            columns = {name: [entry.get(name) for entry in chunk] for name in EXPORT_COLUMNS}
+            writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+            rows += len(chunk)
+    return rows
+
+EXPORT_WRITERS = {
+    "csv": _write_csv,
+    "jsonl": _write_jsonl,
+    "parquet": _write_parquet,
+}
+
+def export_formats() -> List[str]:
+    """Configured export formats this install can write (Parquet needs pyarrow)"""
+    return [fmt for fmt in STORAGE_CONFIG["export_formats"]
+            if fmt in EXPORT_WRITERS and (fmt != "parquet" or pq is not None)]
+
+def export_logs(log_files: Union[str, List[str]], filename: str = None, fmt: str = "csv",
+                start_date=None, end_date=None, exercise_type: str = None,
+                chunk_size: int = STORAGE_CONFIG["export_chunk_size"],
+                progress: Callable[[int, int], None] = None) -> Dict:
+    """Export workout log files to CSV, JSONL or Parquet with bounded memory"""
+    if fmt == "parquet" and pq is None:
+        raise ImportError("Parquet export requires pyarrow: pip install pyarrow")
+    if fmt not in export_formats():
+        raise ValueError(f"Unsupported export format: {fmt}")
+    if filename is None:
+        filename = f"workout_logs_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{fmt}"
+
+    chunks = iter_log_chunks(log_files, chunk_size, start_date, end_date,
+                             exercise_type, progress)
+    rows = EXPORT_WRITERS[fmt](chunks, filename)
+    return {"filename": filename, "format": fmt, "rows": rows}
+
+class ExportJob:
+    def __init__(self, log_files: Union[str, List[str], Callable[[], List[str]]], **export_kwargs):
+        """Run ``export_logs`` on a background thread and expose its progress
+
+        ``log_files`` may be a callable, run on the job's thread first (e.g.
+        to flush pending entries and list the files). When ``done``, exactly
+        one of ``result`` and ``error`` is set.
+        """
+        self.log_files = log_files
+        self.export_kwargs = export_kwargs
+        self.progress = 0.0
+        self.result = None
+        self.error = None
+        self._thread = threading.Thread(target=self._run, name="workout-log-export", daemon=True)
+
+    def start(self) -> "ExportJob":
+        self._thread.start()
+        return self
+
+    @property
+    def done(self) -> bool:
+        return self._thread.ident is not None and not self._thread.is_alive()
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[Dict]:
+        self._thread.join(timeout)
+        return self.result
+
+    def _update_progress(self, bytes_read: int, total_bytes: int):
+        self.progress = bytes_read / total_bytes if total_bytes else 1.0
+
+    def _run(self):
+        try:
+            log_files = self.log_files() if callable(self.log_files) else self.log_files
+            self.result = export_logs(log_files, progress=self._update_progress,
+                                      **self.export_kwargs)
+            self.progress = 1.0
+        except Exception as e:
+            # Anything, e.g. pyarrow rejecting a column's types, must reach the caller
+            self.error = e
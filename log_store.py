@@ -0,0 +1,246 @@
+import json
+import os
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+from urllib.parse import quote
+
+from log_writer import fsync_file
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+@contextmanager
+def file_lock(lock_path: str):
+    """Hold an exclusive advisory lock on ``lock_path`` across processes"""
+    with open(lock_path, 'a+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class LogStore:
+    def __init__(self, path: str):
+        """Append-only JSON Lines log shared by any number of processes
+
+        Writers append whole lines under an advisory lock on a sidecar
+        ``.lock`` file, which (unlike the log itself) is never replaced.
+        Readers need no lock: they remember how far they have read and only
+        parse complete lines past that offset.
+        """
+        self.path = path
+        self.lock_path = f"{path}.lock"
+        self._offset = 0
+        self._file_id = None
+        self._migrate_legacy()
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None, 0
+        return (st.st_dev, st.st_ino), st.st_size
+
+    def _is_legacy(self) -> bool:
+        try:
+            with open(self.path, 'rb') as f:
+                return f.read(64).lstrip().startswith(b'[')
+        except FileNotFoundError:
+            return False
+
+    def _migrate_legacy(self):
+        """Convert a JSON-array log written by older versions to JSON Lines"""
+        if not self._is_legacy():
+            return
+        with file_lock(self.lock_path):
+            # Another process may have converted (and appended to) it while we waited
+            if not self._is_legacy():
+                return
+            with open(self.path, 'r') as f:
+                entries = json.load(f)
+            self._replace(entries)
+
+    def _replace(self, entries: List[Dict]):
+        """Atomically swap in a new log file; caller must hold the lock"""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + "\n")
+            fsync_file(f)
+        os.replace(tmp_path, self.path)
+
+    def append(self, entries: List[Dict], fsync: bool = False):
+        """Append entries as one write under the cross-process lock"""
+        if not entries:
+            return
+        data = "".join(json.dumps(entry) + "\n" for entry in entries).encode()
+        with file_lock(self.lock_path):
+            with open(self.path, 'ab') as f:
+                f.write(data)
+                if fsync:
+                    fsync_file(f)
+
+    def sync(self):
+        """fsync the log file, including appends that were written without fsync"""
+        try:
+            f = open(self.path, 'rb+')
+        except FileNotFoundError:
+            return
+        with f:
+            fsync_file(f)
+
+    def rewrite(self, entries: List[Dict]):
+        """Replace the whole log, e.g. when clearing it"""
+        with file_lock(self.lock_path):
+            self._replace(entries)
+
+    def changed(self) -> bool:
+        """Cheap check whether anything was written since the last read"""
+        file_id, size = self._stat()
+        return file_id != self._file_id or size != self._offset
+
+    def read_new(self) -> Tuple[List[Dict], bool]:
+        """Return ``(entries, reset)`` appended since the last call
+
+        ``reset`` is True when the file was replaced or truncated, in which
+        case ``entries`` is the complete log rather than just the tail.
+        """
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            reset = self._file_id is not None
+            self._file_id, self._offset = None, 0
+            return [], reset
+
+        with f:
+            # fstat the handle we actually read from, so a concurrent replace
+            # cannot pair the new file with the old offset
+            st = os.fstat(f.fileno())
+            file_id, size = (st.st_dev, st.st_ino), st.st_size
+            reset = file_id != self._file_id or size < self._offset
+            if reset:
+                self._offset = 0
+                self._file_id = file_id
+            if size == self._offset:
+                return [], reset
+            f.seek(self._offset)
+            data = f.read(size - self._offset)
+        # A concurrent append may still be in flight; leave a partial line for next time
+        end = data.rfind(b"\n") + 1
+        self._offset += end
+
+        entries = []
+        for line in data[:end].splitlines():
+            if line.strip():
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+        return entries, reset
+
+
+def partition_key(timestamp: str) -> str:
+    """Month partition ('YYYY-MM') for an ISO timestamp"""
+    return timestamp[:7]
+
+
+def user_log_dir(log_dir: str, user_id: str) -> str:
+    """Directory holding one user's partitions; ids are escaped to stay inside log_dir"""
+    name = quote(str(user_id), safe="")
+    if not name:
+        raise ValueError("User id must not be empty")
+    if name.strip(".") == "":
+        # "." and ".." would name log_dir itself or its parent
+        name = name.replace(".", "%2E")
+    return os.path.join(log_dir, name)
+
+
+class PartitionedLogStore:
+    def __init__(self, log_dir: str, user_id: str):
+        """One user's workout log, split into one ``LogStore`` per month
+
+        Layout: ``<log_dir>/<user_id>/<YYYY-MM>.jsonl``. Queries over a
+        recent window only ever open the months that window covers.
+        """
+        self.log_dir = log_dir
+        self.user_id = user_id
+        self.user_dir = user_log_dir(log_dir, user_id)
+        self._stores = {}
+
+    def path(self, month: str) -> str:
+        return os.path.join(self.user_dir, f"{month}.jsonl")
+
+    def months(self) -> List[str]:
+        """All months that have a partition on disk, oldest first"""
+        try:
+            names = os.listdir(self.user_dir)
+        except FileNotFoundError:
+            return []
+        return sorted(name[:-6] for name in names if name.endswith(".jsonl"))
+
+    def paths(self, start_date=None, end_date=None) -> List[str]:
+        """Partition files overlapping an optional date range ('YYYY-MM-DD' or date)"""
+        start_month = str(start_date)[:7] if start_date is not None else None
+        end_month = str(end_date)[:7] if end_date is not None else None
+        return [
+            self.path(month) for month in self.months()
+            if (start_month is None or month >= start_month)
+            and (end_month is None or month <= end_month)
+        ]
+
+    def store(self, month: str) -> LogStore:
+        if month not in self._stores:
+            os.makedirs(self.user_dir, exist_ok=True)
+            self._stores[month] = LogStore(self.path(month))
+        return self._stores[month]
+
+    def append(self, entries: List[Dict], fsync: bool = False):
+        """Append entries to the partitions of their timestamps"""
+        by_month = {}
+        for entry in entries:
+            by_month.setdefault(partition_key(entry["timestamp"]), []).append(entry)
+        for month, month_entries in by_month.items():
+            self.store(month).append(month_entries, fsync=fsync)
+
+    def sync(self):
+        """fsync every partition this store has opened"""
+        # The writer thread may open a new month while we iterate
+        for store in list(self._stores.values()):
+            store.sync()
+
+
+def migrate_single_file_log(log_file: str, log_dir: str, user_id: str) -> int:
+    """Import a single-file log from older versions into ``user_id``'s partitions
+
+    The old file is renamed to ``<log_file>.migrated`` afterwards so the
+    import happens exactly once, even with several processes starting up.
+    Returns the number of imported entries.
+    """
+    if not os.path.exists(log_file):
+        return 0
+    os.makedirs(log_dir, exist_ok=True)
+    with file_lock(os.path.join(log_dir, ".migrate.lock")):
+        if not os.path.exists(log_file):
+            return 0
+        legacy = LogStore(log_file)
+        entries, _ = legacy.read_new()
+        for entry in entries:
+            entry.setdefault("user_id", user_id)
+        PartitionedLogStore(log_dir, user_id).append(entries, fsync=True)
+        os.replace(log_file, f"{log_file}.migrated")
+        if os.path.exists(legacy.lock_path):
+            os.remove(legacy.lock_path)
+    return len(entries)
@@ -0,0 +1,180 @@
+import atexit
+import os
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from config import WORKOUT_CONFIG
+
+# Durability policies for each flushed batch:
+#   "none"  - hand the batch to the sink and move on
+#   "fsync" - ask the sink to fsync the file before the batch is acknowledged
+DURABILITY_POLICIES = ("none", "fsync")
+
+_STOP = object()
+
+
+class BatchedLogWriter:
+    def __init__(self, sink: Callable[[List[Dict], bool], None],
+                 save_interval: float = WORKOUT_CONFIG["save_interval"],
+                 batch_size: int = WORKOUT_CONFIG["batch_size"],
+                 queue_size: int = WORKOUT_CONFIG["queue_size"],
+                 durability: str = WORKOUT_CONFIG["durability"],
+                 auto_start: bool = True):
+        """Background writer that batches log entries off the caller's thread.
+
+        ``sink(batch, fsync)`` is called on the writer thread with every batch,
+        either when ``batch_size`` entries are pending or ``save_interval``
+        seconds after the oldest pending entry, whichever comes first.
+        A batch the sink fails to write (``OSError``) is kept and written
+        ahead of the next one; until then ``error`` holds the failure and
+        ``flush()``/``close()`` raise it.
+        """
+        if durability not in DURABILITY_POLICIES:
+            raise ValueError(f"Unknown durability policy: {durability}")
+        self.sink = sink
+        self.save_interval = save_interval
+        self.batch_size = max(1, batch_size)
+        self.durability = durability
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.error = None
+        self._failed: List[Dict] = []   # entries of batches the sink could not write yet
+        self._thread = None
+        self._closed = False
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+        if auto_start:
+            self.start()
+
+    def start(self):
+        """Start the writer thread"""
+        with self._lock:
+            if self._thread is None and not self._closed:
+                self._thread = threading.Thread(
+                    target=self._run, name="workout-log-writer", daemon=True
+                )
+                self._thread.start()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    @property
+    def failed(self) -> List[Dict]:
+        """Entries the sink has failed to write so far"""
+        return list(self._failed)
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def submit(self, entry: Dict):
+        """Enqueue an entry; blocks only if the bounded queue is full"""
+        if self._closed:
+            raise RuntimeError("Log writer is closed")
+        if not self.running and self.queue.full():
+            # Without a writer thread nobody else will make room
+            self._drain()
+        self.queue.put(entry)
+
+    def flush(self, timeout: Optional[float] = None):
+        """Block until every entry submitted so far has reached the sink
+
+        Raises the sink's ``OSError`` if some entries could not be written.
+        """
+        if not self.running:
+            self._drain()
+        else:
+            done = threading.Event()
+            self.queue.put(done)
+            done.wait(timeout)
+        self._raise_failed()
+
+    def close(self, timeout: Optional[float] = 5.0):
+        """Flush pending entries and stop the writer thread (flush-on-shutdown hook)"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        if self.running:
+            self.queue.put(_STOP)
+            self._thread.join(timeout)
+        else:
+            self._drain()
+        atexit.unregister(self.close)
+        self._raise_failed()
+
+    def _raise_failed(self):
+        failed = len(self._failed)
+        if failed:
+            raise OSError(f"{failed} log entries could not be written: {self.error}") from self.error
+
+    def _write(self, batch: List[Dict]):
+        # Entries of earlier failed batches go first, in their original order
+        batch = self._failed + batch
+        if not batch:
+            return
+        try:
+            self.sink(batch, self.durability == "fsync")
+            self._failed = []
+            self.error = None
+        except OSError as e:
+            # Keep the writer alive and the entries for the next attempt
+            self._failed = batch
+            self.error = e
+
+    def _drain(self):
+        """Write everything currently queued on the calling thread"""
+        batch = []
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, threading.Event):
+                self._write(batch)
+                batch = []
+                item.set()
+            elif item is not _STOP:
+                batch.append(item)
+        self._write(batch)
+
+    def _run(self):
+        batch = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is _STOP:
+                self._write(batch)
+                self._drain()
+                return
+            if isinstance(item, threading.Event):
+                self._write(batch)
+                batch = []
+                deadline = time.monotonic() + self.save_interval if self._failed else None
+                item.set()
+                continue
+            if item is not None:
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.save_interval
+
+            if len(batch) >= self.batch_size or (
+                deadline is not None and time.monotonic() >= deadline
+            ):
+                self._write(batch)
+                batch = []
+                # Retry a failed batch after another interval even if nothing new arrives
+                deadline = time.monotonic() + self.save_interval if self._failed else None
+
+
+def fsync_file(f):
+    """Flush a file object through to disk"""
+    f.flush()
+    os.fsync(f.fileno())
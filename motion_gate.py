@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Motion gate: skip pose inference while the scene is still
+
+During planks and yoga holds the person is deliberately motionless for
+long stretches, and running the pose model on every frame just returns
+the same landmarks again. ``MotionGate`` keeps a tiny grayscale
+thumbnail of the region the model last looked at; while new frames
+differ from it by less than a threshold, the caller can reuse the last
+landmarks. A full inference is still forced every ``refresh`` seconds.
+"""
+
+import time
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+from config import PERFORMANCE_CONFIG
+
+Box = Tuple[int, int, int, int]
+
+class MotionGate:
+    def __init__(self, threshold: float = PERFORMANCE_CONFIG["motion_threshold"],
+                 refresh: float = PERFORMANCE_CONFIG["motion_refresh"], size: int = 32):
+        """``threshold`` is the mean absolute gray-level difference (0-255) that counts as motion"""
+        self.threshold = threshold
+        self.refresh = refresh
+        self.size = size
+        self.checked = 0
+        self.skipped = 0
+        self._reference: Optional[np.ndarray] = None
+        self._box: Optional[Box] = None
+        self._reference_time = 0.0
+
+    def reset(self):
+        self._reference = None
+
+    def _thumbnail(self, frame: np.ndarray, box: Optional[Box]) -> np.ndarray:
+        if box is not None:
+            x0, y0, x1, y1 = box
+            frame = frame[y0:y1, x0:x1]
+        # Subsample with a stride first so area-averaging only touches ~128 x 128 pixels
+        step = max(1, max(frame.shape[:2]) // (4 * self.size))
+        sampled = np.ascontiguousarray(frame[::step, ::step])
+        small = cv2.resize(sampled, (self.size, self.size), interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+
+    def is_static(self, frame: np.ndarray, now: float = None) -> bool:
+        """True if the frame matches the last inference's region closely enough to reuse its result"""
+        self.checked += 1
+        if self._reference is None:
+            return False
+        now = time.time() if now is None else now
+        if now - self._reference_time >= self.refresh:
+            return False
+        difference = cv2.absdiff(self._thumbnail(frame, self._box), self._reference)
+        if float(difference.mean()) >= self.threshold:
+            return False
+        self.skipped += 1
+        return True
+
+    def update(self, frame: np.ndarray, box: Optional[Box] = None, now: float = None):
+        """Remember the frame (or its ``box`` region) the model just ran on"""
+        self._box = box
+        self._reference = self._thumbnail(frame, box)
+        self._reference_time = time.time() if now is None else now
+
+    def stats(self) -> dict:
+        return {
+            "checked": self.checked,
+            "skipped": self.skipped,
+            "skip_rate": round(self.skipped / self.checked, 3) if self.checked else 0.0
+        }
@@ -2,53 +2,97 @@ import cv2
 import mediapipe as mp
 import numpy as np
 import math
-from typing import Tuple, List, Dict
+from collections import deque
+from typing import Tuple, List, Dict, Optional
 import time
 
+from config import ANALYTICS_CONFIG, MEDIAPIPE_CONFIG, PERFORMANCE_CONFIG, YOGA_CONFIG
+from exercise_recognizer import AUTO_EXERCISE, ExerciseRecognizer
+from form_rules import HOLD_EXERCISES, compiled_rules
+from latency import PROCESS_LATENCY, LatencyRecorder
+from motion_gate import MotionGate
+from pose_index import REFERENCE_POSES, default_index, pose_feedback
+from rep_analytics import RepTracker
+from roi_tracker import RoiTracker
+from stability import StabilityTracker
+
+# Landmark arrays: 33 MediaPipe pose landmarks x (x, y, z, visibility)
+LANDMARK_COUNT = 33
+LANDMARK_FIELDS = ("x", "y", "z", "visibility")
+
+def create_pose_model(static_image_mode: bool = False):
+    """MediaPipe Pose model configured from MEDIAPIPE_CONFIG
+
+    ``static_image_mode`` models do not track between frames, so one
+    model can serve frames from several cameras.
+    """
+    return mp.solutions.pose.Pose(
+        static_image_mode=static_image_mode,
+        model_complexity=MEDIAPIPE_CONFIG["model_complexity"],
+        smooth_landmarks=MEDIAPIPE_CONFIG["smooth_landmarks"],
+        min_detection_confidence=MEDIAPIPE_CONFIG["min_detection_confidence"],
+        min_tracking_confidence=MEDIAPIPE_CONFIG["min_tracking_confidence"]
+    )
+
+class _Landmark:
+    __slots__ = LANDMARK_FIELDS
+
+    def __init__(self, x, y, z, visibility):
+        self.x = x
+        self.y = y
+        self.z = z
+        self.visibility = visibility
+
+class LandmarkArray:
+    def __init__(self, array: np.ndarray, form: Dict = None, pose: Dict = None):
+        """Read-only stand-in for a NormalizedLandmarkList backed by a (33, 4) array
+
+        Lets landmarks estimated on the client go through the same rep and
+        form logic as MediaPipe results: ``landmarks.landmark[i].x`` etc.
+        ``form`` is feedback and ``pose`` a reference pose match already
+        computed for the whole batch, if any.
+        """
+        self.array = array
+        self.form = form
+        self.pose = pose
+        self.landmark = self
+        # Plain floats: indexing a list is far cheaper than an ndarray per access
+        self._rows = array.tolist()
+
+    def __getitem__(self, index) -> _Landmark:
+        return _Landmark(*self._rows[index])
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+def no_person_form() -> Dict:
+    return {"score": 0, "issues": ["No person detected"], "tips": []}
+
 class PoseDetector:
     def detect_plank(self, landmarks) -> dict:
         """Detect plank pose and count hold time as reps"""
         if not landmarks:
-            return {"state": "no_detection", "angle": 0, "reps": self.rep_count, "form": self.assess_form(landmarks)}
+            return self._no_detection()
         # Use shoulder-hip-ankle angle for plank
         left_shoulder = landmarks.landmark[self.mp_pose.PoseLandmark.LEFT_SHOULDER]
         left_hip = landmarks.landmark[self.mp_pose.PoseLandmark.LEFT_HIP]
         left_ankle = landmarks.landmark[self.mp_pose.PoseLandmark.LEFT_ANKLE]
         angle = self.calculate_angle(left_shoulder, left_hip, left_ankle)
-        thresholds = self.angle_thresholds["plank"]
-        current_time = time.time()
-        if angle > thresholds["down"]:
-            if self.exercise_state != "hold":
-                self.exercise_state = "hold"
-                self.last_rep_time = current_time
-            # Count seconds held as reps
-            self.rep_count = int(current_time - self.last_rep_time)
-        else:
-            self.exercise_state = "rest"
-            self.rep_count = 0
+        self._update_hold(angle > self.angle_thresholds["plank"]["down"])
         return {"state": self.exercise_state, "angle": angle, "reps": self.rep_count, "form": self.assess_form(landmarks)}
 
     def detect_lunge(self, landmarks) -> dict:
         """Detect lunge pose and count reps"""
         if not landmarks:
-            return {"state": "no_detection", "angle": 0, "reps": self.rep_count, "form": self.assess_form(landmarks)}
+            return self._no_detection()
         # Use knee angle for lunge
         left_hip = landmarks.landmark[self.mp_pose.PoseLandmark.LEFT_HIP]
         left_knee = landmarks.landmark[self.mp_pose.PoseLandmark.LEFT_KNEE]
         left_ankle = landmarks.landmark[self.mp_pose.PoseLandmark.LEFT_ANKLE]
         angle = self.calculate_angle(left_hip, left_knee, left_ankle)
-        thresholds = self.angle_thresholds["lunge"]
-        current_time = time.time()
-        if angle < thresholds["down"]:
-            if self.exercise_state != "down":
-                self.exercise_state = "down"
-        elif angle > thresholds["up"]:
-            if self.exercise_state == "down":
-                if current_time - self.last_rep_time > self.rep_cooldown:
-                    self.rep_count += 1
-                    self.last_rep_time = current_time
-                self.exercise_state = "up"
-        return {"state": self.exercise_state, "angle": angle, "reps": self.rep_count, "form": self.assess_form(landmarks)}
+        self._count_reps(angle, self.angle_thresholds["lunge"])
+        return {"state": self.exercise_state, "angle": angle, "reps": self.rep_count,
+                "rep_confidence": self.rep_confidence, "form": self.assess_form(landmarks)}
 
     def detect_burpee(self, landmarks) -> dict:
         """Detect burpee pose and count reps (simple squat logic)"""
@@ -57,39 +101,58 @@ class PoseDetector:
 
     def detect_downward_dog(self, landmarks) -> dict:
         """Detect downward dog yoga pose and count hold time as reps"""
+        return self.detect_yoga(landmarks)
+
+    def detect_yoga(self, landmarks) -> dict:
+        """Score a yoga pose against the reference pose index (pose_index.py) and count steady hold time as reps
+
+        ``angle`` is the largest joint deviation from the reference pose, in degrees.
+        """
         if not landmarks:
-            return {"state": "no_detection", "angle": 0, "reps": self.rep_count, "form": self.assess_form(landmarks)}
-        # Use hip angle for downward dog
-        left_wrist = landmarks.landmark[self.mp_pose.PoseLandmark.LEFT_WRIST]
-        left_hip = landmarks.landmark[self.mp_pose.PoseLandmark.LEFT_HIP]
-        left_ankle = landmarks.landmark[self.mp_pose.PoseLandmark.LEFT_ANKLE]
-        angle = self.calculate_angle(left_wrist, left_hip, left_ankle)
-        thresholds = self.angle_thresholds["downward dog"]
-        current_time = time.time()
-        if angle > thresholds["down"]:
-            if self.exercise_state != "hold":
-                self.exercise_state = "hold"
-                self.last_rep_time = current_time
-            self.rep_count = int(current_time - self.last_rep_time)
-        else:
-            self.exercise_state = "rest"
-            self.rep_count = 0
-        return {"state": self.exercise_state, "angle": angle, "reps": self.rep_count, "form": self.assess_form(landmarks)}
-    def __init__(self):
-        """Initialize MediaPipe Pose detection"""
+            return self._no_detection()
+        match = landmarks.pose if isinstance(landmarks, LandmarkArray) else None
+        if match is None:
+            match = default_index().query(self._positions, self.exercise_type)
+        self._update_hold(match["similarity"] >= YOGA_CONFIG["min_similarity"])
+        return {
+            "state": self.exercise_state,
+            "angle": max(abs(deviation) for deviation in match["deviations"].values()),
+            "reps": self.rep_count,
+            "form": pose_feedback(self.assess_form(landmarks), match, self.exercise_type),
+            "pose": match
+        }
+
+    def __init__(self, load_model: bool = True):
+        """Initialize MediaPipe Pose detection
+
+        With ``load_model=False`` the detector only keeps rep/form state and
+        is fed landmarks through ``analyze_landmarks`` by a caller that runs
+        the model elsewhere (e.g. the gym mode worker pool).
+        """
         self.mp_pose = mp.solutions.pose
-        self.pose = self.mp_pose.Pose(
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
-        )
+        self.pose = create_pose_model() if load_model else None
+        self.roi_tracker = RoiTracker() if PERFORMANCE_CONFIG["roi_tracking"] else None
+        self.motion_gate = MotionGate() if PERFORMANCE_CONFIG["motion_gating"] else None
+        self._last_landmarks = None  # last model output, reused by the motion gate
         self.mp_drawing = mp.solutions.drawing_utils
         self.mp_drawing_styles = mp.solutions.drawing_styles
         
         # Exercise state tracking
         self.exercise_state = "rest"  # rest, down, up
         self.rep_count = 0
-        self.last_rep_time = time.time()
+        self.last_rep_time = float("-inf")  # so the first rep counts however soon it comes
         self.rep_cooldown = 1.0  # seconds between reps
+        self._timestamp = None  # time of the frame being analyzed; None means now
+        self._positions = None  # (33, >=3) landmark array of the frame being analyzed
+        self._clock_offset = None  # maps ingested client timestamps onto time.time()
+        self.rep_tracker = RepTracker()  # per-rep depth, range of motion and tempo
+        self.stability = StabilityTracker()  # running landmark sway, for holds
+        self._held = 0.0  # seconds held steadily in the current hold
+        self._angle_history = deque(maxlen=ANALYTICS_CONFIG["angle_history"])  # (time, angle) since the last top
+        self._down_confidence = 1.0
+        self.rep_confidence = 1.0  # 1.0: last rep seen directly; lower: inferred between sparse samples
+        self.recognizer = ExerciseRecognizer()  # picks the exercise when asked for AUTO_EXERCISE
+        self.latency = LatencyRecorder(PROCESS_LATENCY)  # per-stage timings of this session's frames
         
         # Exercise configuration
         self.exercise_type = "pushup"  # pushup, squat, plank, etc.
@@ -118,33 +181,124 @@ class PoseDetector:
             "triangle pose": {"down": 120, "up": 180}
         }
     def detect_stub(self, landmarks) -> dict:
-        """Stub for exercises/yoga not yet implemented"""
+        """Stub for exercises/yoga whose rep detection is not implemented yet (form is still assessed)"""
         return {
             "state": "not_implemented",
             "angle": 0,
             "reps": self.rep_count,
-            "form": {"score": 0, "issues": ["Detection not implemented for this exercise."], "tips": []}
+            "form": self.assess_form(landmarks)
         }
+
+    def _update_hold(self, in_position: bool):
+        """Count seconds held steadily as reps; time spent swaying does not count"""
+        current_time = self._current_time()
+        if in_position:
+            if self.exercise_state != "hold":
+                self.exercise_state = "hold"
+                self.last_rep_time = current_time
+                self._held = 0.0
+            elif self.stability.stable:
+                self._held += current_time - self.last_rep_time
+            self.last_rep_time = current_time
+            self.rep_count = int(self._held)
+        else:
+            self.exercise_state = "rest"
+            self.rep_count = 0
+
+    def _no_detection(self) -> Dict:
+        return {"state": "no_detection", "angle": 0, "reps": self.rep_count, "form": no_person_form()}
         
     def calculate_angle(self, a: np.ndarray, b: np.ndarray, c: np.ndarray) -> float:
-        """Calculate angle between three points"""
-        a = np.array([a.x, a.y])
-        b = np.array([b.x, b.y])
-        c = np.array([c.x, c.y])
+        """Calculate angle between three points (landmarks or (x, y) arrays)"""
+        ax, ay = (a.x, a.y) if hasattr(a, "x") else (float(a[0]), float(a[1]))
+        bx, by = (b.x, b.y) if hasattr(b, "x") else (float(b[0]), float(b[1]))
+        cx, cy = (c.x, c.y) if hasattr(c, "x") else (float(c[0]), float(c[1]))
         
-        radians = np.arctan2(c[1] - b[1], c[0] - b[0]) - \
-                 np.arctan2(a[1] - b[1], a[0] - b[0])
-        angle = np.abs(radians * 180.0 / np.pi)
+        radians = math.atan2(cy - by, cx - bx) - math.atan2(ay - by, ax - bx)
+        angle = abs(math.degrees(radians))
         
         if angle > 180.0:
             angle = 360 - angle
             
         return angle
     
+    def _current_time(self) -> float:
+        return time.time() if self._timestamp is None else self._timestamp
+    
+    def _count_reps(self, angle: float, thresholds: Dict):
+        """Down/up rep state machine over timestamped angle samples
+
+        When frames are dropped, a rep can happen between two samples
+        without any sample below the "down" threshold. If the samples
+        around the lowest angle since the last top are further apart than
+        ``max_sample_gap``, a parabola through them estimates the true
+        lowest point, and a rep is counted if it crosses the threshold,
+        with a ``rep_confidence`` below 1.
+        """
+        current_time = self._current_time()
+        history = self._angle_history
+        previous = history[-1] if history else None
+        history.append((current_time, angle))
+        
+        if angle < thresholds["down"]:
+            if self.exercise_state != "down":
+                self.exercise_state = "down"
+                self._down_confidence = 1.0
+        elif angle > thresholds["up"]:
+            if self.exercise_state != "down":
+                confidence = self._hidden_rep_confidence(thresholds)
+                if confidence >= ANALYTICS_CONFIG["min_rep_confidence"]:
+                    self.exercise_state = "down"
+                    self._down_confidence = confidence
+            if self.exercise_state == "down":
+                # Time the rep at the interpolated moment the angle crossed the "up" threshold
+                crossed = current_time
+                if previous is not None and previous[1] < thresholds["up"] < angle:
+                    crossed = previous[0] + (current_time - previous[0]) * (
+                        (thresholds["up"] - previous[1]) / (angle - previous[1]))
+                if crossed - self.last_rep_time > self.rep_cooldown:
+                    self.rep_count += 1
+                    self.last_rep_time = crossed
+                    self.rep_confidence = self._down_confidence
+                self.exercise_state = "up"
+            # A new rep segment starts at the top
+            history.clear()
+            history.append((current_time, angle))
+    
+    def _hidden_rep_confidence(self, thresholds: Dict) -> float:
+        """Confidence (0-1) that a rep's bottom fell between the samples since the last top"""
+        samples = self._angle_history
+        if len(samples) < 3:
+            return 0.0
+        lowest = min(range(1, len(samples) - 1), key=lambda i: samples[i][1])
+        (t1, a1), (t2, a2), (t3, a3) = samples[lowest - 1], samples[lowest], samples[lowest + 1]
+        if max(t2 - t1, t3 - t2) <= ANALYTICS_CONFIG["max_sample_gap"]:
+            return 0.0      # Sampled densely enough: a shallow dip is a partial rep, not a missed one
+        bottom = self._parabola_minimum(t1 - t2, a1, a2, t3 - t2, a3)
+        if bottom is None or bottom >= thresholds["down"]:
+            return 0.0
+        return min(1.0, (thresholds["down"] - bottom) / (0.5 * (thresholds["up"] - thresholds["down"])))
+    
+    @staticmethod
+    def _parabola_minimum(t1: float, a1: float, a2: float, t3: float, a3: float) -> Optional[float]:
+        """Lowest value of the parabola through (t1, a1), (0, a2), (t3, a3), if it lies between t1 and t3"""
+        if t1 >= 0 or t3 <= 0:
+            return None
+        # a(t) = a2 + b t + c t^2
+        slope1, slope3 = (a1 - a2) / t1, (a3 - a2) / t3
+        c = (slope3 - slope1) / (t3 - t1)
+        if c <= 0:
+            return None
+        b = slope1 - c * t1
+        vertex = -b / (2 * c)
+        if not t1 <= vertex <= t3:
+            return None
+        return a2 - b * b / (4 * c)
+    
     def detect_pushup(self, landmarks) -> Dict:
         """Detect pushup pose and count reps"""
         if not landmarks:
-            return {"state": "no_detection", "angle": 0, "reps": self.rep_count}
+            return self._no_detection()
         
         # Get key points for pushup
         left_shoulder = landmarks.landmark[self.mp_pose.PoseLandmark.LEFT_SHOULDER]
@@ -163,31 +317,20 @@ class PoseDetector:
         avg_angle = (left_angle + right_angle) / 2
         
         # Determine state
-        thresholds = self.angle_thresholds["pushup"]
-        current_time = time.time()
-        
-        if avg_angle < thresholds["down"]:
-            if self.exercise_state != "down":
-                self.exercise_state = "down"
-        elif avg_angle > thresholds["up"]:
-            if self.exercise_state == "down":
-                # Complete rep detected
-                if current_time - self.last_rep_time > self.rep_cooldown:
-                    self.rep_count += 1
-                    self.last_rep_time = current_time
-                self.exercise_state = "up"
+        self._count_reps(avg_angle, self.angle_thresholds["pushup"])
         
         return {
             "state": self.exercise_state,
             "angle": avg_angle,
             "reps": self.rep_count,
+            "rep_confidence": self.rep_confidence,
             "form": self.assess_form(landmarks)
         }
     
     def detect_squat(self, landmarks) -> Dict:
         """Detect squat pose and count reps"""
         if not landmarks:
-            return {"state": "no_detection", "angle": 0, "reps": self.rep_count}
+            return self._no_detection()
         
         # Get key points for squat
         left_hip = landmarks.landmark[self.mp_pose.PoseLandmark.LEFT_HIP]
@@ -205,70 +348,105 @@ class PoseDetector:
         avg_angle = (left_angle + right_angle) / 2
         
         # Determine state
-        thresholds = self.angle_thresholds["squat"]
-        current_time = time.time()
-        
-        if avg_angle < thresholds["down"]:
-            if self.exercise_state != "down":
-                self.exercise_state = "down"
-        elif avg_angle > thresholds["up"]:
-            if self.exercise_state == "down":
-                if current_time - self.last_rep_time > self.rep_cooldown:
-                    self.rep_count += 1
-                    self.last_rep_time = current_time
-                self.exercise_state = "up"
+        self._count_reps(avg_angle, self.angle_thresholds["squat"])
         
         return {
             "state": self.exercise_state,
             "angle": avg_angle,
             "reps": self.rep_count,
+            "rep_confidence": self.rep_confidence,
             "form": self.assess_form(landmarks)
         }
     
     def assess_form(self, landmarks) -> Dict:
-        """Assess exercise form quality"""
-        form_feedback = {
-            "score": 100,
-            "issues": [],
-            "tips": []
-        }
-        
+        """Assess exercise form quality with the exercise's compiled rules from form_rules"""
         # Check if person is visible
         if not landmarks:
-            form_feedback["score"] = 0
-            form_feedback["issues"].append("No person detected")
-            return form_feedback
-        
-        # Check posture alignment for pushup
-        if self.exercise_type == "pushup":
-            # Check if body is straight
-            left_shoulder = landmarks.landmark[self.mp_pose.PoseLandmark.LEFT_SHOULDER]
-            left_hip = landmarks.landmark[self.mp_pose.PoseLandmark.LEFT_HIP]
-            left_ankle = landmarks.landmark[self.mp_pose.PoseLandmark.LEFT_ANKLE]
-            
-            # Calculate body alignment
-            shoulder_hip_angle = self.calculate_angle(
-                landmarks.landmark[self.mp_pose.PoseLandmark.LEFT_ELBOW],
-                left_shoulder,
-                left_hip
-            )
-            
-            if shoulder_hip_angle < 160:
-                form_feedback["score"] -= 20
-                form_feedback["issues"].append("Keep your body straight")
-                form_feedback["tips"].append("Engage your core and maintain a straight line from head to heels")
-        
-        return form_feedback
+            return no_person_form()
+        if isinstance(landmarks, LandmarkArray):
+            if landmarks.form is not None:
+                return landmarks.form
+            landmarks = landmarks.array
+        start = time.perf_counter_ns()
+        form = compiled_rules(self.exercise_type).assess(landmarks)
+        self.latency.record("assess_form", time.perf_counter_ns() - start)
+        return form
     
     def process_frame(self, frame: np.ndarray, exercise_type: str = "pushup") -> Tuple[np.ndarray, Dict]:
-        """Process a single frame and return annotated frame with exercise data"""
+        """Process a single frame and return annotated frame with exercise data
+
+        During holds, frames where nothing moved reuse the previous landmarks
+        instead of running the model (see motion_gate.py). Each stage is
+        timed into ``self.latency`` (see latency.py).
+        """
+        start = time.perf_counter_ns()
+        gate = self.motion_gate
+        current = self.exercise_type if exercise_type == AUTO_EXERCISE else exercise_type
+        if (gate is not None and current in HOLD_EXERCISES and self._last_landmarks is not None
+                and gate.is_static(frame)):
+            landmarks = self._last_landmarks
+        else:
+            landmarks = self._last_landmarks = self.detect_landmarks(frame)
+            if gate is not None:
+                gate.update(frame, self.roi_tracker.roi if self.roi_tracker is not None else None)
+        result = self.analyze_landmarks(frame, landmarks, exercise_type)
+        self.latency.record("frame", time.perf_counter_ns() - start)
+        return result
+    
+    def detect_landmarks(self, frame: np.ndarray):
+        """Run the pose model on a BGR frame, only on the region around the person when tracking one"""
+        if self.roi_tracker is None:
+            return self._infer(frame)
+        image, box = self.roi_tracker.crop(frame)
+        landmarks = self._infer(image)
+        if not self.roi_tracker.accept(landmarks, box, frame.shape):
+            # Lost the person in the crop: look at the whole frame again
+            image, box = self.roi_tracker.crop(frame)
+            landmarks = self._infer(image)
+            self.roi_tracker.accept(landmarks, box, frame.shape)
+        return landmarks
+    
+    def _infer(self, image: np.ndarray):
+        """Pose landmarks (normalized to ``image``) for a BGR image, or None"""
+        start = time.perf_counter_ns()
+        rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        converted = time.perf_counter_ns()
+        landmarks = self.pose.process(rgb).pose_landmarks
+        self.latency.record("color_convert", converted - start)
+        self.latency.record("inference", time.perf_counter_ns() - converted)
+        return landmarks
+    
+    def update_state(self, pose_landmarks, exercise_type: str = "pushup", timestamp: float = None) -> Dict:
+        """Advance the rep state machine and assess form for one frame's landmarks
+
+        A frame that completes a rep also carries the rep's ``last_rep`` record.
+        With ``AUTO_EXERCISE`` the exercise is recognized from the motion
+        (see exercise_recognizer.py); switching to a newly recognized one
+        starts its count from zero.
+        """
+        self._timestamp = timestamp
+        positions = None
+        if pose_landmarks:
+            if isinstance(pose_landmarks, LandmarkArray):
+                positions = pose_landmarks.array
+            else:
+                positions = np.array([(p.x, p.y, p.z) for p in pose_landmarks.landmark])
+        self._positions = positions
+        recognition = None
+        if exercise_type == AUTO_EXERCISE:
+            if positions is not None:
+                self.recognizer.update(positions, self._current_time())
+            exercise_type = self.recognizer.exercise or self.exercise_type
+            if exercise_type != self.exercise_type:
+                self.rep_count = 0
+                self.exercise_state = "rest"
+            recognition = self.recognizer.summary()
+        if exercise_type != self.exercise_type:
+            self.rep_tracker.reset()
+            self.stability.reset()
+            self._angle_history.clear()
         self.exercise_type = exercise_type
-        
-        # Convert BGR to RGB
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        
-        # Process the frame
-        results = self.pose.process(rgb_frame)
+        reps_before = self.rep_count
         
         # Initialize exercise data
         exercise_data = {
@@ -278,36 +456,114 @@ class PoseDetector:
             "form": {"score": 0, "issues": [], "tips": []}
         }
         
-        if results.pose_landmarks:
-            # Draw pose landmarks
-            annotated_frame = cv2.cvtColor(rgb_frame, cv2.COLOR_RGB2BGR)
-            self.mp_drawing.draw_landmarks(
-                annotated_frame,
-                results.pose_landmarks,
-                self.mp_pose.POSE_CONNECTIONS,
-                landmark_drawing_spec=self.mp_drawing_styles.get_default_pose_landmarks_style()
-            )
-            # Detect exercise based on type
+        if pose_landmarks:
+            self.stability.update(positions)
+            
+            # Detect exercise based on type (timed including assess_form)
+            start = time.perf_counter_ns()
             if exercise_type == "pushup":
-                exercise_data = self.detect_pushup(results.pose_landmarks)
+                exercise_data = self.detect_pushup(pose_landmarks)
             elif exercise_type == "squat":
-                exercise_data = self.detect_squat(results.pose_landmarks)
+                exercise_data = self.detect_squat(pose_landmarks)
             elif exercise_type == "plank":
-                exercise_data = self.detect_plank(results.pose_landmarks)
+                exercise_data = self.detect_plank(pose_landmarks)
             elif exercise_type == "lunge":
-                exercise_data = self.detect_lunge(results.pose_landmarks)
+                exercise_data = self.detect_lunge(pose_landmarks)
             elif exercise_type == "burpee":
-                exercise_data = self.detect_burpee(results.pose_landmarks)
+                exercise_data = self.detect_burpee(pose_landmarks)
             elif exercise_type == "downward dog":
-                exercise_data = self.detect_downward_dog(results.pose_landmarks)
+                exercise_data = self.detect_downward_dog(pose_landmarks)
+            elif exercise_type in REFERENCE_POSES:
+                exercise_data = self.detect_yoga(pose_landmarks)
             else:
-                exercise_data = self.detect_stub(results.pose_landmarks)
+                exercise_data = self.detect_stub(pose_landmarks)
+            self.latency.record("detect", time.perf_counter_ns() - start)
+            if exercise_data["state"] in ("down", "up"):
+                rep = self.rep_tracker.update(
+                    self._current_time(), exercise_data["angle"], self.angle_thresholds[exercise_type]["up"],
+                    exercise_data["reps"] > reps_before
+                )
+                if rep is not None:
+                    exercise_data["last_rep"] = rep._asdict()
+            self.stability.update_angle(exercise_data["angle"])
+            exercise_data["stability"] = self.stability.summary()
+            if exercise_type in HOLD_EXERCISES:
+                exercise_data["form"] = compiled_rules(exercise_type).with_stability(
+                    exercise_data["form"], self.stability.sway
+                )
+        if recognition is not None:
+            exercise_data["exercise"] = exercise_type
+            exercise_data["recognition"] = recognition
+        self._timestamp = None
+        self._positions = None
+        return exercise_data
+    
+    def analyze_landmarks(self, frame: np.ndarray, pose_landmarks,
+                          exercise_type: str = "pushup") -> Tuple[np.ndarray, Dict]:
+        """Update exercise state from detected landmarks and annotate a copy of the frame"""
+        exercise_data = self.update_state(pose_landmarks, exercise_type)
+        
+        start = time.perf_counter_ns()
+        annotated_frame = frame.copy()
+        if pose_landmarks:
+            # Draw pose landmarks
+            self.mp_drawing.draw_landmarks(
+                annotated_frame,
+                pose_landmarks,
+                self.mp_pose.POSE_CONNECTIONS,
+                landmark_drawing_spec=self.mp_drawing_styles.get_default_pose_landmarks_style()
+            )
             # Add visual feedback
             annotated_frame = self.add_visual_feedback(annotated_frame, exercise_data)
-        else:
-            annotated_frame = frame.copy()
+        self.latency.record("annotate", time.perf_counter_ns() - start)
         return annotated_frame, exercise_data
     
+    def ingest_landmarks(self, landmarks: np.ndarray, exercise_type: str = "pushup",
+                         timestamps: np.ndarray = None) -> List[Dict]:
+        """Run landmarks estimated elsewhere (e.g. on the client) through the rep and form logic
+
+        ``landmarks`` is a (33, 4) or (N, 33, 4) array of x, y, z, visibility
+        (float16 or float32); a frame containing NaN means nobody was seen.
+        ``timestamps`` (seconds, any clock) give each frame's capture time;
+        only their spacing matters, as the first batch is anchored to now.
+        Without them every frame counts as captured now. Returns one
+        ``exercise_data`` per frame.
+        """
+        batch = np.asarray(landmarks, dtype=np.float32)
+        if batch.ndim == 2:
+            batch = batch[None]
+        if batch.shape[1:] != (LANDMARK_COUNT, len(LANDMARK_FIELDS)):
+            raise ValueError(f"Expected landmarks of shape (N, {LANDMARK_COUNT}, 4), got {batch.shape}")
+        if timestamps is not None:
+            timestamps = np.asarray(timestamps, dtype=np.float64)
+            if timestamps.shape != (len(batch),):
+                raise ValueError("Expected one timestamp per landmark frame")
+            if self._clock_offset is None and len(batch):
+                self._clock_offset = time.time() - float(timestamps[0])
+            timestamps = (timestamps + self._clock_offset).tolist()
+        
+        detected = np.isfinite(batch).all(axis=(1, 2))
+        # Form rules and reference pose matches for the whole batch in one pass
+        # (frame by frame while the exercise is being recognized)
+        seen_frames = int(detected.sum())
+        if exercise_type == AUTO_EXERCISE:
+            forms = iter([None] * seen_frames)
+        else:
+            forms = iter(compiled_rules(exercise_type).feedback(batch[detected]))
+        if exercise_type in REFERENCE_POSES:
+            poses = iter(default_index().matches(batch[detected], exercise_type))
+        else:
+            poses = iter([None] * seen_frames)
+        detected = detected.tolist()
+        return [
+            self.update_state(
+                LandmarkArray(frame, next(forms), next(poses)) if seen else None,
+                exercise_type,
+                None if timestamps is None else timestamps[i]
+            )
+            for i, (frame, seen) in enumerate(zip(batch, detected))
+        ]
+    
     def add_visual_feedback(self, frame: np.ndarray, exercise_data: Dict) -> np.ndarray:
         """Add visual feedback to the frame"""
         # Add rep counter
@@ -335,12 +591,19 @@ class PoseDetector:
         """Reset the rep counter"""
         self.rep_count = 0
         self.exercise_state = "rest"
-        self.last_rep_time = time.time()
+        self.last_rep_time = float("-inf")
+        self.rep_tracker.reset()
+        self.stability.reset()
+        self._angle_history.clear()
+        self.rep_confidence = 1.0
+        self.recognizer.reset()
     
     def get_exercise_stats(self) -> Dict:
         """Get current exercise statistics"""
         return {
             "reps": self.rep_count,
             "state": self.exercise_state,
-            "exercise_type": self.exercise_type
+            "exercise_type": self.exercise_type,
+            "last_rep": self.rep_tracker.reps[-1]._asdict() if self.rep_tracker.reps else None,
+            "latency": self.latency.summary()
         } 
\ No newline at end of file
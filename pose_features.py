@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Camera-independent pose features, and a stick figure to generate poses
+
+``joint_angles`` reduces a frame's landmarks to the angles at the main
+joints plus the torso's lean, in degrees. Angles do not depend on where
+the person stands, how far from the camera or which way they face, so
+the same movement gives the same features in any video.
+
+``pose_embedding`` adds the positions of the main joints relative to
+the hips, in torso lengths, for telling apart poses whose angles
+alone are similar.
+
+``render_pose`` goes the other way: it places the 33 landmarks of a side
+view stick figure with the given joint angles. It is used to build
+reference poses and motion templates from a few numbers per pose, and
+to generate test input.
+"""
+
+from typing import Dict
+
+import mediapipe as mp
+import numpy as np
+
+from form_rules import _joints
+from stability import BODY_LANDMARKS
+
+# Middle joint of each triplet is where the angle is measured
+ANGLE_JOINTS = {
+    "left_shoulder": ("left_hip", "left_shoulder", "left_elbow"),
+    "right_shoulder": ("right_hip", "right_shoulder", "right_elbow"),
+    "left_elbow": ("left_shoulder", "left_elbow", "left_wrist"),
+    "right_elbow": ("right_shoulder", "right_elbow", "right_wrist"),
+    "left_hip": ("left_shoulder", "left_hip", "left_knee"),
+    "right_hip": ("right_shoulder", "right_hip", "right_knee"),
+    "left_knee": ("left_hip", "left_knee", "left_ankle"),
+    "right_knee": ("right_hip", "right_knee", "right_ankle")
+}
+# Joint angles, then the torso's lean from upright (0) through lying (90) to upside down (180)
+FEATURES = (*ANGLE_JOINTS, "torso")
+
+# Every feature uses only the body's main joints, so only those are read from a frame
+_LOCAL = {index: i for i, index in enumerate(BODY_LANDMARKS.tolist())}
+
+def _local(names) -> list:
+    return [_LOCAL[index] for index in _joints(names)]
+
+# Rows: end points a and c, then the vertex b
+_TRIPLETS = np.array([_local(joints) for joints in ANGLE_JOINTS.values()], dtype=np.intp).T[[0, 2, 1]]
+_SHOULDERS = np.array(_local(("left_shoulder", "right_shoulder")), dtype=np.intp)
+_HIPS = np.array(_local(("left_hip", "right_hip")), dtype=np.intp)
+
+def _mirror_name(name: str) -> str:
+    if "LEFT" in name:
+        return name.replace("LEFT", "RIGHT")
+    return name.replace("RIGHT", "LEFT")
+
+# Landmark order of the mirror image: every left landmark swapped with its right counterpart
+MIRRORED = np.array([int(mp.solutions.pose.PoseLandmark[_mirror_name(landmark.name)])
+                     for landmark in mp.solutions.pose.PoseLandmark], dtype=np.intp)
+
+def _points(landmarks: np.ndarray) -> np.ndarray:
+    """(N, len(BODY_LANDMARKS)) body joint positions as x + iy"""
+    body = np.asarray(landmarks)[:, BODY_LANDMARKS, :2].astype(np.float64)
+    return body.view(np.complex128)[..., 0]
+
+def _angles(points: np.ndarray, out: np.ndarray):
+    """Joint angles and torso lean of ``_points`` into ``out`` (N, len(FEATURES)), in radians"""
+    vectors = points[:, _TRIPLETS[:2]] - points[:, None, _TRIPLETS[2]]
+    turn = np.conj(vectors[:, 0]) * vectors[:, 1]
+    torso = points[:, _SHOULDERS].sum(axis=1) - points[:, _HIPS].sum(axis=1)
+    out[:, :-1] = np.abs(np.angle(turn))
+    # Image y points down, so "up" is -i and conj(-i) = i
+    out[:, -1] = np.abs(np.angle(1j * torso))
+
+def joint_angles(landmarks: np.ndarray) -> np.ndarray:
+    """(N, len(FEATURES)) angles in degrees for (N, 33, >=2) landmark arrays"""
+    points = _points(landmarks)
+    features = np.empty((len(points), len(FEATURES)))
+    _angles(points, features)
+    return np.degrees(features)
+
+def pose_embedding(landmarks: np.ndarray, position_weight: float = 1.0) -> np.ndarray:
+    """(N, len(FEATURES) + 2 * len(BODY_LANDMARKS)) vectors describing (N, 33, >=2) poses
+
+    Joint angles scaled to 0-1, then the x and y of the body's main joints
+    relative to the middle of the hips in torso lengths (times
+    ``position_weight``), so neither position in the frame nor distance
+    from the camera matters.
+    """
+    points = _points(landmarks)
+    count = len(FEATURES)
+    embedding = np.empty((len(points), count + 2 * len(BODY_LANDMARKS)))
+    _angles(points, embedding[:, :count])
+    embedding[:, :count] *= 1 / np.pi
+    hips = points[:, _HIPS].mean(axis=1, keepdims=True)
+    torso = np.abs(points[:, _SHOULDERS].mean(axis=1, keepdims=True) - hips)
+    body = (points - hips) * (position_weight / np.maximum(torso, 1e-6))
+    embedding[:, count::2] = body.real
+    embedding[:, count + 1::2] = body.imag
+    return embedding
+
+# Segment lengths of the stick figure, as fractions of the image height
+_TORSO, _UPPER_ARM, _FOREARM, _THIGH, _SHIN, _NECK = 0.15, 0.08, 0.07, 0.1, 0.1, 0.06
+# Joint angles of a relaxed standing pose, for joints a pose description leaves out
+STANDING_POSE = {"shoulder": 15, "elbow": 170, "hip": 180, "knee": 180, "torso": 0}
+
+def pose_vector(angles: Dict[str, float]) -> np.ndarray:
+    """Features of a pose description: degrees by ``FEATURES`` name, a bare joint name sets both sides"""
+    return np.array([
+        angles.get(name, angles.get(name.rpartition("_")[2], STANDING_POSE[name.rpartition("_")[2]]))
+        for name in FEATURES
+    ], dtype=np.float64)
+
+# Reference joint angles of the yoga poses (see pose_vector); several entries are alternatives.
+# Shared by the pose index (scoring) and the exercise recognizer's templates.
+REFERENCE_POSES = {
+    "downward dog": [{"torso": 135, "shoulder": 170, "elbow": 175, "hip": 70}],
+    "warrior I": [{"shoulder": 170, "elbow": 175, "left_hip": 110, "left_knee": 100, "right_hip": 160}],
+    "warrior II": [{"shoulder": 90, "elbow": 180, "left_hip": 110, "left_knee": 100, "right_hip": 160}],
+    "tree pose": [
+        {"shoulder": 170, "elbow": 160, "right_hip": 120, "right_knee": 40},
+        {"shoulder": 30, "elbow": 60, "right_hip": 120, "right_knee": 40}       # palms at the chest
+    ],
+    "cobra pose": [{"torso": 60, "shoulder": 20, "elbow": 160, "hip": 150}],
+    "child's pose": [{"torso": 120, "shoulder": 170, "elbow": 175, "hip": 40, "knee": 30}],
+    "cat-cow": [
+        {"torso": 85, "shoulder": 90, "elbow": 175, "hip": 100, "knee": 90},
+        {"torso": 95, "shoulder": 90, "elbow": 175, "hip": 80, "knee": 90}
+    ],
+    "bridge pose": [{"torso": 110, "shoulder": 20, "elbow": 175, "hip": 170, "knee": 90}],
+    "seated twist": [{"shoulder": 40, "elbow": 120, "hip": 90, "left_knee": 60}],
+    "triangle pose": [{"torso": 70, "shoulder": 90, "elbow": 180, "left_hip": 80, "right_hip": 150}]
+}
+
+def _index(name: str) -> int:
+    return int(mp.solutions.pose.PoseLandmark[name.upper()])
+
+def render_pose(angles: Dict[str, float], center=(0.5, 0.55), visibility: float = 0.9) -> np.ndarray:
+    """(33, 4) landmarks of a side view stick figure with the given joint angles
+
+    ``angles`` is a pose description as for ``pose_vector``; unset joints
+    take a relaxed standing pose. ``joint_angles`` of the result gives
+    back the same angles.
+    """
+    radians = dict(zip(FEATURES, np.radians(pose_vector(angles))))
+    angle = radians.__getitem__
+
+    # Built upright with the hips at 0, facing +x (image y points down), then leaned by "torso"
+    up, down = -1j, 1j
+    positions = {}
+    shoulder = _TORSO * up
+    for side in ("left", "right"):
+        arm = down * np.exp(-1j * angle(f"{side}_shoulder"))
+        elbow = shoulder + _UPPER_ARM * arm
+        forearm = -arm * np.exp(1j * angle(f"{side}_elbow"))
+        wrist = elbow + _FOREARM * forearm
+        thigh = up * np.exp(1j * angle(f"{side}_hip"))
+        knee = _THIGH * thigh
+        shin = -thigh * np.exp(-1j * angle(f"{side}_knee"))
+        ankle = knee + _SHIN * shin
+        head = shoulder + _NECK * up
+        positions.update({
+            f"{side}_shoulder": shoulder, f"{side}_elbow": elbow, f"{side}_wrist": wrist,
+            f"{side}_hip": 0j, f"{side}_knee": knee, f"{side}_ankle": ankle,
+            f"{side}_pinky": wrist + 0.02 * forearm, f"{side}_index": wrist + 0.02 * forearm,
+            f"{side}_thumb": wrist + 0.015 * forearm,
+            f"{side}_heel": ankle - 0.015, f"{side}_foot_index": ankle + 0.04,
+            f"{side}_ear": head - 0.01, f"{side}_eye_inner": head + 0.015,
+            f"{side}_eye": head + 0.015, f"{side}_eye_outer": head + 0.01,
+            f"mouth_{side}": head + 0.015 + 0.02 * down
+        })
+    positions["nose"] = head + 0.025 + 0.01 * down
+
+    lean = np.exp(1j * angle("torso"))
+    landmarks = np.zeros((33, 4), dtype=np.float32)
+    for name, point in positions.items():
+        # Far-side landmarks sit slightly behind the near side; angles are unaffected
+        point = complex(*center) + point * lean + (0.005 if name.startswith("right") else 0)
+        landmarks[_index(name)] = (point.real, point.imag, 0.0, visibility)
+    return landmarks
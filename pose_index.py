@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Nearest-neighbour pose scoring against a reference pose index
+
+Every reference pose (``pose_features.REFERENCE_POSES``) is rendered as a stick figure
+(see pose_features.py) in all four orientations: facing either way,
+with either side leading. Each is stored as a ``pose_embedding`` vector,
+so a frame is scored by finding its nearest reference vector:
+
+- the nearest pose overall (what the person is actually doing)
+- a 0-100 similarity to the nearest variant of a given target pose
+- per-joint deviations in degrees from that variant (the embedding
+  starts with the joint angles, so they come from the same vectors)
+
+The index is built once and written to a directory of ``.npy`` files
+that ``PoseIndex.load`` memory-maps, so every process (app sessions,
+API workers) shares one copy through the page cache. ``default_index``
+writes it on first use, and again whenever the reference poses change. A query is one
+matrix-vector product; a batch of frames is one matrix product.
+
+    python pose_index.py --build            # write the index to YOGA_CONFIG["index_dir"]
+    python pose_index.py --benchmark        # query cost, single and batched
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from config import YOGA_CONFIG
+from pose_features import FEATURES, MIRRORED, REFERENCE_POSES, pose_embedding, render_pose
+
+_FILES = ("embeddings.npy", "norms.npy")
+_ANGLES = len(FEATURES)
+
+def reference_digest(references: Dict[str, List[Dict]] = REFERENCE_POSES,
+                     position_weight: float = YOGA_CONFIG["position_weight"]) -> str:
+    """Fingerprint of what an index is built from, so a saved one can be checked for staleness"""
+    source = json.dumps([references, list(FEATURES), position_weight], sort_keys=True)
+    return hashlib.sha256(source.encode()).hexdigest()
+
+def _orientations(landmarks: np.ndarray) -> List[np.ndarray]:
+    """The pose as seen facing either way, with either side leading"""
+    flipped = landmarks.copy()
+    flipped[:, 0] = 1.0 - flipped[:, 0]
+    return [landmarks, flipped, landmarks[MIRRORED], flipped[MIRRORED]]
+
+class PoseIndex:
+    def __init__(self, embeddings: np.ndarray, labels: Sequence[str], norms: np.ndarray = None,
+                 position_weight: float = YOGA_CONFIG["position_weight"], digest: Optional[str] = None):
+        """Reference (R, D) ``pose_embedding`` vectors, grouped by label
+
+        ``digest`` is the ``reference_digest`` of the poses the index was
+        built from, if it was built from pose descriptions.
+        """
+        self.embeddings = embeddings
+        self.labels = list(labels)
+        self.position_weight = position_weight
+        self.digest = digest
+        self.norms = np.einsum("rd,rd->r", embeddings, embeddings) if norms is None else norms
+        self.poses = list(dict.fromkeys(self.labels))
+        # Rows of each pose, so scoring against one pose is a slice
+        self._rows = {}
+        for pose in self.poses:
+            rows = [i for i, label in enumerate(self.labels) if label == pose]
+            if rows != list(range(rows[0], rows[-1] + 1)):
+                raise ValueError(f"References for {pose!r} are not contiguous")
+            self._rows[pose] = slice(rows[0], rows[-1] + 1)
+        self._label_index = np.array([self.poses.index(label) for label in self.labels], dtype=np.intp)
+
+    @classmethod
+    def build(cls, references: Dict[str, List[Dict]] = REFERENCE_POSES,
+              position_weight: float = YOGA_CONFIG["position_weight"]) -> "PoseIndex":
+        """Index of stick-figure renderings of reference pose descriptions"""
+        landmarks, labels = [], []
+        for pose, variants in references.items():
+            for angles in variants:
+                oriented = _orientations(render_pose(angles))
+                landmarks.extend(oriented)
+                labels.extend([pose] * len(oriented))
+        index = cls.from_landmarks(np.stack(landmarks), labels, position_weight)
+        index.digest = reference_digest(references, position_weight)
+        return index
+
+    @classmethod
+    def from_landmarks(cls, landmarks: np.ndarray, labels: Sequence[str],
+                       position_weight: float = YOGA_CONFIG["position_weight"]) -> "PoseIndex":
+        """Index of recorded (R, 33, >=2) reference landmarks, one label per frame"""
+        first = {label: i for i, label in reversed(list(enumerate(labels)))}
+        order = sorted(range(len(labels)), key=lambda i: first[labels[i]])
+        landmarks = np.asarray(landmarks)[order]
+        labels = [labels[i] for i in order]
+        return cls(pose_embedding(landmarks, position_weight), labels, position_weight=position_weight)
+
+    def save(self, directory: str):
+        """Write the index; each file is replaced whole, ``labels.json`` last, so readers never see a partial one"""
+        os.makedirs(directory, exist_ok=True)
+        suffix = f".{os.getpid()}.tmp"
+        for name, array in zip(_FILES, (self.embeddings, self.norms)):
+            path = os.path.join(directory, name)
+            with open(path + suffix, "wb") as f:
+                np.save(f, np.ascontiguousarray(array, dtype=np.float64))
+            os.replace(path + suffix, path)
+        path = os.path.join(directory, "labels.json")
+        with open(path + suffix, "w") as f:
+            json.dump({"labels": self.labels, "features": list(FEATURES),
+                       "position_weight": self.position_weight, "digest": self.digest}, f)
+        os.replace(path + suffix, path)
+
+    @classmethod
+    def load(cls, directory: str) -> "PoseIndex":
+        """Memory-map an index written by ``save``"""
+        with open(os.path.join(directory, "labels.json")) as f:
+            meta = json.load(f)
+        if meta["features"] != list(FEATURES):
+            raise ValueError(f"Pose index in {directory} was built for other features; rebuild it")
+        embeddings, norms = (np.load(os.path.join(directory, name), mmap_mode="r") for name in _FILES)
+        return cls(embeddings, meta["labels"], norms, meta["position_weight"], meta.get("digest"))
+
+    def distances(self, query: np.ndarray) -> np.ndarray:
+        """(N, R) squared distances from (N, D) embeddings to every reference"""
+        squared = query @ self.embeddings.T
+        squared *= -2
+        squared += np.einsum("nd,nd->n", query, query)[:, None]
+        squared += self.norms
+        return np.maximum(squared, 0.0, out=squared)
+
+    def query_batch(self, landmarks: np.ndarray, pose: str = None) -> Dict[str, np.ndarray]:
+        """Nearest pose of each of (N, 33, >=2) frames, and their similarity and deviations to ``pose``
+
+        ``nearest`` holds indices into ``poses``. Without ``pose`` the scores
+        are against each frame's nearest pose. Deviations are signed degrees
+        (frame minus reference) per ``FEATURES``.
+        """
+        query = pose_embedding(landmarks, self.position_weight)
+        squared = self.distances(query)
+        frames = np.arange(len(squared))
+        nearest = squared.argmin(axis=1)
+        if pose is None:
+            reference = nearest
+        else:
+            rows = self._rows[pose]
+            reference = squared[:, rows].argmin(axis=1) + rows.start
+        distance = np.sqrt(squared[frames, np.stack((nearest, reference))])
+        similarity = np.clip(100 * (1 - distance / YOGA_CONFIG["max_distance"]), 0, 100)
+        return {
+            "nearest": self._label_index[nearest],
+            "nearest_similarity": similarity[0],
+            "similarity": similarity[1],
+            "deviations": (query[:, :_ANGLES] - self.embeddings[reference, :_ANGLES]) * 180
+        }
+
+    def matches(self, landmarks: np.ndarray, pose: str = None) -> List[Dict]:
+        """``query`` for each of (N, 33, >=2) frames, scored in one batch"""
+        result = self.query_batch(landmarks, pose)
+        return [
+            {
+                "nearest": self.poses[nearest],
+                "nearest_similarity": round(nearest_similarity, 1),
+                "similarity": round(similarity, 1),
+                "deviations": dict(zip(FEATURES, deviations))
+            }
+            for nearest, nearest_similarity, similarity, deviations in zip(
+                result["nearest"].tolist(), result["nearest_similarity"].tolist(),
+                result["similarity"].tolist(), np.round(result["deviations"], 1).tolist()
+            )
+        ]
+
+    def query(self, landmarks: np.ndarray, pose: str = None) -> Dict:
+        """Nearest pose, similarity and per-joint deviations (degrees) for one frame's (33, >=2) landmarks"""
+        return self.matches(np.asarray(landmarks)[None], pose)[0]
+
+def pose_feedback(form: Dict, match: Dict, pose: str) -> Dict:
+    """Form feedback with the joints furthest from the reference ``pose`` pointed out"""
+    form = {"score": form["score"], "issues": list(form["issues"]), "tips": list(form["tips"])}
+    if match["similarity"] < YOGA_CONFIG["min_similarity"] and match["nearest"] != pose \
+            and match["nearest_similarity"] >= YOGA_CONFIG["min_similarity"]:
+        form["issues"].append(f"This looks like {match['nearest']}")
+        form["tips"].append(f"Check the {pose} reference pose")
+        return form
+    tolerance = YOGA_CONFIG["deviation_tolerance"]
+    off = sorted(((abs(d), joint, d) for joint, d in match["deviations"].items() if abs(d) > tolerance), reverse=True)
+    for size, joint, deviation in off[:2]:
+        if joint == "torso":
+            form["issues"].append("Torso angle is off")
+            form["tips"].append(f"Tilt your torso about {size:.0f}° {'more upright' if deviation > 0 else 'further'}")
+        else:
+            name = joint.replace("_", " ")
+            form["issues"].append(f"Adjust your {name}")
+            form["tips"].append(f"{'Bend' if deviation > 0 else 'Straighten'} your {name} about {size:.0f}°")
+    return form
+
+_default_index: Optional[PoseIndex] = None
+
+def default_index() -> PoseIndex:
+    """The index of ``REFERENCE_POSES``, memory-mapped from YOGA_CONFIG["index_dir"] (once per process)
+
+    The index is built and saved there on first use, and rebuilt when the
+    saved one was made from other reference poses, features or weights.
+    If the directory cannot be written the index stays in memory.
+    """
+    global _default_index
+    if _default_index is None:
+        directory = YOGA_CONFIG["index_dir"]
+        try:
+            index = PoseIndex.load(directory)
+        except (OSError, ValueError, KeyError):
+            index = None
+        if index is None or index.digest != reference_digest():
+            index = PoseIndex.build()
+            try:
+                index.save(directory)
+                index = PoseIndex.load(directory)
+            except OSError:
+                pass
+        _default_index = index
+    return _default_index
+
+def benchmark(frames: int = 3000):
+    index = default_index()
+    rng = np.random.default_rng(0)
+    poses = [render_pose(variants[0]) for variants in REFERENCE_POSES.values()]
+    batch = np.stack([poses[i % len(poses)] for i in range(frames)])
+    batch[:, :, :2] += rng.normal(0, 0.003, batch[:, :, :2].shape)
+    for frame in batch[:100]:
+        index.query(frame, "tree pose")
+    start = time.perf_counter()
+    for frame in batch[:1000]:
+        index.query(frame, "tree pose")
+    single = (time.perf_counter() - start) / 1000
+    start = time.perf_counter()
+    index.query_batch(batch, "tree pose")
+    batched = (time.perf_counter() - start) / frames
+    print(f"{len(index.labels)} references: {single * 1e6:.1f} µs per query, "
+          f"{batched * 1e6:.2f} µs per frame in a batch of {frames}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or benchmark the reference pose index")
+    parser.add_argument("--build", action="store_true", help="write the index to --dir")
+    parser.add_argument("--dir", default=YOGA_CONFIG["index_dir"])
+    parser.add_argument("--benchmark", action="store_true")
+    args = parser.parse_args()
+    if args.build:
+        index = PoseIndex.build()
+        index.save(args.dir)
+        print(f"🧘 Wrote {len(index.labels)} reference poses to {args.dir}/")
+    if args.benchmark:
+        benchmark()
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Profiling mode: capture where a slow run spends its time
+
+A sampling profiler thread looks at the stacks of the threads that are
+processing a frame (code wrapped in ``profile_frame()``) every few
+milliseconds, for a bounded window. Unlike cProfile it also sees the
+Streamlit/WebRTC worker threads, and it costs the hot path nothing but
+the time the sampler holds the GIL. When the window ends it writes:
+
+- ``<name>.collapsed``: one ``thread;outer;...;inner count`` line per stack,
+  for flamegraph.pl, speedscope or inferno
+- ``<name>.txt``: the top functions by cumulative and self time, memory
+  allocated per frame, and the allocation sites that grew across
+  sampled frames (tracemalloc snapshots before and after every
+  ``snapshot_every``-th frame)
+
+Turn it on with ``python demo.py --profile`` or, for the apps,
+
+    FITNESS_COACH_PROFILE=30 streamlit run app.py      # seconds to profile
+
+tracemalloc slows down every Python allocation while tracing, so
+sampled times are inflated somewhat; set ``PROFILE_CONFIG["allocations"]``
+to False for timing-only profiles.
+"""
+
+import atexit
+import math
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from config import PROFILE_CONFIG
+
+class FrameProfiler:
+    def __init__(self, seconds: float = PROFILE_CONFIG["seconds"], interval: float = PROFILE_CONFIG["interval"],
+                 output_dir: str = PROFILE_CONFIG["output_dir"], allocations: bool = PROFILE_CONFIG["allocations"],
+                 snapshot_every: int = PROFILE_CONFIG["snapshot_every"], top: int = PROFILE_CONFIG["top"]):
+        """Sample frame-processing threads every ``interval`` seconds for ``seconds`` from the first frame"""
+        self.seconds = seconds
+        self.interval = interval
+        self.output_dir = output_dir
+        self.allocations = allocations
+        self.snapshot_every = max(1, snapshot_every)
+        self.top = top
+        self.stacks: Counter = Counter()    # (thread name, *code objects outermost first) -> samples
+        self.frames = 0
+        self.frame_allocations: List[tuple] = []    # (net bytes, peak bytes) per frame
+        self.allocation_growth: Counter = Counter()  # (file, line) -> bytes kept by sampled frames
+        self.paths: Optional[Dict[str, str]] = None
+        self._inside: Dict[int, int] = {}   # thread id -> nesting depth of frame()
+        self._names: Dict[int, str] = {}
+        self._started = None
+        self._elapsed = 0.0
+        self._ticks = 0
+        self._traced = False
+        self._thread = None
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        # Guards the per-frame bookkeeping, updated from every frame-processing thread
+        self._frame_lock = threading.Lock()
+
+    def start(self):
+        """Start the window now (the first ``frame()`` does this too)"""
+        with self._lock:
+            if self._started is not None:
+                return
+            self._started = time.perf_counter()
+            if self.allocations and not tracemalloc.is_tracing():
+                tracemalloc.start(PROFILE_CONFIG["traceback_frames"])
+                self._traced = True
+            self._thread = threading.Thread(target=self._sample_loop, name="frame-profiler", daemon=True)
+            self._thread.start()
+        atexit.register(self.stop)
+
+    @contextmanager
+    def frame(self):
+        """Mark the enclosed code as one frame of the hot path"""
+        if self._started is None:
+            self.start()
+        if self._done.is_set():
+            yield
+            return
+        ident = threading.get_ident()
+        tracing = self.allocations and tracemalloc.is_tracing()
+        with self._frame_lock:
+            self._names.setdefault(ident, threading.current_thread().name)
+            self._inside[ident] = self._inside.get(ident, 0) + 1
+            sampled = self.frames % self.snapshot_every == 0
+        snapshot = None
+        if tracing:
+            if sampled:
+                snapshot = tracemalloc.take_snapshot()
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+        try:
+            yield
+        finally:
+            allocation, growth = None, None
+            if tracing and tracemalloc.is_tracing():
+                current, peak = tracemalloc.get_traced_memory()
+                allocation = (current - before, peak - before)
+                if snapshot is not None:
+                    growth = [stat for stat in tracemalloc.take_snapshot().compare_to(snapshot, "lineno")
+                              if stat.size_diff > 0]
+            with self._frame_lock:
+                self._inside[ident] -= 1
+                self.frames += 1
+                if allocation is not None:
+                    self.frame_allocations.append(allocation)
+                for stat in growth or ():
+                    frame = stat.traceback[0]
+                    self.allocation_growth[(frame.filename, frame.lineno)] += stat.size_diff
+
+    def _sample_loop(self):
+        deadline = self._started + self.seconds
+        while not self._done.wait(self.interval):
+            frames = sys._current_frames()
+            with self._frame_lock:
+                inside = list(self._inside.items())
+            for ident, depth in inside:
+                frame = frames.get(ident) if depth > 0 else None
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame.f_code)
+                    frame = frame.f_back
+                stack.append(self._names[ident])
+                self.stacks[tuple(reversed(stack))] += 1
+            self._ticks += 1
+            if time.perf_counter() >= deadline:
+                self.stop()
+
+    def stop(self) -> Optional[Dict[str, str]]:
+        """End the window and write the report (once); returns the written files"""
+        with self._lock:
+            if self._started is None or self.paths is not None:
+                return self.paths
+            self._done.set()
+            if threading.current_thread() is not self._thread:
+                self._thread.join()
+            self._elapsed = time.perf_counter() - self._started
+            if self._traced:
+                tracemalloc.stop()
+            self.paths = self._write()
+        print(f"🔬 Profile of {self.frames} frames written to {self.paths['summary']}")
+        return self.paths
+
+    @staticmethod
+    def _label(code) -> str:
+        if isinstance(code, str):
+            return code.replace(" ", "_")
+        return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+    def collapsed(self) -> str:
+        """Collapsed stacks: ``thread;outer;...;inner count`` per line"""
+        lines = Counter()
+        for stack, count in self.stacks.items():
+            lines[";".join(self._label(code) for code in stack)] += count
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(lines.items()))
+
+    def top_frames(self) -> List[Dict]:
+        """Functions by samples with them anywhere on the stack (cumulative) and at the top (self)"""
+        cumulative, own = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            functions = {self._label(code) for code in stack[1:]}
+            for function in functions:
+                cumulative[function] += count
+            own[self._label(stack[-1])] += count
+        total = sum(self.stacks.values()) or 1
+        seconds_per_sample = self._elapsed / max(self._ticks, 1)
+        return [
+            {
+                "function": function,
+                "cumulative_pct": round(100 * count / total, 1),
+                "cumulative_s": round(count * seconds_per_sample, 3),
+                "self_pct": round(100 * own[function] / total, 1)
+            }
+            for function, count in cumulative.most_common(self.top)
+        ]
+
+    def summary(self) -> str:
+        samples = sum(self.stacks.values())
+        lines = [
+            f"Profiled {self.frames} frames over {self._elapsed:.1f}s: {samples} samples "
+            f"every {self.interval * 1000:.0f} ms",
+            "",
+            f"{'cum %':>6} {'cum s':>8} {'self %':>6}  function"
+        ]
+        for row in self.top_frames():
+            lines.append(f"{row['cumulative_pct']:>6} {row['cumulative_s']:>8} {row['self_pct']:>6}  {row['function']}")
+        if self.frame_allocations:
+            net = sorted(allocation[0] for allocation in self.frame_allocations)
+            peak = sorted(allocation[1] for allocation in self.frame_allocations)
+            lines += [
+                "",
+                "Allocations per frame (all threads, KiB): "
+                f"peak median {peak[len(peak) // 2] / 1024:.1f}, max {peak[-1] / 1024:.1f}; "
+                f"net median {net[len(net) // 2] / 1024:.1f}, total {sum(net) / 1024:.1f}"
+            ]
+        if self.allocation_growth:
+            sampled = (self.frames + self.snapshot_every - 1) // self.snapshot_every
+            lines += ["", f"Memory kept by sampled frames ({sampled} tracemalloc snapshot pairs):"]
+            for (filename, lineno), size in self.allocation_growth.most_common(self.top):
+                lines.append(f"{size / 1024:>10.1f} KiB  {filename}:{lineno}")
+        return "\n".join(lines) + "\n"
+
+    def _write(self) -> Dict[str, str]:
+        os.makedirs(self.output_dir, exist_ok=True)
+        base = os.path.join(self.output_dir, f"profile-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}")
+        paths = {"collapsed": f"{base}.collapsed", "summary": f"{base}.txt"}
+        with open(paths["collapsed"], "w") as f:
+            f.write(self.collapsed())
+        with open(paths["summary"], "w") as f:
+            f.write(self.summary())
+        return paths
+
+_profiler: Optional[FrameProfiler] = None
+_configured = False
+_configure_lock = threading.Lock()
+
+def enable_profiling(seconds: float = PROFILE_CONFIG["seconds"], **kwargs) -> FrameProfiler:
+    """Profile the frames wrapped in ``profile_frame()`` in this process"""
+    global _profiler, _configured
+    _profiler = FrameProfiler(seconds, **kwargs)
+    _configured = True
+    return _profiler
+
+def _env_seconds() -> Optional[float]:
+    """Seconds to profile from PROFILE_CONFIG["env_var"], or None if it is unset or 0"""
+    env_var = PROFILE_CONFIG["env_var"]
+    value = os.environ.get(env_var, "").strip()
+    try:
+        seconds = float(value) if value else 0.0
+    except ValueError:
+        seconds = None
+    if seconds == 0:
+        return None
+    if seconds is None or not math.isfinite(seconds) or seconds < 0:
+        print(f"⚠️ {env_var}={value!r} is not a number of seconds; "
+              f"profiling for the default {PROFILE_CONFIG['seconds']}s", file=sys.stderr)
+        return PROFILE_CONFIG["seconds"]
+    return PROFILE_CONFIG["seconds"] if seconds == 1 else seconds
+
+def active_profiler() -> Optional[FrameProfiler]:
+    """The process's profiler: enabled explicitly or by PROFILE_CONFIG["env_var"] (seconds, or 1 for the default)"""
+    global _configured
+    if not _configured:
+        # Read the environment once, even if several threads start frames at the same time
+        with _configure_lock:
+            if not _configured:
+                seconds = _env_seconds()
+                if seconds is not None:
+                    enable_profiling(seconds)
+                _configured = True
+    return _profiler
+
+@contextmanager
+def profile_frame():
+    """Profile the enclosed frame processing if profiling is on; otherwise do nothing"""
+    profiler = active_profiler()
+    if profiler is None:
+        yield
+    else:
+        with profiler.frame():
+            yield
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Streaming per-rep trajectory analytics
+
+``RepTracker`` follows the rep angle of an exercise frame by frame. The
+recent trajectory sits in fixed-size ring buffers (for charts), and the
+rep in progress is summarized with running min/max/sum updates, so each
+frame costs the same few operations whether the session is one minute or
+two hours old. When the rep counter completes a rep, the segment since
+the previous rep is closed into a ``RepRecord``:
+
+- depth: the smallest angle reached (lower is deeper)
+- range of motion: largest minus smallest angle
+- eccentric time: from last leaving the top to the deepest point
+- concentric time: from the deepest point back to the top
+- time under tension: frame time spent below the "up" threshold
+"""
+
+from collections import deque
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+from config import ANALYTICS_CONFIG
+
+class RepRecord(NamedTuple):
+    rep: int
+    start: float
+    end: float
+    depth: float
+    range_of_motion: float
+    eccentric: float
+    concentric: float
+    time_under_tension: float
+    mean_angle: float
+
+class RepTracker:
+    def __init__(self, capacity: int = ANALYTICS_CONFIG["history_frames"],
+                 max_reps: int = ANALYTICS_CONFIG["max_reps"]):
+        """Ring buffers for the last ``capacity`` frames and records of the last ``max_reps`` reps"""
+        self.capacity = capacity
+        self._timestamps = np.zeros(capacity, dtype=np.float64)
+        self._angles = np.zeros(capacity, dtype=np.float32)
+        self._head = 0
+        self._size = 0
+        self.reps = deque(maxlen=max_reps)
+        self.total_reps = 0
+        self._start_segment()
+
+    def _start_segment(self, start: float = None):
+        self._start = start
+        self._last_time = start
+        self._last_top = start
+        self._min = float("inf")
+        self._max = float("-inf")
+        self._bottom_time = None
+        self._descent_start = None
+        self._sum = 0.0
+        self._frames = 0
+        self._tension = 0.0
+
+    def reset(self):
+        """Start over: forget the trajectory, the rep in progress and the records"""
+        self._head = self._size = 0
+        self.reps.clear()
+        self.total_reps = 0
+        self._start_segment()
+
+    def update(self, timestamp: float, angle: float, up_threshold: float,
+               rep_completed: bool = False) -> Optional[RepRecord]:
+        """Add one frame's rep angle; returns the finished rep's record when ``rep_completed``"""
+        head = self._head
+        self._timestamps[head] = timestamp
+        self._angles[head] = angle
+        self._head = (head + 1) % self.capacity
+        if self._size < self.capacity:
+            self._size += 1
+
+        if self._start is None:
+            self._start = self._last_top = timestamp
+        if self._last_time is not None and angle < up_threshold:
+            self._tension += timestamp - self._last_time
+        self._last_time = timestamp
+        if angle >= up_threshold:
+            self._last_top = timestamp
+        if angle < self._min:
+            self._min = angle
+            self._bottom_time = timestamp
+            self._descent_start = self._last_top
+        if angle > self._max:
+            self._max = angle
+        self._sum += angle
+        self._frames += 1
+
+        if not rep_completed:
+            return None
+        self.total_reps += 1
+        bottom = self._bottom_time if self._bottom_time is not None else timestamp
+        descent = self._descent_start if self._descent_start is not None else self._start
+        record = RepRecord(
+            rep=self.total_reps,
+            start=self._start,
+            end=timestamp,
+            depth=round(self._min, 1),
+            range_of_motion=round(self._max - self._min, 1),
+            eccentric=round(bottom - descent, 3),
+            concentric=round(timestamp - bottom, 3),
+            time_under_tension=round(self._tension, 3),
+            mean_angle=round(self._sum / self._frames, 1)
+        )
+        self.reps.append(record)
+        self._start_segment(timestamp)
+        return record
+
+    def history(self) -> np.ndarray:
+        """(frames, 2) timestamps and angles of the recent trajectory, oldest first"""
+        order = np.roll(np.arange(self._size), -self._head) if self._size == self.capacity else np.arange(self._size)
+        return np.column_stack((self._timestamps[order], self._angles[order]))
+
+    def records(self) -> List[Dict]:
+        """Per-rep records as dicts, oldest first"""
+        return [record._asdict() for record in self.reps]
+
+    def summary(self) -> Dict:
+        """Averages over the recorded reps"""
+        if not self.reps:
+            return {}
+        count = len(self.reps)
+        return {
+            "reps": count,
+            "depth": round(sum(r.depth for r in self.reps) / count, 1),
+            "range_of_motion": round(sum(r.range_of_motion for r in self.reps) / count, 1),
+            "eccentric": round(sum(r.eccentric for r in self.reps) / count, 3),
+            "concentric": round(sum(r.concentric for r in self.reps) / count, 3),
+            "time_under_tension": round(sum(r.time_under_tension for r in self.reps), 3)
+        }
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Region-of-interest tracking for pose inference
+
+A person in a wide gym shot often covers a fifth of the frame or less,
+and between frames they barely move. ``RoiTracker`` derives a padded box
+around the previous frame's landmarks so the model only sees that crop,
+maps the landmarks it finds back to full-frame coordinates, and drops
+back to the whole frame as soon as the person is lost.
+
+The box only moves when the person gets close to its edges or becomes
+much smaller than it, so consecutive crops usually stay identical and
+the model's own frame-to-frame tracking is not disturbed.
+"""
+
+from typing import Optional, Tuple
+
+import numpy as np
+
+from config import PERFORMANCE_CONFIG
+
+Box = Tuple[int, int, int, int]
+
+class RoiTracker:
+    def __init__(self, padding: float = PERFORMANCE_CONFIG["roi_padding"],
+                 min_visibility: float = PERFORMANCE_CONFIG["roi_min_visibility"],
+                 max_fraction: float = PERFORMANCE_CONFIG["roi_max_fraction"]):
+        """``padding`` is added on every side as a fraction of the person's larger dimension;
+        crops covering more than ``max_fraction`` of the frame are not worth it"""
+        self.padding = padding
+        self.min_visibility = min_visibility
+        self.max_fraction = max_fraction
+        self.roi: Optional[Box] = None
+        self.crops = 0
+        self.full_frames = 0
+        self.fallbacks = 0
+        self._pixels = 0
+        self._frame_pixels = 0
+        self._retry = False
+
+    def reset(self):
+        self.roi = None
+
+    def crop(self, frame: np.ndarray) -> Tuple[np.ndarray, Optional[Box]]:
+        """The part of the frame to run the model on, and the box it came from (None: whole frame)"""
+        roi = self.roi
+        if not self._retry:
+            self._frame_pixels += frame.shape[0] * frame.shape[1]
+        self._retry = False
+        if roi is None:
+            self.full_frames += 1
+            self._pixels += frame.shape[0] * frame.shape[1]
+            return frame, None
+        x0, y0, x1, y1 = roi
+        self.crops += 1
+        self._pixels += (x1 - x0) * (y1 - y0)
+        return frame[y0:y1, x0:x1], roi
+
+    def accept(self, landmarks, roi: Optional[Box], frame_shape) -> bool:
+        """Map landmarks found in a crop back to the full frame (in place) and move the box
+
+        Returns False when a crop lost the person: the box is dropped and
+        the caller should run the model on the whole frame.
+        """
+        height, width = frame_shape[:2]
+        if roi is not None:
+            if landmarks is None or not self._confident(landmarks):
+                self.roi = None
+                self.fallbacks += 1
+                self._retry = True
+                return False
+            x0, y0, x1, y1 = roi
+            scale_x, scale_y = (x1 - x0) / width, (y1 - y0) / height
+            offset_x, offset_y = x0 / width, y0 / height
+            for point in landmarks.landmark:
+                point.x = point.x * scale_x + offset_x
+                point.y = point.y * scale_y + offset_y
+                point.z *= scale_x     # z uses the same scale as x
+        if landmarks is None:
+            self.roi = None
+        else:
+            self._update(landmarks, width, height)
+        return True
+
+    def _confident(self, landmarks) -> bool:
+        visibility = [point.visibility for point in landmarks.landmark]
+        return sum(visibility) / len(visibility) >= self.min_visibility
+
+    def _update(self, landmarks, width: int, height: int):
+        points = [(p.x * width, p.y * height) for p in landmarks.landmark if p.visibility >= self.min_visibility]
+        if len(points) < 2:
+            self.roi = None
+            return
+        xs, ys = zip(*points)
+        left, right, top, bottom = min(xs), max(xs), min(ys), max(ys)
+        pad = max(self.padding * max(right - left, bottom - top), 16)
+
+        roi = self.roi
+        if roi is not None:
+            x0, y0, x1, y1 = roi
+            margin = pad / 2
+            inside = (left - x0 >= margin or x0 == 0) and (x1 - right >= margin or x1 == width) and \
+                     (top - y0 >= margin or y0 == 0) and (y1 - bottom >= margin or y1 == height)
+            padded_area = (right - left + 2 * pad) * (bottom - top + 2 * pad)
+            if inside and (x1 - x0) * (y1 - y0) <= 2 * padded_area:
+                return      # Keep the box still while the person stays well inside it
+
+        box = (max(0, int(left - pad)), max(0, int(top - pad)),
+               min(width, int(right + pad) + 1), min(height, int(bottom + pad) + 1))
+        if (box[2] - box[0]) * (box[3] - box[1]) > self.max_fraction * width * height:
+            self.roi = None     # Person fills most of the frame: just use all of it
+        else:
+            self.roi = box
+
+    def stats(self) -> dict:
+        return {
+            "crops": self.crops,
+            "full_frames": self.full_frames,
+            "fallbacks": self.fallbacks,
+            "pixel_fraction": round(self._pixels / self._frame_pixels, 3) if self._frame_pixels else 1.0
+        }
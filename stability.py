@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Running stability of a pose, for holds such as planks and yoga poses
+
+``StabilityTracker`` keeps an exponentially weighted mean and variance
+(Welford's update with decay) of every landmark position, updated in
+place with a few array operations per frame, plus the same for the
+exercise angle. No window of past frames is stored or rescanned.
+
+Sway is the RMS standard deviation of the body's main joints, divided
+by the torso length so it does not depend on how far the person stands
+from the camera. The pose counts as stable while sway stays within
+``FORM_CONFIG["stability_threshold"]``.
+"""
+
+import math
+from typing import Dict
+
+import numpy as np
+
+from config import FORM_CONFIG
+
+# Shoulders, elbows, wrists, hips, knees and ankles; the face, hands and feet jitter on their own
+BODY_LANDMARKS = np.array([11, 12, 13, 14, 15, 16, 23, 24, 25, 26, 27, 28])
+
+class StabilityTracker:
+    def __init__(self, window: int = FORM_CONFIG["stability_window"],
+                 threshold: float = FORM_CONFIG["stability_threshold"]):
+        """Decay over roughly ``window`` frames (alpha = 2 / (window + 1))"""
+        self.alpha = 2.0 / (window + 1)
+        self.threshold = threshold
+        self.mean = self.var = None
+        self.reset()
+
+    def reset(self):
+        self.frames = 0
+        self.sway = 0.0
+        self.angle_frames = 0
+        self.angle_mean = 0.0
+        self.angle_var = 0.0
+
+    @property
+    def stable(self) -> bool:
+        return self.sway <= self.threshold
+
+    def update(self, positions: np.ndarray) -> float:
+        """Add one frame's (33, >=3) landmark positions; returns the current sway"""
+        positions = positions[:, :3]
+        if self.mean is None or self.mean.shape != positions.shape:
+            self.mean, self.var, self._diff, self._increment = (np.zeros(positions.shape) for _ in range(4))
+            self.frames = 0
+        if self.frames == 0:
+            self.mean[...] = positions
+            self.var.fill(0.0)
+        else:
+            # diff = x - mean; mean += a * diff; var = (1 - a) * (var + diff * a * diff)
+            np.subtract(positions, self.mean, out=self._diff)
+            np.multiply(self._diff, self.alpha, out=self._increment)
+            self.mean += self._increment
+            self._diff *= self._increment
+            self.var += self._diff
+            self.var *= 1.0 - self.alpha
+        self.frames += 1
+
+        mean = self.mean
+        torso = math.hypot(
+            (mean[11, 0] + mean[12, 0] - mean[23, 0] - mean[24, 0]) / 2,
+            (mean[11, 1] + mean[12, 1] - mean[23, 1] - mean[24, 1]) / 2
+        )
+        spread = float(self.var[BODY_LANDMARKS, :2].sum()) / len(BODY_LANDMARKS)
+        self.sway = math.sqrt(spread) / torso if torso > 1e-6 else 0.0
+        return self.sway
+
+    def update_angle(self, angle: float):
+        """Add one frame's exercise angle to its running mean and variance"""
+        self.angle_frames += 1
+        if self.angle_frames == 1:
+            self.angle_mean = angle
+            self.angle_var = 0.0
+            return
+        diff = angle - self.angle_mean
+        increment = self.alpha * diff
+        self.angle_mean += increment
+        self.angle_var = (1.0 - self.alpha) * (self.angle_var + diff * increment)
+
+    def landmark_std(self) -> np.ndarray:
+        """Running standard deviation of each landmark's image position"""
+        if self.var is None:
+            return np.zeros(0)
+        return np.sqrt(self.var[:, :2].sum(axis=1))
+
+    def summary(self) -> Dict:
+        return {
+            "sway": round(self.sway, 4),
+            "angle_std": round(math.sqrt(self.angle_var), 2),
+            "stable": self.stable
+        }
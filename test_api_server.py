@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Tests for the WebSocket frame API, using a stand-in pose model
+"""
+
+import asyncio
+import json
+import threading
+import urllib.request
+
+import cv2
+import numpy as np
+from mediapipe.framework.formats import landmark_pb2
+from websockets.exceptions import ConnectionClosedError
+from websockets.sync.client import connect
+
+from api_server import FrameAPIServer
+from landmark_codec import encode_landmarks
+from test_pose_detector import pushup_landmarks
+
+class ArmResults:
+    def __init__(self, frame):
+        # Both arms bent (dark frame) or straight (bright frame), so pushup state follows the frame
+        self.pose_landmarks = landmark_pb2.NormalizedLandmarkList()
+        for _ in range(33):
+            self.pose_landmarks.landmark.add(x=0.5, y=0.5, visibility=1.0)
+        bent = frame.mean() < 128
+        for shoulder, elbow, wrist in ((11, 13, 15), (12, 14, 16)):
+            self.pose_landmarks.landmark[shoulder].x = 0.3
+            self.pose_landmarks.landmark[elbow].x = 0.5
+            self.pose_landmarks.landmark[wrist].x = 0.35 if bent else 0.7
+            self.pose_landmarks.landmark[wrist].y = 0.4 if bent else 0.5
+
+class ArmModel:
+    def process(self, rgb_frame):
+        return ArmResults(rgb_frame)
+
+def arm_model():
+    return ArmModel()
+
+class FaultyArmModel(ArmModel):
+    def process(self, rgb_frame):
+        # Mid-grey frames crash the model, like an internal cv2 or model error
+        if 100 < rgb_frame.mean() < 150:
+            raise RuntimeError("model crashed")
+        return ArmResults(rgb_frame)
+
+def faulty_arm_model():
+    return FaultyArmModel()
+
+class ServerThread:
+    """Run a FrameAPIServer on its own event loop for blocking test clients"""
+    def __init__(self, **kwargs):
+        self.loop = asyncio.new_event_loop()
+        self.server = FrameAPIServer(port=0, **kwargs)
+        self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self.server.start(), self.loop).result(60)
+        self.url = f"ws://127.0.0.1:{self.server.port}/ws"
+        return self
+
+    def __exit__(self, *exc):
+        asyncio.run_coroutine_threadsafe(self.server.stop(), self.loop).result(60)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(10)
+
+def jpeg(value, size=(64, 48)):
+    return cv2.imencode(".jpg", np.full((size[1], size[0], 3), value, np.uint8))[1].tobytes()
+
+def test_frames_and_per_connection_state():
+    """Test JPEG/raw frames, both response modes and independent rep state per connection"""
+    print("📡 Testing frame API...")
+
+    with ServerThread(decode_threads=2, inference_processes=1, pipeline_depth=2,
+                      model_factory=arm_model) as server:
+        with connect(server.url) as first, connect(server.url) as second:
+            # Annotated mode: JSON result followed by a JPEG
+            first.send(jpeg(0))
+            reply = json.loads(first.recv(timeout=30))
+            assert reply["type"] == "result" and reply["frame"] == 1
+            assert reply["exercise_data"]["state"] == "down", "Bent arms should be the down position"
+            image = cv2.imdecode(np.frombuffer(first.recv(timeout=10), np.uint8), cv2.IMREAD_COLOR)
+            assert image.shape == (48, 64, 3), "Annotated frame not returned"
+
+            # JSON-only raw frames on the second connection; its state starts fresh
+            second.send(json.dumps({"type": "config", "response": "json", "frame_format": "raw",
+                                    "width": 64, "height": 48}))
+            second.send(np.full((48, 64, 3), 255, np.uint8).tobytes())
+            reply = json.loads(second.recv(timeout=30))
+            assert reply["exercise_data"]["state"] == "rest", "State leaked between connections"
+
+            # Pipelined frames come back in order, each exactly once
+            for value in (255, 0, 255):
+                second.send(np.full((48, 64, 3), value, np.uint8).tobytes())
+            replies = [json.loads(second.recv(timeout=30)) for _ in range(3)]
+            assert [r["frame"] for r in replies] == [2, 3, 4], "Replies out of order"
+            assert [r["exercise_data"]["state"] for r in replies] == ["rest", "down", "up"]
+
+            second.send(b"\x00" * 10)
+            assert json.loads(second.recv(timeout=30))["type"] == "error", "Bad frame not reported"
+            second.send(json.dumps({"type": "config", "response": "video"}))
+            assert "response" in json.loads(second.recv(timeout=10))["error"]
+
+        with urllib.request.urlopen(server.url.replace("ws://", "http://").replace("/ws", "/stats")) as response:
+            stats = json.loads(response.read())
+    assert stats["frames"] == 5 and stats["errors"] == 1, f"Unexpected stats: {stats}"
+    assert stats["timings"]["latency"]["count"] == 5
+
+    print("✅ Frame API tests passed!")
+
+def landmark_batch(bent_flags, timestamps, dtype=np.float16):
+    landmarks = np.stack([pushup_landmarks(bent) for bent in bent_flags]).astype(dtype)
+    return np.asarray(timestamps, "<f8").tobytes() + landmarks.astype(np.dtype(dtype).newbyteorder("<")).tobytes()
+
+def test_landmark_ingest():
+    """Test landmark batches counting reps without touching the model"""
+    print("📥 Testing landmark ingest API...")
+
+    with ServerThread(inference_processes=1, model_factory=arm_model) as server:
+        with connect(server.url) as websocket:
+            websocket.send(json.dumps({"type": "config", "frame_format": "landmarks", "dtype": "float16"}))
+            websocket.send(landmark_batch((True, False, True, False), 50.0 + 1.1 * np.arange(4)))
+            reply = json.loads(websocket.recv(timeout=10))
+            assert reply["type"] == "result" and reply["frames"] == 4, f"Unexpected reply: {reply}"
+            assert reply["new_reps"] == 2 and reply["exercise_data"]["reps"] == 2, "Reps not counted"
+            assert reply["exercise_data"]["state"] == "up"
+
+            # The next batch continues the same rep state on the client's clock
+            websocket.send(landmark_batch((True, False), 50.0 + 1.1 * np.arange(4, 6)))
+            reply = json.loads(websocket.recv(timeout=10))
+            assert reply["new_reps"] == 1 and reply["exercise_data"]["reps"] == 3
+
+            websocket.send(b"\x00" * 100)
+            assert json.loads(websocket.recv(timeout=10))["type"] == "error", "Truncated batch not reported"
+
+            # Unknown exercises are refused and the session keeps its exercise
+            websocket.send(json.dumps({"type": "config", "exercise_type": "exercise-123"}))
+            assert "Unknown exercise" in json.loads(websocket.recv(timeout=10))["error"]
+            websocket.send(landmark_batch((True, False), 50.0 + 1.1 * np.arange(6, 8)))
+            reply = json.loads(websocket.recv(timeout=10))
+            assert reply["new_reps"] == 1 and reply["exercise_data"]["reps"] == 4, f"Session disturbed: {reply}"
+
+        with connect(server.url) as websocket:
+            websocket.send(json.dumps({"type": "config", "frame_format": "landmarks", "dtype": "codec"}))
+            landmarks = np.stack([pushup_landmarks(bent) for bent in (True, False, True, False)])
+            websocket.send(encode_landmarks(landmarks, 50.0 + 1.1 * np.arange(4), block_frames=3))
+            reply = json.loads(websocket.recv(timeout=10))
+            assert reply["frames"] == 4 and reply["new_reps"] == 2, f"Codec batch not ingested: {reply}"
+
+    print("✅ Landmark ingest API tests passed!")
+
+def test_frame_failures():
+    """Test that any per-frame failure is replied to, and a dead sender closes the connection"""
+    print("💥 Testing frame failures...")
+
+    with ServerThread(inference_processes=1, pipeline_depth=2, model_factory=faulty_arm_model) as server:
+        with connect(server.url) as websocket:
+            websocket.send(json.dumps({"type": "config", "response": "json"}))
+            for value in (0, 128, 255):
+                websocket.send(jpeg(value))
+            replies = [json.loads(websocket.recv(timeout=30)) for _ in range(3)]
+            assert [r["type"] for r in replies] == ["result", "error", "result"], f"Unexpected replies: {replies}"
+            assert replies[1]["frame"] == 2 and "RuntimeError" in replies[1]["error"], replies[1]
+            assert replies[2]["exercise_data"]["state"] == "up", "Connection did not recover"
+
+        # A failure outside the per-frame handling (here sending a reply) fails the
+        # connection instead of leaving the client waiting
+        send = server.server._send
+
+        async def failing_send(websocket, reply, image=None):
+            if reply.get("frame") == 2:
+                raise RuntimeError("send failed")
+            await send(websocket, reply, image)
+
+        server.server._send = failing_send
+        with connect(server.url) as websocket:
+            websocket.send(json.dumps({"type": "config", "response": "json"}))
+            for value in (0, 255, 0, 255, 0):
+                websocket.send(jpeg(value))
+            assert json.loads(websocket.recv(timeout=30))["frame"] == 1
+            try:
+                websocket.recv(timeout=30)
+                assert False, "Reply after the sender failed"
+            except ConnectionClosedError as e:
+                assert e.rcvd.code == 1011, f"Unexpected close: {e}"
+        assert server.server.connections == 0, "Failed connection not cleaned up"
+
+    print("✅ Frame failure tests passed!")
+
+def main():
+    """Run all tests"""
+    print("🧪 Running frame API tests...")
+    print("=" * 50)
+
+    tests = [
+        test_frames_and_per_connection_state,
+        test_landmark_ingest,
+        test_frame_failures
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except Exception as e:
+            print(f"❌ Test {test.__name__} failed with error: {e}")
+
+    print("\n" + "=" * 50)
+    print(f"📊 Test Results: {passed}/{total} tests passed")
+
+    return passed == total
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Tests for camera handling, using generated video files in place of a webcam
+"""
+
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from camera import CameraManager, ThreadedCapture
+
+def write_test_video(path, frames=30, size=(160, 120), fps=30):
+    """Write a small video whose frame i is filled with brightness i"""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, size)
+    for i in range(frames):
+        writer.write(np.full((size[1], size[0], 3), i * 8 % 256, dtype=np.uint8))
+    writer.release()
+    return path
+
+def test_camera_manager_sharing():
+    """Test that a device is opened once, shared, and released when idle"""
+    print("📷 Testing camera manager...")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        video = write_test_video(os.path.join(tmp_dir, "camera.avi"))
+        manager = CameraManager(idle_timeout=60)
+
+        first = manager.acquire(video)
+        second = manager.acquire(video)
+        assert first is second, "Sessions should share one handle per device"
+        assert manager.open_devices() == {video: 2}, "Reference count not tracked"
+
+        ret, frame = manager.read(video)
+        assert ret and frame.shape == (120, 160, 3), "Could not read from shared device"
+
+        manager.release(video)
+        manager.release(video)
+        assert manager.close_idle() == 0, "Device released before the idle timeout"
+        assert manager.close_idle(now=float("inf")) == 1, "Idle device not released"
+        assert manager.open_devices() == {}, "Released device still tracked"
+
+        try:
+            manager.acquire(os.path.join(tmp_dir, "missing.avi"))
+            assert False, "Opening a missing device should fail"
+        except RuntimeError:
+            pass
+        assert manager.open_devices() == {}, "Failed open must not be cached"
+
+    print("✅ Camera manager tests passed!")
+
+def test_threaded_capture():
+    """Test that the capture thread fills a preallocated ring and serves the newest frame"""
+    print("🎞️ Testing threaded capture...")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        video = write_test_video(os.path.join(tmp_dir, "camera.avi"), frames=30, fps=60)
+
+        # Unpaced: frames arrive as fast as they decode, so a slow consumer skips some
+        with ThreadedCapture(video, buffer_size=3, realtime=False) as capture:
+            buffers = set()
+            frame_ids = []
+            while True:
+                ret, frame, frame_id, _ = capture.read(timeout=2.0)
+                if not ret:
+                    break
+                assert frame.shape == (120, 160, 3), "Unexpected frame shape"
+                buffers.add(frame.__array_interface__["data"][0])
+                frame_ids.append(frame_id)
+                time.sleep(0.01)
+
+        assert frame_ids and frame_ids == sorted(set(frame_ids)), "Frames must be newer on every read"
+        assert frame_ids[-1] == 30, "The newest frame should be the last one decoded"
+        assert len(buffers) <= 3, "Frames must come from the preallocated ring"
+        assert capture.frames_captured == 30, "Not every frame was captured"
+        assert capture.frames_dropped == 30 - len(frame_ids), "Skipped frames not counted"
+        assert capture.timings.summary()["capture"]["count"] >= 29, "Capture timing not recorded"
+
+        # Paced at the file's fps like a live camera: a fast consumer sees every frame
+        start = time.monotonic()
+        with ThreadedCapture(video, realtime=True) as capture:
+            count = 0
+            while capture.read(timeout=2.0)[0]:
+                count += 1
+        assert count == 30, "A fast consumer should not miss frames"
+        assert time.monotonic() - start >= 0.4, "Video file was not paced at its fps"
+
+        try:
+            ThreadedCapture(video, buffer_size=2)
+            assert False, "A ring smaller than three slots should be rejected"
+        except ValueError:
+            pass
+
+    print("✅ Threaded capture tests passed!")
+
+def main():
+    """Run all tests"""
+    print("🧪 Running camera tests...")
+    print("=" * 50)
+
+    tests = [
+        test_camera_manager_sharing,
+        test_threaded_capture
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except Exception as e:
+            print(f"❌ Test {test.__name__} failed with error: {e}")
+
+    print("\n" + "=" * 50)
+    print(f"📊 Test Results: {passed}/{total} tests passed")
+
+    return passed == total
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Tests for automatic exercise recognition
+"""
+
+import os
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from exercise_recognizer import (AUTO_EXERCISE, EXERCISE_TEMPLATES, ExerciseRecognizer, TemplateLibrary,
+                                 _cycle, default_library, resample)
+from pose_detector import PoseDetector
+from pose_features import FEATURES, joint_angles, pose_vector, render_pose
+
+def exercise_motion(exercise, period=2.2, seconds=4.0, fps=30, noise=0.003, seed=0):
+    """Landmarks and timestamps of a stick figure doing an exercise from EXERCISE_TEMPLATES"""
+    rng = np.random.default_rng(seed)
+    poses = np.array([pose_vector(keyframe) for keyframe in EXERCISE_TEMPLATES[exercise]])
+    t = np.arange(int(seconds * fps)) / fps
+    angles = np.repeat(poses[:1], len(t), axis=0) if len(poses) == 1 else _cycle(poses, t / period + 0.3)
+    frames = np.stack([render_pose(dict(zip(FEATURES, row))) for row in angles])
+    frames[:, :, :2] += rng.normal(0, noise, frames[:, :, :2].shape)
+    return frames, t
+
+def naive_dtw(query, template, band):
+    """Banded DTW written out cell by cell"""
+    length = len(query)
+    cost = np.full((length, length), np.inf)
+    for i in range(length):
+        for j in range(max(0, i - band), min(length, i + band + 1)):
+            step = np.linalg.norm(query[i] - template[j])
+            if i == 0 and j == 0:
+                cost[i, j] = step
+                continue
+            previous = min(cost[i - 1, j - 1] if i and j else np.inf, cost[i - 1, j] if i else np.inf,
+                           cost[i, j - 1] if j else np.inf)
+            cost[i, j] = step + previous
+    return cost[-1, -1] / length
+
+def test_pose_features():
+    """Test that features of a rendered pose give back its angles"""
+    print("🦴 Testing pose features...")
+
+    pose = {"left_shoulder": 75, "right_shoulder": 40, "elbow": 80, "left_hip": 120,
+            "right_hip": 170, "left_knee": 60, "right_knee": 175, "torso": 95}
+    features = joint_angles(render_pose(pose)[None])[0]
+    assert np.allclose(features, pose_vector(pose), atol=1e-3), f"Angles not recovered: {features}"
+    # Moving or scaling the figure leaves the features alone
+    moved = render_pose(pose, center=(0.3, 0.7))
+    moved[:, :2] = 0.3 + (moved[:, :2] - 0.3) * 1.5
+    assert np.allclose(joint_angles(moved[None])[0], features, atol=1e-3), "Features depend on position"
+
+    print("✅ Pose feature tests passed!")
+
+def test_dtw_and_lower_bound():
+    """Test the vectorized DTW against a cell-by-cell one, and LB_Keogh as its lower bound"""
+    print("〰️ Testing DTW and lower bounds...")
+
+    library = default_library()
+    rng = np.random.default_rng(1)
+    for _ in range(3):
+        query = library.windows[rng.integers(len(library.windows))] + rng.normal(0, 0.03, library.windows.shape[1:])
+        candidates = rng.integers(0, len(library.windows), 5)
+        distances = library.dtw(query, candidates)
+        expected = [naive_dtw(query, library.windows[i], library.band) for i in candidates]
+        assert np.allclose(distances, expected), f"DTW differs: {distances} vs {expected}"
+        assert (library.lower_bounds(query, candidates) <= distances + 1e-12).all(), "Lower bound above DTW"
+
+    print("✅ DTW and lower bound tests passed!")
+
+def test_recognition():
+    """Test that streamed exercises are recognized, whichever side leads"""
+    print("🔎 Testing exercise recognition...")
+
+    for exercise in ("pushup", "squat", "jumping jack", "bicep curl", "lunge", "plank", "warrior II"):
+        frames, t = exercise_motion(exercise)
+        recognizer = ExerciseRecognizer()
+        for frame, timestamp in zip(frames, t):
+            recognizer.update(frame, timestamp)
+        print(f"   {exercise}: {recognizer.summary()}")
+        assert recognizer.exercise == exercise, f"{exercise} recognized as {recognizer.exercise}"
+
+    # Mirrored: the other leg in front
+    frames, t = exercise_motion("lunge", seed=2)
+    left, right = [11, 13, 15, 23, 25, 27], [12, 14, 16, 24, 26, 28]
+    frames[:, left + right] = frames[:, right + left]
+    recognizer = ExerciseRecognizer()
+    for frame, timestamp in zip(frames, t):
+        recognizer.update(frame, timestamp)
+    assert recognizer.exercise == "lunge", "Mirrored lunge not recognized"
+
+    # Not enough motion yet: no guess
+    recognizer = ExerciseRecognizer()
+    frames, t = exercise_motion("squat", seconds=1.5)
+    for frame, timestamp in zip(frames, t):
+        assert recognizer.update(frame, timestamp) is None, "Guessed before a full window"
+
+    print("✅ Exercise recognition tests passed!")
+
+def test_library_storage():
+    """Test saving, loading and extending a template library"""
+    print("💾 Testing template library storage...")
+
+    library = TemplateLibrary.build({name: EXERCISE_TEMPLATES[name] for name in ("pushup", "squat")})
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "templates.npz")
+        library.save(path)
+        loaded = TemplateLibrary.load(path)
+    assert np.array_equal(loaded.windows, library.windows) and list(loaded.labels) == list(library.labels)
+
+    frames, t = exercise_motion("bicep curl", seconds=5)
+    extended = library.extend("bicep curl", frames, t)
+    assert len(extended.windows) > len(library.windows) and "bicep curl" in extended.labels
+    window = resample(t, joint_angles(frames) / 180, t[-1] - 0.25, 2.5, library.windows.shape[1])
+    assert extended.match(window)[0] == "bicep curl", "Recorded template not matched"
+
+    print("✅ Template library storage tests passed!")
+
+def test_auto_exercise():
+    """Test that PoseDetector switches to the recognized exercise and counts its reps"""
+    print("🤖 Testing auto-detected exercise...")
+
+    detector = PoseDetector(load_model=False)
+    detector.exercise_type = "squat"
+    frames, t = exercise_motion("pushup", period=1.6, seconds=12)
+    results = detector.ingest_landmarks(frames, AUTO_EXERCISE, t)
+    print(f"   Detected {results[-1]['exercise']}, {results[-1]['reps']} reps")
+    assert results[-1]["exercise"] == "pushup" and detector.exercise_type == "pushup"
+    assert results[-1]["recognition"]["exercise"] == "pushup"
+    assert results[-1]["reps"] >= 4, f"Pushups after recognition not counted: {results[-1]['reps']}"
+    assert detector.get_exercise_stats()["exercise_type"] == "pushup"
+
+    print("✅ Auto-detected exercise tests passed!")
+
+def test_match_cost():
+    """Test that matching a window costs under a millisecond"""
+    print("⏱️ Testing recognition cost...")
+
+    library = default_library()
+    windows = []
+    for exercise in ("pushup", "squat", "burpee", "mountain climber", "tree pose"):
+        frames, t = exercise_motion(exercise)
+        windows.append(resample(t, joint_angles(frames) / 180, t[-1], 2.5, library.windows.shape[1]))
+    library.match(windows[0])
+    timings = []
+    for _ in range(20):
+        for window in windows:
+            start = time.perf_counter()
+            library.match(window)
+            timings.append(time.perf_counter() - start)
+    median_ms = statistics.median(timings) * 1000
+    print(f"   {median_ms:.3f} ms per window ({len(library.windows)} templates)")
+    assert median_ms < 1.0, f"Recognition too slow: {median_ms:.3f} ms"
+
+    print("✅ Recognition cost tests passed!")
+
+def main():
+    """Run all tests"""
+    print("🧪 Running exercise recognition tests...")
+    print("=" * 50)
+
+    tests = [
+        test_pose_features,
+        test_dtw_and_lower_bound,
+        test_recognition,
+        test_library_storage,
+        test_auto_exercise,
+        test_match_cost
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except Exception as e:
+            print(f"❌ Test {test.__name__} failed with error: {e}")
+
+    print("\n" + "=" * 50)
+    print(f"📊 Test Results: {passed}/{total} tests passed")
+
+    return passed == total
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared-memory frame transport
+"""
+
+import multiprocessing as mp
+import time
+
+import numpy as np
+
+from frame_transport import PoseWorkerPool, SharedFrameRing
+
+class ChecksumResults:
+    def __init__(self, frame):
+        # Stands in for landmarks: proves the worker saw the frame contents
+        self.pose_landmarks = int(frame.sum())
+
+class ChecksumModel:
+    def process(self, rgb_frame):
+        return ChecksumResults(rgb_frame)
+
+def checksum_model():
+    return ChecksumModel()
+
+class SlowFirstModel(ChecksumModel):
+    def process(self, rgb_frame):
+        # Every third frame stalls so later frames overtake it
+        if int(rgb_frame[0, 0, 0]) % 3 == 0:
+            time.sleep(0.2)
+        return super().process(rgb_frame)
+
+def slow_first_model():
+    return SlowFirstModel()
+
+def _fill_in_place(ring, done):
+    item = ring.get(timeout=5)
+    slot, meta = item
+    ring.frame(slot)[...] = meta["value"]
+    done.put(slot)
+    ring.close()
+
+def test_ring_slots_are_shared_and_reused():
+    """Test that frames cross processes through shared slots that get handed back"""
+    print("🚚 Testing shared frame ring...")
+
+    ring = SharedFrameRing((4, 6, 3), slots=2)
+    try:
+        # A child writes into the slot in place; the parent sees it without any copy back
+        done = mp.Queue()
+        slot = ring.acquire(timeout=0)
+        ring.publish(slot, {"value": 7})
+        child = mp.Process(target=_fill_in_place, args=(ring, done))
+        child.start()
+        assert done.get(timeout=10) == slot, "Child did not process the published slot"
+        child.join(10)
+        assert (ring.frame(slot) == 7).all(), "Write in the child not visible in shared memory"
+        ring.release(slot)
+
+        # Two slots: a third frame is dropped until a consumer returns one
+        frame = np.ones((4, 6, 3), np.uint8)
+        assert ring.put(frame, {"frame_id": 1}) and ring.put(frame, {"frame_id": 2})
+        assert not ring.put(frame, {"frame_id": 3}), "Full ring should drop instead of blocking"
+        slot, meta = ring.get(timeout=1)
+        assert meta == {"frame_id": 1}, "Frames must be delivered in order"
+        ring.release(slot)
+        assert ring.put(frame, {"frame_id": 3}), "Released slot was not reused"
+
+        try:
+            ring.put(np.ones((2, 2, 3), np.uint8))
+            assert False, "Frames of the wrong shape should be rejected"
+        except ValueError:
+            pass
+    finally:
+        ring.close()
+
+    print("✅ Shared frame ring tests passed!")
+
+def test_pose_worker_pool():
+    """Test that worker processes read every submitted frame from the ring"""
+    print("👷 Testing pose worker pool...")
+
+    shape = (48, 64, 3)
+    with PoseWorkerPool(shape, workers=2, slots=3, model_factory=checksum_model) as pool:
+        expected = {}
+        for i in range(20):
+            frame = np.full(shape, i, np.uint8)
+            assert pool.submit(frame, timeout=5, frame_id=i), "Frame not accepted"
+            expected[i] = int(frame.sum())
+        results = [pool.get(timeout=10) for _ in range(20)]
+
+    assert None not in results, "Missing results"
+    got = {meta["frame_id"]: checksum for meta, checksum in results}
+    assert got == expected, "Workers saw the wrong frame contents"
+    assert pool.submitted == 20 and pool.dropped == 0
+
+    print("✅ Pose worker pool tests passed!")
+
+def test_pose_worker_pool_ordering():
+    """Test that get_ordered hands results back in submission order"""
+    print("🔢 Testing pose worker pool ordering...")
+
+    shape = (8, 8, 3)
+    with PoseWorkerPool(shape, workers=3, slots=6, model_factory=slow_first_model) as pool:
+        for i in range(12):
+            assert pool.submit(np.full(shape, i, np.uint8), timeout=5, frame_id=i)
+        completion = [pool.get(timeout=10) for _ in range(12)]
+    assert None not in completion, "Missing results"
+    assert [meta["frame_id"] for meta, _ in completion] != list(range(12)), \
+        "Workers finished in order; the test proves nothing"
+
+    with PoseWorkerPool(shape, workers=3, slots=6, model_factory=slow_first_model) as pool:
+        for i in range(12):
+            assert pool.submit(np.full(shape, i, np.uint8), timeout=5, frame_id=i)
+        ordered = [pool.get_ordered(timeout=10) for _ in range(12)]
+        assert pool.get_ordered(timeout=0.1) is None, "Result out of nowhere"
+
+    assert None not in ordered, "Missing results"
+    assert [meta["frame_id"] for meta, _ in ordered] == list(range(12)), "Results not in submission order"
+    assert [meta["seq"] for meta, _ in ordered] == list(range(12))
+
+    print("✅ Pose worker pool ordering tests passed!")
+
+def main():
+    """Run all tests"""
+    print("🧪 Running frame transport tests...")
+    print("=" * 50)
+
+    tests = [
+        test_ring_slots_are_shared_and_reused,
+        test_pose_worker_pool,
+        test_pose_worker_pool_ordering
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except Exception as e:
+            print(f"❌ Test {test.__name__} failed with error: {e}")
+
+    print("\n" + "=" * 50)
+    print(f"📊 Test Results: {passed}/{total} tests passed")
+
+    return passed == total
+
+if __name__ == "__main__":
+    main()
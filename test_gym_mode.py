@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Tests for multi-stream gym mode, using generated video files and a stand-in pose model
+"""
+
+import os
+import tempfile
+import time
+from collections import Counter
+
+import numpy as np
+
+from gym_mode import FairScheduler, GymRunner, Stream
+from test_camera import write_test_video
+
+class FakeResults:
+    pose_landmarks = None
+
+class FakeModel:
+    """Pose model stand-in that takes a fixed time per frame and finds nobody"""
+    def __init__(self, delay=0.0):
+        self.delay = delay
+
+    def process(self, rgb_frame):
+        time.sleep(self.delay)
+        return FakeResults()
+
+class AlwaysReadyCapture:
+    """Capture stand-in that always has a fresh frame"""
+    running = True
+    frames_dropped = 0
+
+    def __init__(self):
+        self.frame_id = 0
+
+    def has_new_frame(self):
+        return True
+
+    def read(self, timeout=None):
+        self.frame_id += 1
+        return True, np.zeros((4, 4, 3), np.uint8), self.frame_id, time.monotonic()
+
+def test_weighted_round_robin():
+    """Test that busy streams are served in proportion to their weights, without bursts"""
+    print("⚖️ Testing weighted round-robin scheduling...")
+
+    streams = [Stream("a", "a.avi", weight=3), Stream("b", "b.avi"), Stream("c", "c.avi")]
+    for stream in streams:
+        stream.capture = AlwaysReadyCapture()
+    scheduler = FairScheduler(streams)
+
+    order = []
+    for _ in range(500):
+        stream, frame, _ = scheduler.next_job()
+        order.append(stream.name)
+        scheduler.done(stream)
+
+    counts = Counter(order)
+    assert counts == {"a": 300, "b": 100, "c": 100}, f"Picks not proportional to weights: {counts}"
+    longest_run = max(len(run) for run in "".join(order).replace("b", " ").replace("c", " ").split())
+    assert longest_run <= 2, "Smooth round-robin should interleave the heavy stream"
+
+    # A stream with a frame in flight is skipped until it is done
+    first, _, _ = scheduler.next_job()
+    second, _, _ = scheduler.next_job()
+    assert first is not second, "A stream must not have two frames in flight"
+
+    print("✅ Weighted round-robin tests passed!")
+
+def test_gym_runner_streams():
+    """Test that every stream is served fairly and its frames are accounted for"""
+    print("🏋️ Testing gym mode runner...")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        streams = [
+            Stream(f"cam{i}", write_test_video(os.path.join(tmp_dir, f"cam{i}.avi"), frames=30),
+                   exercise_type="squat")
+            for i in range(4)
+        ]
+        # Two workers at ~20 fps each cannot keep up with four 30 fps cameras
+        with GymRunner(streams, workers=2, model_factory=lambda: FakeModel(delay=0.05)) as runner:
+            assert runner.wait(timeout=10), "Runner did not finish its video sources"
+            metrics = runner.metrics()
+
+    processed = [m["processed"] for m in metrics.values()]
+    for name, m in metrics.items():
+        assert m["captured"] == 30, f"{name}: not every frame was captured"
+        assert m["processed"] + m["dropped"] == 30, f"{name}: frames unaccounted for"
+        assert m["fps"] > 0, f"{name}: no fps reported"
+    assert sum(processed) < 120, "Overloaded workers should drop frames"
+    assert max(processed) - min(processed) <= 3, f"Equal-weight streams served unevenly: {processed}"
+    assert all(stream.result is not None for stream in streams), "Stream without a processed frame"
+    assert all(stream.detector.exercise_type == "squat" for stream in streams), "Per-stream state not used"
+
+    print("✅ Gym mode runner tests passed!")
+
+def main():
+    """Run all tests"""
+    print("🧪 Running gym mode tests...")
+    print("=" * 50)
+
+    tests = [
+        test_weighted_round_robin,
+        test_gym_runner_streams
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except Exception as e:
+            print(f"❌ Test {test.__name__} failed with error: {e}")
+
+    print("\n" + "=" * 50)
+    print(f"📊 Test Results: {passed}/{total} tests passed")
+
+    return passed == total
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Tests for the local inference service, using loopback clients and a stand-in pose model
+"""
+
+import threading
+import time
+
+import numpy as np
+from mediapipe.framework.formats import landmark_pb2
+
+from inference_service import InferenceClient, InferenceService, RemotePoseDetector, start_service_process
+
+class TaggedResults:
+    def __init__(self, frame):
+        # A full skeleton whose x carries the frame's fill value, so results can be traced to callers
+        self.pose_landmarks = None
+        value = int(frame[0, 0, 0])
+        if value:
+            self.pose_landmarks = landmark_pb2.NormalizedLandmarkList()
+            for _ in range(33):
+                self.pose_landmarks.landmark.add(x=value / 255.0, y=0.5, visibility=1.0)
+
+class SlowModel:
+    def process(self, rgb_frame):
+        time.sleep(0.01)
+        return TaggedResults(rgb_frame)
+
+def slow_model():
+    return SlowModel()
+
+class StallingModel(SlowModel):
+    def process(self, rgb_frame):
+        if rgb_frame[0, 0, 0] == 200:
+            time.sleep(0.5)     # Longer than the client waits
+        return super().process(rgb_frame)
+
+def stalling_model():
+    return StallingModel()
+
+def test_batched_results_reach_their_callers():
+    """Test that frames from many sessions are batched and answered to the right session"""
+    print("🧠 Testing inference service batching...")
+
+    with InferenceService(port=0, workers=2, max_batch=4, batch_deadline=0.02,
+                          model_factory=slow_model) as service:
+        errors = []
+
+        def session(value):
+            client = InferenceClient(service.address)
+            try:
+                for _ in range(10):
+                    landmarks = client.infer(np.full((24, 32, 3), value, np.uint8))
+                    if round(landmarks.landmark[0].x * 255) != value:
+                        errors.append(f"Session {value} got another session's result")
+            except Exception as e:
+                errors.append(f"Session {value} failed: {e}")
+            finally:
+                client.close()
+
+        threads = [threading.Thread(target=session, args=(value,)) for value in range(1, 9)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(30)
+
+        client = InferenceClient(service.address)
+        assert client.infer(np.zeros((24, 32, 3), np.uint8)) is None, "No detection should come back as None"
+        stats = client.stats()
+        client.close()
+
+    assert not errors, errors[0]
+    assert stats["requests"] == 81 and stats["completed"] == 81, "Requests went missing"
+    assert stats["mean_batch_size"] > 1, "Concurrent sessions were not batched"
+    assert stats["max_batch_size"] <= 4, "Batch exceeded max_batch"
+    assert stats["throughput_fps"] > 0 and stats["queue_wait_ms"]["count"] == 81, "Stats not reported"
+
+    print("✅ Inference service batching tests passed!")
+
+def test_service_process_and_remote_detector():
+    """Test a service in its own process driving a session's local rep tracker"""
+    print("🔌 Testing inference service process...")
+
+    process, address, stop = start_service_process(port=0, workers=1, model_factory=slow_model)
+    try:
+        detector = RemotePoseDetector(address)
+        frame = np.full((24, 32, 3), 9, np.uint8)
+        annotated, exercise_data = detector.process_frame(frame, "stub exercise")
+        assert annotated.shape == frame.shape and annotated is not frame, "Frame not annotated on a copy"
+        assert exercise_data["state"] == "not_implemented", "Landmarks not routed to the rep tracker"
+        assert detector.exercise_type == "stub exercise", "Session state not updated"
+        assert detector.client.last_reply["batch_size"] >= 1, "Reply metadata missing"
+
+        try:
+            detector.client.infer(np.zeros((4, 4), np.uint8))
+            assert False, "A non-BGR frame should be rejected"
+        except RuntimeError:
+            pass
+        detector.client.close()
+    finally:
+        stop()
+    assert not process.is_alive(), "Service process did not stop"
+
+    print("✅ Inference service process tests passed!")
+
+def test_timeouts_and_failures():
+    """Test that a client recovers from a timed-out request and a session survives service failures"""
+    print("⏳ Testing inference timeouts...")
+
+    with InferenceService(port=0, workers=1, model_factory=stalling_model) as service:
+        client = InferenceClient(service.address, timeout=0.2)
+        try:
+            client.infer(np.full((24, 32, 3), 200, np.uint8))
+            assert False, "Stalled request did not time out"
+        except TimeoutError:
+            pass
+        # The stalled request's reply arrives late and is skipped
+        client.timeout = 5.0
+        for value in (7, 8):
+            landmarks = client.infer(np.full((24, 32, 3), value, np.uint8))
+            assert round(landmarks.landmark[0].x * 255) == value, "Got a stale reply"
+        client.close()
+
+        detector = RemotePoseDetector(service.address)
+        detector.client.timeout = 0.2
+        frame = np.full((24, 32, 3), 200, np.uint8)
+        _, exercise_data = detector.process_frame(frame, "pushup")
+        assert detector.failed_requests >= 1 and exercise_data["state"] == "no_detection", exercise_data
+        failed = detector.failed_requests
+        detector.client.timeout = 5.0
+        _, exercise_data = detector.process_frame(np.full((24, 32, 3), 9, np.uint8), "pushup")
+        assert detector.failed_requests == failed and exercise_data["state"] != "no_detection", "Session did not recover"
+        detector.client.close()
+        _, exercise_data = detector.process_frame(np.full((24, 32, 3), 60, np.uint8), "pushup")
+        assert detector.failed_requests > failed and exercise_data["state"] == "no_detection", \
+            "Closed connection not treated as no detection"
+
+    print("✅ Inference timeout tests passed!")
+
+def main():
+    """Run all tests"""
+    print("🧪 Running inference service tests...")
+    print("=" * 50)
+
+    tests = [
+        test_batched_results_reach_their_callers,
+        test_service_process_and_remote_detector,
+        test_timeouts_and_failures
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except Exception as e:
+            print(f"❌ Test {test.__name__} failed with error: {e}")
+
+    print("\n" + "=" * 50)
+    print(f"📊 Test Results: {passed}/{total} tests passed")
+
+    return passed == total
+
+if __name__ == "__main__":
+    main()
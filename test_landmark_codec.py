@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Tests for the landmark codec
+"""
+
+import struct
+import tracemalloc
+import zlib
+
+import numpy as np
+
+from landmark_codec import (FLAG_ZLIB, MAX_COORDINATE_ERROR, MAX_VISIBILITY_ERROR, LandmarkEncoder, array_to_landmarks,
+                            decode_block, decode_landmarks, encode_block, encode_landmarks, landmarks_to_array,
+                            synthetic_motion)
+
+def test_bounded_error():
+    """Test decoded landmarks staying within the quantization step of the originals"""
+    print("🎯 Testing codec error bounds...")
+
+    data, timestamps = synthetic_motion(120)
+    originals = [array_to_landmarks(frame) for frame in data]
+    encoder = LandmarkEncoder(block_frames=50)
+    encoded = b"".join(filter(None, (encoder.add(landmarks, t) for landmarks, t in zip(originals, timestamps))))
+    encoded += encoder.flush()
+
+    decoded, decoded_timestamps = decode_landmarks(encoded)
+    assert decoded.shape == (120, 33, 4), f"Unexpected shape {decoded.shape}"
+    for original, frame in zip(originals, decoded):
+        restored = array_to_landmarks(frame)
+        for a, b in zip(original.landmark, restored.landmark):
+            assert max(abs(a.x - b.x), abs(a.y - b.y), abs(a.z - b.z)) <= MAX_COORDINATE_ERROR + 1e-6
+            assert abs(a.visibility - b.visibility) <= MAX_VISIBILITY_ERROR + 1e-6
+    assert np.abs(decoded_timestamps - timestamps).max() <= 0.0005, "Timestamps drifted"
+
+    print("✅ Codec error bounds tests passed!")
+
+def test_missing_frames_and_blocks():
+    """Test no-detection frames, block boundaries and corrupt input"""
+    print("🧱 Testing codec blocks...")
+
+    data, _ = synthetic_motion(10)
+    data[0] = np.nan
+    data[4] = np.nan
+    for compress in (False, True):
+        encoded = encode_landmarks(data, block_frames=4, compress=compress)
+        decoded, timestamps = decode_landmarks(encoded)
+        assert timestamps is None, "Timestamps invented"
+        missing = np.isnan(decoded).all(axis=(1, 2))
+        assert missing.tolist() == [i in (0, 4) for i in range(10)], "No-detection frames not kept"
+        assert np.abs(decoded[~missing] - data[~missing]).max() <= MAX_VISIBILITY_ERROR + 1e-6
+
+    # Blocks decode on their own
+    first = encode_block(data[:4])
+    frames, _, end = decode_block(first + encode_block(data[4:]))
+    assert end == len(first) and len(frames) == 4, "Block boundary not respected"
+    assert landmarks_to_array(array_to_landmarks(data[1])).shape == (33, 4)
+
+    for corrupt in (first[:-3], first[:4] + b"\x01\x04\x00" + zlib.compress(b"short")):
+        try:
+            decode_landmarks(corrupt)
+        except ValueError:
+            continue
+        raise AssertionError("Corrupt block not rejected")
+
+    # A block that inflates far past its frame count is rejected without inflating it
+    bomb = zlib.compress(bytes(64 << 20), 9)
+    header = struct.pack("<IBH", len(bomb) + 3, FLAG_ZLIB, 1)
+    tracemalloc.start()
+    try:
+        decode_block(header + bomb)
+        raise AssertionError("Decompression bomb not rejected")
+    except ValueError as e:
+        assert "inflates past" in str(e), e
+    finally:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    print(f"   {len(bomb)} byte bomb rejected with a {peak / 1024:.0f} KiB peak")
+    assert peak < 1 << 20, "Bomb inflated before the size check"
+
+    print("✅ Codec block tests passed!")
+
+def test_compression_ratio():
+    """Test encoded landmarks being several times smaller than float64"""
+    print("🗜️ Testing codec size...")
+
+    data, timestamps = synthetic_motion(300)
+    encoded = encode_landmarks(data, timestamps)
+    ratio = data.astype(np.float64).nbytes / len(encoded)
+    print(f"   {len(encoded) / len(data):.1f} bytes/frame, {ratio:.1f}x smaller than float64")
+    assert ratio >= 5, f"Compression ratio only {ratio:.1f}x"
+
+    # A still pose costs almost nothing
+    still = np.repeat(data[:1], 300, axis=0)
+    assert len(encode_landmarks(still)) < len(encoded) / 5, "Unchanged frames not delta-encoded"
+
+    print("✅ Codec size tests passed!")
+
+def main():
+    """Run all tests"""
+    print("🧪 Running landmark codec tests...")
+    print("=" * 50)
+
+    tests = [
+        test_bounded_error,
+        test_missing_frames_and_blocks,
+        test_compression_ratio
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except Exception as e:
+            print(f"❌ Test {test.__name__} failed with error: {e}")
+
+    print("\n" + "=" * 50)
+    print(f"📊 Test Results: {passed}/{total} tests passed")
+
+    return passed == total
+
+if __name__ == "__main__":
+    main()
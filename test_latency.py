@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Tests for per-stage latency histograms
+"""
+
+import time
+import urllib.error
+import urllib.request
+
+import numpy as np
+
+from latency import (PROCESS_LATENCY, LatencyHistogram, LatencyRecorder, prometheus_text,
+                     start_metrics_server, stop_metrics_server)
+from pose_detector import PoseDetector
+from pose_features import render_pose
+
+def test_histogram_accuracy():
+    """Test that quantiles from the histogram stay within its precision"""
+    print("📊 Testing latency histogram accuracy...")
+
+    rng = np.random.default_rng(0)
+    samples_us = np.concatenate([rng.lognormal(np.log(800), 0.5, 5000),
+                                 rng.lognormal(np.log(40000), 0.3, 500)]).astype(np.int64)
+    histogram = LatencyHistogram()
+    for micros in samples_us.tolist():
+        histogram.record(micros * 1000)
+    for q, value in zip((0.5, 0.9, 0.99), histogram.quantiles([0.5, 0.9, 0.99])):
+        expected = np.quantile(samples_us, q, method="inverted_cdf") / 1000
+        assert abs(value - expected) <= 0.02 * expected, f"p{q * 100:.0f}: {value} vs {expected}"
+    summary = histogram.summary()
+    print(f"   {summary}")
+    assert summary["count"] == len(samples_us) and summary["max_ms"] == samples_us.max() / 1000
+    assert abs(summary["mean_ms"] - samples_us.mean() / 1000) < 0.01
+
+    # Every value falls in a bucket whose upper bound is at least the value and within precision
+    values = np.unique(np.geomspace(1, 5e7, 2000).astype(np.int64))
+    upper = histogram._upper([histogram._index(v) for v in values.tolist()])
+    assert (upper >= values).all() and (upper <= values * 1.016 + 1).all(), "Bucket bounds off"
+    # Anything past max_seconds lands in the last bucket
+    histogram.record(10 ** 15)
+    assert histogram.counts[-1] == 1
+
+    print("✅ Latency histogram accuracy tests passed!")
+
+def test_session_and_process_recorders():
+    """Test that a detector's stage timings also reach the process-wide recorder"""
+    print("🧩 Testing session and process latency...")
+
+    process_before = PROCESS_LATENCY.summary().get("detect", {}).get("count", 0)
+    detector = PoseDetector(load_model=False)
+    frames = np.repeat(render_pose({"elbow": 120})[None], 20, axis=0)
+    detector.ingest_landmarks(frames, "pushup", np.arange(20) / 30)
+    summary = detector.get_exercise_stats()["latency"]
+    print(f"   detect p50 {summary['detect']['p50_ms']} ms")
+    assert summary["detect"]["count"] == 20, summary
+    assert PROCESS_LATENCY.summary()["detect"]["count"] == process_before + 20
+
+    # Stages come out in pipeline order
+    recorder = LatencyRecorder()
+    for stage in ("frame", "annotate", "decode"):
+        recorder.record(stage, 1000)
+    assert list(recorder.summary()) == ["decode", "annotate", "frame"]
+
+    print("✅ Session and process latency tests passed!")
+
+def test_prometheus_endpoint():
+    """Test the Prometheus text served on localhost"""
+    print("📈 Testing Prometheus metrics endpoint...")
+
+    recorder = LatencyRecorder()
+    for micros in (300, 800, 3000, 40000):
+        recorder.record("inference", micros * 1000)
+    text = prometheus_text(recorder)
+    assert 'fitness_coach_stage_latency_seconds_bucket{stage="inference",le="0.001"} 2' in text, text
+    assert 'fitness_coach_stage_latency_seconds_bucket{stage="inference",le="+Inf"} 4' in text
+    assert 'fitness_coach_stage_latency_seconds_count{stage="inference"} 4' in text
+
+    server = start_metrics_server(port=0)
+    try:
+        assert start_metrics_server(port=0) is server, "Started a second server"
+        PROCESS_LATENCY.record("decode", 2_000_000)
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        with urllib.request.urlopen(f"{url}/metrics", timeout=5) as response:
+            body = response.read().decode()
+        assert response.headers["Content-Type"].startswith("text/plain")
+        assert 'fitness_coach_stage_latency_seconds_count{stage="decode"}' in body
+        try:
+            urllib.request.urlopen(f"{url}/other", timeout=5)
+            assert False, "Unknown path served"
+        except urllib.error.HTTPError as e:
+            assert e.code == 404
+    finally:
+        stop_metrics_server()
+
+    print("✅ Prometheus metrics endpoint tests passed!")
+
+def test_process_frame_stages_and_overhead():
+    """Test that process_frame times every stage and the hooks cost under 1% of a frame"""
+    print("⏱️ Testing frame stage timings...")
+
+    detector = PoseDetector()
+    detector.motion_gate = None
+    frame = np.full((480, 640, 3), 128, np.uint8)
+    for _ in range(10):
+        detector.process_frame(frame, "pushup")
+    summary = detector.get_exercise_stats()["latency"]
+    for stage in ("color_convert", "inference", "annotate", "frame"):
+        assert summary[stage]["count"] >= 10, f"{stage} not timed: {summary}"
+
+    # Cost of one hook: two clock reads and a record into the session and process histograms
+    hooks = 20000
+    start = time.perf_counter()
+    for _ in range(hooks):
+        begin = time.perf_counter_ns()
+        detector.latency.record("detect", time.perf_counter_ns() - begin)
+    hook_ms = (time.perf_counter() - start) / hooks * 1000
+    per_frame_ms = hook_ms * 7
+    frame_ms = summary["frame"]["p50_ms"]
+    print(f"   {hook_ms * 1000:.2f} µs per hook, {per_frame_ms / frame_ms:.3%} of a {frame_ms:.1f} ms frame")
+    assert per_frame_ms < 0.01 * frame_ms, "Timing hooks cost over 1% of a frame"
+
+    print("✅ Frame stage timing tests passed!")
+
+def main():
+    """Run all tests"""
+    print("🧪 Running latency tests...")
+    print("=" * 50)
+
+    tests = [
+        test_histogram_accuracy,
+        test_session_and_process_recorders,
+        test_prometheus_endpoint,
+        test_process_frame_stages_and_overhead
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except Exception as e:
+            print(f"❌ Test {test.__name__} failed with error: {e}")
+
+    print("\n" + "=" * 50)
+    print(f"📊 Test Results: {passed}/{total} tests passed")
+
+    return passed == total
+
+if __name__ == "__main__":
+    main()
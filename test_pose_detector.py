@@ -3,8 +3,20 @@
 Simple test script for PoseDetector class
 """
 
+import time
+
 import numpy as np
-from pose_detector import PoseDetector
+from form_rules import FORM_RULES, CompiledRules, angle_range, compiled_rules
+from pose_detector import LandmarkArray, PoseDetector
+
+def pushup_landmarks(bent):
+    """A (33, 4) landmark array with both elbows bent (down) or straight (up)"""
+    landmarks = np.full((33, 4), 0.5, dtype=np.float32)
+    for shoulder, elbow, wrist in ((11, 13, 15), (12, 14, 16)):
+        landmarks[shoulder, :2] = (0.3, 0.5)
+        landmarks[elbow, :2] = (0.5, 0.5)
+        landmarks[wrist, :2] = (0.35, 0.4) if bent else (0.7, 0.5)
+    return landmarks
 
 def test_angle_calculation():
     """Test angle calculation function"""
@@ -96,6 +108,44 @@ def test_reset_functionality():
     
     print("✅ Reset functionality tests passed!")
 
+def pushup_at(angle):
+    """Pushup landmarks with both elbows bent to ``angle`` degrees"""
+    landmarks = pushup_landmarks(False)
+    direction = np.radians(180 - angle)
+    for wrist in (15, 16):
+        landmarks[wrist, :2] = (0.5 + 0.2 * np.cos(direction), 0.5 + 0.2 * np.sin(direction))
+    return landmarks
+
+def test_rep_reconciliation():
+    """Test reps whose bottom fell between dropped frames"""
+    print("🕳️ Testing rep reconciliation...")
+    
+    def count(angles, times):
+        detector = PoseDetector(load_model=False)
+        results = detector.ingest_landmarks(np.stack([pushup_at(a) for a in angles]), "pushup", times)
+        return results[-1]["reps"], results[-1]["rep_confidence"]
+    
+    # Every frame seen: a full rep counts with full confidence, a partial one not at all
+    full = [170, 150, 120, 100, 85, 100, 130, 165, 170]
+    assert count(full, np.arange(len(full)) / 30) == (1, 1.0), "Fully sampled rep miscounted"
+    partial = [170, 150, 130, 120, 130, 150, 170]
+    assert count(partial, np.arange(len(partial)) / 30)[0] == 0, "Partial rep counted"
+    
+    # Frames dropped at the bottom: the descent and the return to the top imply a rep
+    sparse = [170, 150, 130, 170]
+    reps, confidence = count(sparse, [0, 0.033, 0.066, 0.5])
+    print(f"   Bottom dropped: {reps} rep(s), confidence {confidence:.2f}")
+    assert reps == 1 and 0 < confidence < 1, "Rep hidden between samples not reconciled"
+    assert count(sparse, [0, 0.033, 0.066, 0.1])[0] == 0, "Dense shallow dip counted"
+    
+    # The angle at the top of the rep is interpolated between samples, not taken at the late sample
+    detector = PoseDetector(load_model=False)
+    detector.ingest_landmarks(np.stack([pushup_at(a) for a in (170, 80, 140, 180)]), "pushup", [0, 1, 2, 3])
+    assert abs(detector.last_rep_time - (detector._clock_offset + 2.5)) < 0.01, "Crossing time not interpolated"
+    
+    print("✅ Rep reconciliation tests passed!")
+    return True
+
 def test_form_assessment():
     """Test form assessment functionality"""
     print("🎯 Testing form assessment...")
@@ -119,6 +169,83 @@ def test_form_assessment():
     
     print("✅ Form assessment tests passed!")
 
+def pushup_body(sagging):
+    """Straight arms with the head, hips and ankles in one line, or with the hips sagging"""
+    landmarks = pushup_landmarks(False)
+    for ear, shoulder, hip, knee, ankle in ((7, 11, 23, 25, 27), (8, 12, 24, 26, 28)):
+        landmarks[ear, :2] = (0.2, 0.5)
+        landmarks[hip, :2] = (0.6, 0.65 if sagging else 0.5)
+        landmarks[knee, :2] = (0.75, 0.5)
+        landmarks[ankle, :2] = (0.9, 0.5)
+    return landmarks
+
+def test_form_rules():
+    """Test compiled form rules and their weighted scores"""
+    print("📐 Testing form rules...")
+    
+    detector = PoseDetector(load_model=False)
+    detector.exercise_type = "pushup"
+    good = detector.assess_form(LandmarkArray(pushup_body(False)))
+    bad = compiled_rules("pushup").assess(pushup_body(True))
+    print(f"   Straight body: {good['score']}, sagging hips: {bad['score']} {bad['issues']}")
+    assert good == {"score": 100, "issues": [], "tips": []}, f"Straight pushup flagged: {good}"
+    assert bad["score"] < 100 and "Keep your body straight" in bad["issues"], "Sagging hips not flagged"
+    assert len(bad["issues"]) == len(bad["tips"]), "Issues and tips out of step"
+    
+    # Categories are weighted by FORM_CONFIG score_weights (posture 0.4, range 0.1)
+    rules = CompiledRules([
+        angle_range(("left_shoulder", "left_hip", "left_ankle"), 160, 180, "posture issue", "tip", "posture"),
+        angle_range(("left_shoulder", "left_hip", "left_ankle"), 0, 90, "range issue", "tip", "range")
+    ])
+    assert rules.assess(pushup_body(False))["score"] == 80, "Score weights not applied"
+    
+    # One vectorized pass over a batch gives the same feedback as frame by frame
+    batch = np.stack([pushup_body(i % 2 == 0) for i in range(6)])
+    for exercise in FORM_RULES:
+        rules = compiled_rules(exercise)
+        assert rules.feedback(batch) == [rules.assess(frame) for frame in batch], f"Batch mismatch for {exercise}"
+    
+    print("✅ Form rules tests passed!")
+    return True
+
+def test_landmark_ingest():
+    """Test counting reps from client-side landmark arrays"""
+    print("📥 Testing landmark ingest...")
+    
+    detector = PoseDetector(load_model=False)
+    
+    # Three down/up cycles, frames 1.1 s apart on the client's clock (past the 1 s rep cooldown)
+    batch = np.stack([pushup_landmarks(bent) for bent in (True, False) * 3]).astype(np.float16)
+    timestamps = 1000.0 + 1.1 * np.arange(len(batch))
+    results = detector.ingest_landmarks(batch, "pushup", timestamps)
+    
+    assert [r["state"] for r in results] == ["down", "up"] * 3, "Wrong states from landmark arrays"
+    assert results[-1]["reps"] == 3, f"Expected 3 reps, got {results[-1]['reps']}"
+    assert "score" in results[-1]["form"], "Form feedback missing"
+    
+    # Without timestamps the whole batch happens "now", so the cooldown allows one rep at most
+    detector.reset_counter()
+    assert detector.ingest_landmarks(batch, "pushup")[-1]["reps"] == 1, "Cooldown not applied"
+    
+    # NaN means nobody was seen
+    missing = np.full((33, 4), np.nan, dtype=np.float32)
+    assert detector.ingest_landmarks(missing)[0]["state"] == "no_detection", "NaN frame not treated as missing"
+    
+    try:
+        detector.ingest_landmarks(np.zeros((2, 17, 4)))
+        assert False, "Wrong landmark shape should be rejected"
+    except ValueError:
+        pass
+    
+    big_batch = np.repeat(batch, 200, axis=0)
+    start = time.perf_counter()
+    detector.ingest_landmarks(big_batch, "pushup", 0.75 * np.arange(len(big_batch)))
+    per_frame = (time.perf_counter() - start) / len(big_batch)
+    print(f"   ✅ {per_frame * 1e6:.1f} µs per ingested frame")
+    
+    print("✅ Landmark ingest tests passed!")
+    return True
+
 def main():
     """Run all tests"""
     print("🧪 Running PoseDetector tests...")
@@ -129,7 +256,10 @@ def main():
         test_pose_detector_initialization,
         test_exercise_thresholds,
         test_reset_functionality,
-        test_form_assessment
+        test_rep_reconciliation,
+        test_form_assessment,
+        test_form_rules,
+        test_landmark_ingest
     ]
     
     passed = 0
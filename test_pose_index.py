@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Tests for reference pose scoring
+"""
+
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+import pose_index
+from config import YOGA_CONFIG
+from pose_detector import LandmarkArray, PoseDetector
+from pose_features import MIRRORED, render_pose
+from pose_index import REFERENCE_POSES, PoseIndex, default_index, pose_feedback, reference_digest
+
+def held_pose(angles, seconds=3.5, fps=30, noise=0.003, seed=0):
+    """A pose held for ``seconds`` with detector jitter, as (frames, timestamps)"""
+    rng = np.random.default_rng(seed)
+    frames = np.repeat(render_pose(angles)[None], int(seconds * fps), axis=0)
+    frames[:, :, :2] += rng.normal(0, noise, frames[:, :, :2].shape)
+    return frames, np.arange(len(frames)) / fps
+
+def test_reference_scoring():
+    """Test that every reference pose is found and scored as a close match"""
+    print("🧘 Testing reference pose scoring...")
+
+    index = default_index()
+    frames = np.stack([held_pose(variants[0], seconds=0.1)[0][0] for variants in REFERENCE_POSES.values()])
+    for pose, match in zip(REFERENCE_POSES, index.matches(frames)):
+        print(f"   {pose}: nearest {match['nearest']}, similarity {match['similarity']}")
+        assert match["nearest"] == pose, f"{pose} matched as {match['nearest']}"
+        assert match["similarity"] >= 75, f"{pose} scored only {match['similarity']}"
+        assert max(abs(d) for d in match["deviations"].values()) < 15, "Jitter reported as deviations"
+
+    print("✅ Reference pose scoring tests passed!")
+
+def test_deviations_and_feedback():
+    """Test per-joint deviations and the feedback built from them"""
+    print("📏 Testing joint deviations...")
+
+    index = default_index()
+    bent = render_pose({**REFERENCE_POSES["warrior II"][0], "left_knee": 140})
+    match = index.query(bent, "warrior II")
+    print(f"   Front knee too straight: similarity {match['similarity']}, {match['deviations']['left_knee']}°")
+    assert abs(match["deviations"]["left_knee"] - 40) < 0.5, "Knee deviation not measured"
+    assert all(abs(d) < 0.5 for joint, d in match["deviations"].items() if joint != "left_knee")
+    assert match["similarity"] < index.query(render_pose(REFERENCE_POSES["warrior II"][0]), "warrior II")["similarity"]
+
+    form = pose_feedback({"score": 100, "issues": [], "tips": []}, match, "warrior II")
+    assert form["issues"] == ["Adjust your left knee"] and form["tips"][0].startswith("Bend"), form
+
+    # Doing another pose entirely: say which one
+    tree = index.query(render_pose(REFERENCE_POSES["tree pose"][0]), "warrior II")
+    form = pose_feedback({"score": 100, "issues": [], "tips": []}, tree, "warrior II")
+    assert tree["nearest"] == "tree pose" and form["issues"] == ["This looks like tree pose"], form
+
+    print("✅ Joint deviation tests passed!")
+
+def test_invariance():
+    """Test that position, size, facing and leading side do not change the score"""
+    print("🔄 Testing pose invariance...")
+
+    index = default_index()
+    frame = render_pose(REFERENCE_POSES["triangle pose"][0])
+    moved = render_pose(REFERENCE_POSES["triangle pose"][0], center=(0.3, 0.6))
+    moved[:, :2] = 0.3 + (moved[:, :2] - 0.3) * 0.6
+    flipped = frame.copy()
+    flipped[:, 0] = 1 - flipped[:, 0]
+    for variant in (moved, flipped, frame[MIRRORED]):
+        match = index.query(variant, "triangle pose")
+        assert match["nearest"] == "triangle pose" and match["similarity"] > 99, match
+
+    print("✅ Pose invariance tests passed!")
+
+def test_memory_mapped_index():
+    """Test that a saved index is memory-mapped and scores like the built one"""
+    print("💾 Testing memory-mapped pose index...")
+
+    built = PoseIndex.build()
+    frames, _ = held_pose(REFERENCE_POSES["cobra pose"][0], seconds=0.5)
+    with tempfile.TemporaryDirectory() as directory:
+        built.save(directory)
+        loaded = PoseIndex.load(directory)
+        assert isinstance(loaded.embeddings, np.memmap), "Index not memory-mapped"
+        assert loaded.poses == built.poses
+        expected, actual = built.query_batch(frames, "cobra pose"), loaded.query_batch(frames, "cobra pose")
+        for key in expected:
+            assert np.allclose(expected[key], actual[key]), f"{key} differs after loading"
+        del loaded, actual
+
+    print("✅ Memory-mapped pose index tests passed!")
+
+def test_default_index_saved():
+    """Test that the default index is saved on first use, memory-mapped after, and rebuilt when stale"""
+    print("🗄️ Testing saved default pose index...")
+
+    saved_dir, saved_index = YOGA_CONFIG["index_dir"], pose_index._default_index
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            YOGA_CONFIG["index_dir"] = os.path.join(directory, "pose_index")
+            pose_index._default_index = None
+            index = default_index()
+            assert isinstance(index.embeddings, np.memmap), "Built index not saved and memory-mapped"
+            assert index.digest == reference_digest() and default_index() is index
+
+            # A later process maps the saved index instead of building it again
+            labels = os.path.join(YOGA_CONFIG["index_dir"], "labels.json")
+            written = os.stat(labels).st_mtime_ns
+            pose_index._default_index = None
+            assert isinstance(default_index().embeddings, np.memmap)
+            assert os.stat(labels).st_mtime_ns == written, "Up-to-date index rebuilt"
+
+            # An index saved from other reference poses is rebuilt
+            with open(labels) as f:
+                meta = json.load(f)
+            with open(labels, "w") as f:
+                json.dump(dict(meta, digest="other references"), f)
+            pose_index._default_index = None
+            assert default_index().digest == reference_digest(), "Stale index not rebuilt"
+            with open(labels) as f:
+                assert json.load(f)["digest"] == reference_digest(), "Rebuilt index not saved"
+            pose_index._default_index = None
+    finally:
+        YOGA_CONFIG["index_dir"], pose_index._default_index = saved_dir, saved_index
+
+    print("✅ Saved default pose index tests passed!")
+
+def test_yoga_holds():
+    """Test that PoseDetector counts held yoga poses and not the wrong pose"""
+    print("🌳 Testing yoga holds...")
+
+    frames, t = held_pose(REFERENCE_POSES["tree pose"][0])
+    detector = PoseDetector(load_model=False)
+    results = detector.ingest_landmarks(frames, "tree pose", t)
+    print(f"   Tree pose: {results[-1]['reps']}s held, similarity {results[-1]['pose']['similarity']}")
+    assert results[-1]["state"] == "hold" and results[-1]["reps"] == 3, "Held pose not counted"
+
+    # Frame by frame gives the same match as the batch
+    single = PoseDetector(load_model=False)
+    data = single.update_state(LandmarkArray(frames[-1]), "tree pose")
+    assert data["pose"] == results[-1]["pose"], "Single-frame match differs from the batch"
+
+    frames, t = held_pose(REFERENCE_POSES["warrior II"][0])
+    detector = PoseDetector(load_model=False)
+    results = detector.ingest_landmarks(frames, "tree pose", t)
+    assert results[-1]["state"] == "rest" and results[-1]["reps"] == 0, "Wrong pose counted as held"
+    assert "This looks like warrior II" in results[-1]["form"]["issues"]
+
+    print("✅ Yoga hold tests passed!")
+
+def test_query_cost():
+    """Test that queries take microseconds, and less per frame in a batch"""
+    print("⏱️ Testing pose query cost...")
+
+    index = default_index()
+    frames, _ = held_pose(REFERENCE_POSES["bridge pose"][0], seconds=100)
+    index.query(frames[0], "bridge pose")
+    start = time.perf_counter()
+    for frame in frames[:500]:
+        index.query_batch(frame[None], "bridge pose")
+    single_us = (time.perf_counter() - start) / 500 * 1e6
+    start = time.perf_counter()
+    index.query_batch(frames, "bridge pose")
+    batched_us = (time.perf_counter() - start) / len(frames) * 1e6
+    print(f"   {single_us:.1f} µs per query, {batched_us:.2f} µs per frame batched")
+    assert single_us < 1000, f"Query too slow: {single_us:.1f} µs"
+    assert batched_us < single_us / 5, "Batching does not pay off"
+
+    print("✅ Pose query cost tests passed!")
+
+def main():
+    """Run all tests"""
+    print("🧪 Running pose index tests...")
+    print("=" * 50)
+
+    tests = [
+        test_reference_scoring,
+        test_deviations_and_feedback,
+        test_invariance,
+        test_memory_mapped_index,
+        test_default_index_saved,
+        test_yoga_holds,
+        test_query_cost
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except Exception as e:
+            print(f"❌ Test {test.__name__} failed with error: {e}")
+
+    print("\n" + "=" * 50)
+    print(f"📊 Test Results: {passed}/{total} tests passed")
+
+    return passed == total
+
+if __name__ == "__main__":
+    main()
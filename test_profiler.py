@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Tests for profiling mode
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+
+import profiler
+from pose_detector import PoseDetector
+from profiler import FrameProfiler, profile_frame
+
+def spin(seconds):
+    """Burn CPU in Python for ``seconds``"""
+    end = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < end:
+        total += sum(range(100))
+    return total
+
+def idle_between_frames(seconds):
+    time.sleep(seconds)
+
+def test_sampled_stacks():
+    """Test that only frame code is sampled and written as collapsed stacks and a summary"""
+    print("🔬 Testing sampled stacks...")
+
+    with tempfile.TemporaryDirectory() as directory:
+        frame_profiler = FrameProfiler(seconds=0.6, interval=0.002, output_dir=directory, allocations=False)
+
+        def worker():
+            while not frame_profiler.paths:
+                with frame_profiler.frame():
+                    spin(0.02)
+                idle_between_frames(0.02)
+
+        thread = threading.Thread(target=worker, name="frame worker")
+        thread.start()
+        thread.join(timeout=10)
+        assert frame_profiler.paths, "Window did not end on its own"
+        with open(frame_profiler.paths["collapsed"]) as f:
+            lines = f.read().splitlines()
+        with open(frame_profiler.paths["summary"]) as f:
+            summary = f.read()
+
+    samples = 0
+    for line in lines:
+        stack, count = line.rsplit(" ", 1)
+        samples += int(count)
+        assert stack.startswith("frame_worker;"), line
+        assert "idle_between_frames" not in stack, "Sampled outside a frame"
+    top = {row["function"]: row for row in frame_profiler.top_frames()}
+    print(f"   {frame_profiler.frames} frames, {samples} samples, spin {top['test_profiler.py:spin']}")
+    # Pure-Python frames only let the sampler in at each GIL switch interval (5 ms)
+    assert samples > 15, f"Only {samples} samples"
+    assert top["test_profiler.py:spin"]["cumulative_pct"] > 90
+    assert "test_profiler.py:spin" in summary and "cum %" in summary
+
+    # Frames after the window are not profiled
+    frames = frame_profiler.frames
+    with frame_profiler.frame():
+        spin(0.01)
+    assert frame_profiler.frames == frames and frame_profiler.stop() == frame_profiler.paths
+
+    print("✅ Sampled stack tests passed!")
+
+def test_frame_allocations():
+    """Test per-frame allocation tracking with tracemalloc"""
+    print("🧮 Testing per-frame allocations...")
+
+    kept = []
+    with tempfile.TemporaryDirectory() as directory:
+        frame_profiler = FrameProfiler(seconds=60, output_dir=directory, snapshot_every=2)
+        for _ in range(6):
+            with frame_profiler.frame():
+                scratch = np.ones(1 << 20, np.uint8).tobytes()     # 1 MiB freed at the end of the frame
+                kept.append(bytes(256 * 1024))                      # 256 KiB kept
+                del scratch
+        paths = frame_profiler.stop()
+        assert not tracemalloc.is_tracing(), "tracemalloc left running"
+        with open(paths["summary"]) as f:
+            summary = f.read()
+
+    net, peak = zip(*frame_profiler.frame_allocations)
+    print(f"   net {np.median(net) / 1024:.0f} KiB, peak {np.median(peak) / 1024:.0f} KiB per frame")
+    assert len(net) == 6
+    assert 200 * 1024 < np.median(net) < 400 * 1024, "Kept memory not measured"
+    assert np.median(peak) > 1 << 20, "Transient peak not measured"
+    kept_here = sum(size for (filename, _), size in frame_profiler.allocation_growth.items()
+                    if filename.endswith("test_profiler.py"))
+    assert kept_here >= 3 * 256 * 1024, f"Kept memory not attributed: {frame_profiler.allocation_growth}"
+    assert "Allocations per frame" in summary and "test_profiler.py" in summary
+
+    print("✅ Per-frame allocation tests passed!")
+
+def test_concurrent_frames():
+    """Test that frames from several threads at once are all counted"""
+    print("🧵 Testing concurrent frames...")
+
+    threads, frames_per_thread = 4, 300
+    with tempfile.TemporaryDirectory() as directory:
+        frame_profiler = FrameProfiler(seconds=60, interval=0.001, output_dir=directory, snapshot_every=50)
+
+        def worker():
+            for _ in range(frames_per_thread):
+                with frame_profiler.frame():
+                    with frame_profiler.frame():
+                        bytes(1024)
+
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)     # Interleave the threads' bookkeeping as much as possible
+        try:
+            workers = [threading.Thread(target=worker, name=f"worker {i}") for i in range(threads)]
+            for thread in workers:
+                thread.start()
+            for thread in workers:
+                thread.join()
+        finally:
+            sys.setswitchinterval(switch_interval)
+        frame_profiler.stop()
+
+    expected = threads * frames_per_thread * 2
+    print(f"   {frame_profiler.frames} frames from {threads} threads")
+    assert frame_profiler.frames == expected, f"{frame_profiler.frames} of {expected} frames counted"
+    assert len(frame_profiler.frame_allocations) == expected
+    assert not any(frame_profiler._inside.values()), "Frame nesting left open"
+
+    print("✅ Concurrent frame tests passed!")
+
+def test_environment_flag():
+    """Test that the environment flag turns profiling on, and that it is off by default"""
+    print("🚩 Testing profiling environment flag...")
+
+    env_var = profiler.PROFILE_CONFIG["env_var"]
+    saved = os.environ.pop(env_var, None)
+    try:
+        profiler._profiler, profiler._configured = None, False
+        with profile_frame():
+            pass
+        assert profiler.active_profiler() is None, "Profiling on without the flag"
+
+        os.environ[env_var] = "12"
+        profiler._profiler, profiler._configured = None, False
+        assert profiler.active_profiler().seconds == 12
+        os.environ[env_var] = "1"
+        profiler._profiler, profiler._configured = None, False
+        assert profiler.active_profiler().seconds == profiler.PROFILE_CONFIG["seconds"]
+
+        # A bad value warns once and profiles for the default time instead of failing every frame
+        for value in ("thirty", "-5", "nan"):
+            os.environ[env_var] = value
+            profiler._profiler, profiler._configured = None, False
+            frame_profiler = profiler.active_profiler()
+            assert frame_profiler.seconds == profiler.PROFILE_CONFIG["seconds"], value
+            assert profiler.active_profiler() is frame_profiler, "Flag parsed again"
+        os.environ[env_var] = "0"
+        profiler._profiler, profiler._configured = None, False
+        assert profiler.active_profiler() is None, "Profiling on with the flag set to 0"
+    finally:
+        profiler._profiler, profiler._configured = None, False
+        os.environ.pop(env_var, None)
+        if saved is not None:
+            os.environ[env_var] = saved
+
+    print("✅ Profiling environment flag tests passed!")
+
+def test_profile_process_frame():
+    """Test that a profile of process_frame shows the pose model under the frame"""
+    print("🎥 Testing process_frame profile...")
+
+    detector = PoseDetector()
+    detector.motion_gate = None
+    frame = np.full((480, 640, 3), 128, np.uint8)
+    with tempfile.TemporaryDirectory() as directory:
+        frame_profiler = FrameProfiler(seconds=1.0, interval=0.002, output_dir=directory, allocations=False)
+        while not frame_profiler.paths:
+            with frame_profiler.frame():
+                detector.process_frame(frame, "squat")
+    top = {row["function"]: row for row in frame_profiler.top_frames()}
+    print(f"   {frame_profiler.frames} frames, _infer {top['pose_detector.py:_infer']['cumulative_pct']}%")
+    assert top["pose_detector.py:process_frame"]["cumulative_pct"] > 95
+    assert top["pose_detector.py:_infer"]["cumulative_pct"] > 50, "Pose model not the bulk of a frame"
+
+    print("✅ process_frame profile tests passed!")
+
+def main():
+    """Run all tests"""
+    print("🧪 Running profiler tests...")
+    print("=" * 50)
+
+    tests = [
+        test_sampled_stacks,
+        test_frame_allocations,
+        test_concurrent_frames,
+        test_environment_flag,
+        test_profile_process_frame
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except Exception as e:
+            print(f"❌ Test {test.__name__} failed with error: {e}")
+
+    print("\n" + "=" * 50)
+    print(f"📊 Test Results: {passed}/{total} tests passed")
+
+    return passed == total
+
+if __name__ == "__main__":
+    main()
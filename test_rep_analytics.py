@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Tests for streaming per-rep analytics
+"""
+
+import time
+
+import numpy as np
+
+from pose_detector import PoseDetector
+from rep_analytics import RepTracker
+from test_pose_detector import pushup_landmarks
+
+def rep_angles(fps=30, down=1.0, up=0.5, pause=0.5):
+    """One rep's angles: pause at the top, lower from 170 to 80 degrees over ``down`` s, press up over ``up`` s"""
+    top = [170.0] * int(pause * fps)
+    lowering = np.linspace(170, 80, int(down * fps) + 1)[1:]
+    pressing = np.linspace(80, 170, int(up * fps) + 1)[1:]
+    return top + lowering.tolist() + pressing.tolist()
+
+def test_rep_metrics():
+    """Test depth, range of motion and tempo of segmented reps"""
+    print("📏 Testing rep metrics...")
+
+    tracker = RepTracker()
+    t = 0.0
+    for _ in range(3):
+        angles = rep_angles()
+        for i, angle in enumerate(angles):
+            t += 1 / 30
+            record = tracker.update(t, angle, 160, rep_completed=i == len(angles) - 1)
+        assert record is not None, "Rep not closed"
+        print(f"   {record}")
+        assert record.depth == 80 and record.range_of_motion == 90, "Depth or range wrong"
+        assert abs(record.eccentric - 1.0) < 0.1 and abs(record.concentric - 0.5) < 0.01, "Tempo wrong"
+        assert 1.3 < record.time_under_tension < 1.5, "Time under tension wrong"
+
+    assert [r["rep"] for r in tracker.records()] == [1, 2, 3]
+    assert tracker.summary()["reps"] == 3
+    history = tracker.history()
+    assert history.shape == (3 * len(rep_angles()), 2) and np.all(np.diff(history[:, 0]) > 0), "History out of order"
+
+    print("✅ Rep metrics tests passed!")
+
+def test_long_session_is_bounded():
+    """Test that a two-hour session at 30 fps keeps memory and per-frame cost flat"""
+    print("⏱️ Testing a two-hour session...")
+
+    tracker = RepTracker(capacity=300, max_reps=100)
+    angles = rep_angles()
+    frames = 2 * 3600 * 30
+    timings = []
+    start = time.perf_counter()
+    for frame in range(frames):
+        position = frame % len(angles)
+        tracker.update(frame / 30, angles[position], 160, position == len(angles) - 1)
+        if frame % (frames // 4) == frames // 4 - 1:
+            timings.append(time.perf_counter() - start)
+            start = time.perf_counter()
+
+    per_frame_us = [elapsed / (frames // 4) * 1e6 for elapsed in timings]
+    print(f"   {frames} frames, {tracker.total_reps} reps, per-frame cost by quarter: "
+          + ", ".join(f"{us:.1f} µs" for us in per_frame_us))
+    assert len(tracker.reps) == 100 and len(tracker.history()) == 300, "Buffers grew"
+    assert tracker.total_reps == frames // len(angles)
+    assert max(per_frame_us) < 1e6 / 30 / 10, "Tracking takes more than a tenth of a 30 fps frame budget"
+    assert per_frame_us[-1] < 2 * per_frame_us[0], "Per-frame cost grew over the session"
+
+    print("✅ Long session tests passed!")
+
+def test_detector_reports_reps():
+    """Test rep records coming out of the detector"""
+    print("🏋️ Testing detector rep records...")
+
+    detector = PoseDetector(load_model=False)
+    batch = np.stack([pushup_landmarks(bent) for bent in (False, True, False) * 2])
+    results = detector.ingest_landmarks(batch, "pushup", 1.1 * np.arange(len(batch)))
+    records = [r["last_rep"] for r in results if "last_rep" in r]
+    assert len(records) == detector.rep_count == 2, f"Expected 2 rep records, got {records}"
+    assert records[-1]["range_of_motion"] > 0 and records[-1]["concentric"] > 0
+    assert detector.get_exercise_stats()["last_rep"] == records[-1]
+
+    detector.reset_counter()
+    assert detector.get_exercise_stats()["last_rep"] is None, "Records survived a reset"
+
+    print("✅ Detector rep record tests passed!")
+
+def main():
+    """Run all tests"""
+    print("🧪 Running rep analytics tests...")
+    print("=" * 50)
+
+    tests = [
+        test_rep_metrics,
+        test_long_session_is_bounded,
+        test_detector_reports_reps
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except Exception as e:
+            print(f"❌ Test {test.__name__} failed with error: {e}")
+
+    print("\n" + "=" * 50)
+    print(f"📊 Test Results: {passed}/{total} tests passed")
+
+    return passed == total
+
+if __name__ == "__main__":
+    main()
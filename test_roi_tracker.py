@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Tests for region-of-interest tracking, using a stand-in pose model
+"""
+
+import numpy as np
+from mediapipe.framework.formats import landmark_pb2
+
+from pose_detector import PoseDetector
+
+class BoxResults:
+    def __init__(self, landmarks):
+        self.pose_landmarks = landmarks
+
+class BoxModel:
+    """Finds the bright rectangle in an RGB image and spreads 33 landmarks over it"""
+
+    def __init__(self):
+        self.shapes = []
+
+    def process(self, image):
+        self.shapes.append(image.shape[:2])
+        ys, xs = np.nonzero(image[:, :, 0] > 128)
+        if not len(xs):
+            return BoxResults(None)
+        height, width = image.shape[:2]
+        landmarks = landmark_pb2.NormalizedLandmarkList()
+        for i in range(33):
+            fraction = i / 32
+            landmarks.landmark.add(
+                x=(xs.min() + fraction * (xs.max() - xs.min())) / width,
+                y=(ys.min() + fraction * (ys.max() - ys.min())) / height,
+                z=0.1, visibility=1.0
+            )
+        return BoxResults(landmarks)
+
+def scene(x, y, size=(1080, 1920)):
+    """A dark frame with a 200 x 400 pixel "person" whose top-left corner is at (x, y)"""
+    frame = np.zeros(size + (3,), dtype=np.uint8)
+    frame[y:y + 400, x:x + 200] = 255
+    return frame
+
+def detector_with_box_model():
+    detector = PoseDetector(load_model=False)
+    detector.pose = BoxModel()
+    return detector
+
+def test_crop_and_map_back():
+    """Test that inference runs on a crop and landmarks come back in full-frame coordinates"""
+    print("🔲 Testing ROI crop...")
+
+    detector = detector_with_box_model()
+    for x in (800, 805, 810, 815):
+        landmarks = detector.detect_landmarks(scene(x, 400))
+        first, last = landmarks.landmark[0], landmarks.landmark[32]
+        assert abs(first.x * 1920 - x) < 1.5 and abs(first.y * 1080 - 400) < 1.5, "Landmarks not mapped back"
+        assert abs(last.x * 1920 - (x + 199)) < 1.5 and abs(last.y * 1080 - 799) < 1.5
+        assert abs(first.z - 0.1 * detector.pose.shapes[-1][1] / 1920) < 1e-6, "Depth not rescaled"
+
+    shapes = detector.pose.shapes
+    print(f"   Model input sizes: {shapes}")
+    assert shapes[0] == (1080, 1920), "First frame should search the whole frame"
+    assert all(h * w < 0.2 * 1080 * 1920 for h, w in shapes[1:]), "Later frames not cropped"
+    assert len(set(shapes[1:])) == 1, "Box moved although the person stayed well inside it"
+
+    print("✅ ROI crop tests passed!")
+
+def test_fallback_when_lost():
+    """Test falling back to the whole frame when the person leaves the crop"""
+    print("🔄 Testing ROI fallback...")
+
+    detector = detector_with_box_model()
+    detector.detect_landmarks(scene(800, 400))
+    detector.detect_landmarks(scene(800, 400))
+    landmarks = detector.detect_landmarks(scene(100, 100))
+    assert landmarks is not None and abs(landmarks.landmark[0].x * 1920 - 100) < 1.5, "Person not found again"
+    assert detector.pose.shapes[-1] == (1080, 1920), "No full-frame retry"
+    stats = detector.roi_tracker.stats()
+    print(f"   {stats}")
+    assert stats["fallbacks"] == 1 and stats["crops"] == 2
+
+    # Nobody in the frame: no crop to keep
+    assert detector.detect_landmarks(np.zeros((1080, 1920, 3), np.uint8)) is None
+    assert detector.roi_tracker.roi is None
+
+    print("✅ ROI fallback tests passed!")
+
+def main():
+    """Run all tests"""
+    print("🧪 Running ROI tracking tests...")
+    print("=" * 50)
+
+    tests = [
+        test_crop_and_map_back,
+        test_fallback_when_lost
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except Exception as e:
+            print(f"❌ Test {test.__name__} failed with error: {e}")
+
+    print("\n" + "=" * 50)
+    print(f"📊 Test Results: {passed}/{total} tests passed")
+
+    return passed == total
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Tests for the running stability tracker and hold scoring
+"""
+
+import time
+
+import numpy as np
+
+from pose_detector import PoseDetector
+from stability import StabilityTracker
+from test_pose_detector import pushup_body
+
+def plank_frames(seconds, sway, fps=30, seed=0):
+    """A plank held for ``seconds`` with detector jitter, swaying by ``sway`` (normalized units)"""
+    rng = np.random.default_rng(seed)
+    frames = np.repeat(pushup_body(False)[None], int(seconds * fps), axis=0)
+    t = np.arange(len(frames)) / fps
+    frames[:, :, 1] += sway * np.sin(2 * np.pi * 1.5 * t)[:, None]
+    frames[:, :, :2] += rng.normal(0, 0.002, frames[:, :, :2].shape)
+    return frames, t
+
+def test_running_statistics():
+    """Test the decayed Welford update against a direct exponentially weighted computation"""
+    print("📉 Testing running statistics...")
+
+    tracker = StabilityTracker(window=9)
+    frames, _ = plank_frames(2, 0.05)
+    for frame in frames:
+        tracker.update(frame)
+        tracker.update_angle(float(frame[11, 1]) * 100)
+
+    alpha = tracker.alpha
+    weights = (1 - alpha) ** np.arange(len(frames))[::-1]
+    weights[1:] *= alpha
+    values = frames[:, :, :3].astype(np.float64)
+    mean = np.tensordot(weights, values, axes=1)
+    assert np.allclose(tracker.mean, mean, atol=1e-9), "Running mean differs from the weighted mean"
+
+    # Reference variance from the same recurrence written out in full
+    reference_mean, reference_var = values[0].copy(), np.zeros_like(values[0])
+    for value in values[1:]:
+        diff = value - reference_mean
+        reference_mean += alpha * diff
+        reference_var = (1 - alpha) * (reference_var + alpha * diff ** 2)
+    assert np.allclose(tracker.var, reference_var), "Running variance differs"
+    assert tracker.summary()["angle_std"] > 0, "Angle variance not tracked"
+
+    print("✅ Running statistics tests passed!")
+
+def test_hold_scoring():
+    """Test that only steady hold time counts and swaying is flagged"""
+    print("🧘 Testing hold scoring...")
+
+    steady = PoseDetector(load_model=False)
+    frames, t = plank_frames(3.5, 0.0)
+    results = steady.ingest_landmarks(frames, "plank", t)
+    print(f"   Steady: {results[-1]['reps']}s held, sway {results[-1]['stability']['sway']}, "
+          f"form {results[-1]['form']['score']}")
+    assert results[-1]["state"] == "hold" and results[-1]["reps"] == 3, "Steady hold not counted"
+    assert results[-1]["stability"]["stable"] and "Hold still" not in results[-1]["form"]["issues"]
+
+    shaky = PoseDetector(load_model=False)
+    frames, t = plank_frames(3.5, 0.08)
+    results = shaky.ingest_landmarks(frames, "plank", t)
+    print(f"   Swaying: {results[-1]['reps']}s held, sway {results[-1]['stability']['sway']}, "
+          f"form {results[-1]['form']['score']}")
+    assert not results[-1]["stability"]["stable"], "Sway not detected"
+    assert results[-1]["reps"] < 3, "Swaying time counted as held"
+    assert "Hold still" in results[-1]["form"]["issues"], "Sway not reported as a form issue"
+    assert results[-1]["form"]["score"] < 100
+
+    print("✅ Hold scoring tests passed!")
+
+def test_update_cost():
+    """Test that a stability update costs microseconds"""
+    print("⏱️ Testing stability update cost...")
+
+    tracker = StabilityTracker()
+    frames, _ = plank_frames(10, 0.02)
+    start = time.perf_counter()
+    for frame in frames:
+        tracker.update(frame)
+    per_frame_us = (time.perf_counter() - start) / len(frames) * 1e6
+    print(f"   {per_frame_us:.1f} µs per frame")
+    assert per_frame_us < 200, f"Stability update too slow: {per_frame_us:.1f} µs"
+
+    print("✅ Stability update cost tests passed!")
+
+def main():
+    """Run all tests"""
+    print("🧪 Running stability tests...")
+    print("=" * 50)
+
+    tests = [
+        test_running_statistics,
+        test_hold_scoring,
+        test_update_cost
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except Exception as e:
+            print(f"❌ Test {test.__name__} failed with error: {e}")
+
+    print("\n" + "=" * 50)
+    print(f"📊 Test Results: {passed}/{total} tests passed")
+
+    return passed == total
+
+if __name__ == "__main__":
+    main()
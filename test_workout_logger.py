@@ -0,0 +1,596 @@
+#!/usr/bin/env python3
+"""
+Tests for WorkoutLogger storage, including concurrent writers
+"""
+
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from config import STORAGE_CONFIG
+from dashboard_data import DashboardData
+from log_store import LogStore, file_lock, user_log_dir
+import log_exporter
+import log_writer
+from log_writer import BatchedLogWriter
+from workout_logger import WorkoutLogger, get_workout_logger
+
+WRITER_PROCESSES = 32
+ENTRIES_PER_WRITER = 200
+
+def _write_entries(log_dir, writer_id, count):
+    """Worker process: log ``count`` workouts through its own WorkoutLogger"""
+    logger = WorkoutLogger(user_id="default", log_dir=log_dir, save_interval=0.05)
+    for i in range(count):
+        logger.log_workout(f"writer-{writer_id}", reps=i, duration=60, form_score=90)
+    logger.close()
+
+def test_merge_on_read():
+    """Test that two loggers on one file see each other's entries exactly once"""
+    print("🔀 Testing merge-on-read between loggers...")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        log_dir = os.path.join(tmp_dir, "workout_logs")
+        logger_a = WorkoutLogger(user_id="default", log_dir=log_dir)
+        logger_b = WorkoutLogger(user_id="default", log_dir=log_dir)
+
+        logger_a.log_workout("pushup", reps=10, duration=60, form_score=90)
+        logger_b.log_workout("squat", reps=5, duration=30, form_score=80)
+        logger_a.flush()
+        logger_b.flush()
+
+        assert logger_a.refresh(), "Logger A should pick up logger B's append"
+        assert not logger_a.refresh(), "Nothing new should be read twice"
+        logger_b.refresh()
+
+        for logger in (logger_a, logger_b):
+            exercises = sorted(w["exercise_type"] for w in logger.logs)
+            assert exercises == ["pushup", "squat"], f"Unexpected logs: {exercises}"
+
+        logger_b.get_recent_workouts()
+        logger_a.clear_logs()
+        logger_b.refresh()
+        assert logger_b.logs == [], "Clearing the log should reach other loggers"
+
+        logger_a.close()
+        logger_b.close()
+
+    print("✅ Merge-on-read tests passed!")
+
+def test_legacy_log_migration():
+    """Test that a single-file JSON-array log from older versions is imported"""
+    print("📜 Testing legacy log migration...")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        log_dir = os.path.join(tmp_dir, "workout_logs")
+        legacy = [{
+            "timestamp": "2024-01-01T10:00:00",
+            "date": "2024-01-01",
+            "exercise_type": "pushup",
+            "reps": 10,
+            "duration_minutes": 1.0,
+            "form_score": 100,
+            "calories_estimate": 50
+        }]
+        with open(f"{log_dir}.json", 'w') as f:
+            json.dump(legacy, f, indent=2)
+
+        logger = WorkoutLogger(user_id="default", log_dir=log_dir)
+        assert logger.logs == [dict(legacy[0], user_id="default")], "Legacy entries not imported"
+        assert not os.path.exists(f"{log_dir}.json"), "Legacy log should be retired after import"
+        logger.log_workout("squat", reps=5, duration=30, form_score=80)
+        logger.close()
+
+        reloaded = WorkoutLogger(user_id="default", log_dir=log_dir, auto_save=False)
+        assert len(reloaded.logs) == 2, "Append after migration lost"
+        assert reloaded.store.months()[0] == "2024-01", "Legacy entry not in its month partition"
+
+        # A store that saw the legacy array must not convert it again once another process has
+        path = os.path.join(tmp_dir, "race.jsonl")
+        with open(path, 'w') as f:
+            json.dump(legacy, f)
+        with file_lock(f"{path}.lock"):
+            waiting = threading.Thread(target=LogStore, args=(path,))
+            waiting.start()
+            time.sleep(0.2)     # it has checked the file and now waits for the lock
+            with open(path, 'w') as f:
+                f.write(json.dumps(legacy[0]) + "\n")
+        waiting.join()
+        entries, _ = LogStore(path).read_new()
+        assert entries == legacy, f"Converted log migrated twice: {entries}"
+
+    print("✅ Legacy migration tests passed!")
+
+def test_user_partitions():
+    """Test that users only see their own workouts and the handle cache is bounded"""
+    print("👥 Testing per-user partitions...")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        log_dir = os.path.join(tmp_dir, "workout_logs")
+        alice = get_workout_logger("alice", log_dir)
+        bob = get_workout_logger("bob/../eve", log_dir)
+        assert get_workout_logger("alice", log_dir) is alice, "Handle cache miss for same user"
+
+        alice.log_workout("pushup", reps=10, duration=60, form_score=90)
+        bob.log_workout("squat", reps=5, duration=30, form_score=80)
+        alice.flush()
+        bob.flush()
+
+        assert [w["exercise_type"] for w in alice.logs] == ["pushup"], "Alice sees other users"
+        assert [w["user_id"] for w in bob.logs] == ["bob/../eve"], "User id missing from entry"
+        assert sorted(os.listdir(log_dir)) == ["alice", "bob%2F..%2Feve"], "User ids must not escape log_dir"
+        for user_id in ("..", ".", "..."):
+            path = user_log_dir(log_dir, user_id)
+            assert os.path.dirname(path) == log_dir and os.path.basename(path).strip("%2E") == "", \
+                f"{user_id!r} escapes log_dir: {path}"
+        try:
+            user_log_dir(log_dir, "")
+            assert False, "Empty user id accepted"
+        except ValueError:
+            pass
+
+        for i in range(STORAGE_CONFIG["handle_cache_size"]):
+            get_workout_logger(f"user-{i}", log_dir)
+        assert alice.writer.closed, "Least recently used logger should be closed"
+        alice.log_workout("plank", reps=30, duration=30, form_score=95)
+        alice.close()
+        assert len(WorkoutLogger(user_id="alice", log_dir=log_dir, auto_save=False).logs) == 2, "Evicted logger lost writes"
+
+        # A session keeps logging while the handle cache evicts (closes) its logger
+        carol = get_workout_logger("carol", log_dir)
+        errors = []
+
+        def keep_logging():
+            try:
+                for _ in range(2000):
+                    carol.log_workout("lunge", reps=1, duration=1, form_score=90)
+            except Exception as e:
+                errors.append(e)
+
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)     # Switch threads often enough to hit the race
+        try:
+            thread = threading.Thread(target=keep_logging)
+            thread.start()
+            while thread.is_alive():
+                carol.close()
+            thread.join()
+        finally:
+            sys.setswitchinterval(switch_interval)
+        carol.close()
+        assert not errors, f"Logging failed during eviction: {errors}"
+        assert len(WorkoutLogger(user_id="carol", log_dir=log_dir, auto_save=False).logs) == 2000, "Entries lost during eviction"
+
+        try:
+            WorkoutLogger(os.path.join(tmp_dir, "workout_logs.json"))
+            assert False, "Positional log file path accepted as a user id"
+        except TypeError:
+            pass
+
+    print("✅ Per-user partition tests passed!")
+
+def test_query_api():
+    """Test grouped queries, the stats wrappers and cache invalidation"""
+    print("📊 Testing query API...")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        logger = WorkoutLogger(user_id="default", log_dir=os.path.join(tmp_dir, "workout_logs"), auto_save=False)
+        logger.log_workout("pushup", reps=10, duration=60, form_score=90, calories_estimate=50)
+        logger.log_workout("pushup", reps=20, duration=120, form_score=70, calories_estimate=100)
+        logger.log_workout("squat", reps=5, duration=30, form_score=80, calories_estimate=15)
+
+        by_exercise = logger.query({"days": 30}, group_by=["exercise"], metrics=["sum", "max"])
+        assert by_exercise["exercise"].tolist() == ["pushup", "squat"], "Unexpected groups"
+        assert by_exercise["reps_sum"].tolist() == [30, 5], "Wrong grouped sums"
+        assert by_exercise["count"].tolist() == [2, 1], "Wrong grouped counts"
+
+        stats = logger.get_exercise_stats("pushup")
+        assert stats["total_workouts"] == 2 and stats["total_reps"] == 30, f"Wrong stats: {stats}"
+        assert stats["avg_form_score"] == 80.0 and stats["best_form_score"] == 90, f"Wrong stats: {stats}"
+
+        progress = logger.get_progress_data("pushup")
+        assert [day["reps"] for day in progress.values()] == [30], f"Wrong progress: {progress}"
+
+        assert logger.query({"days": 30}) is logger.query({"days": 30}), "Query result not memoized"
+        version = logger.version
+        logger.log_workout("squat", reps=7, duration=30, form_score=80)
+        assert logger.version > version, "Logging must bump the log version"
+        assert logger.get_weekly_summary()["total_reps_this_week"] == 42, "Stale query result"
+
+        try:
+            logger.query(group_by=["year"])
+            assert False, "Unknown group key should be rejected"
+        except ValueError:
+            pass
+        logger.close()
+
+    print("✅ Query API tests passed!")
+
+def test_history_pages():
+    """Test that history pages are sorted, filtered and sized server-side"""
+    print("📋 Testing paginated history...")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        logger = WorkoutLogger(user_id="default", log_dir=os.path.join(tmp_dir, "workout_logs"), auto_save=False)
+        for i in range(7):
+            logger.log_workout("pushup" if i % 2 else "squat", reps=i, duration=60, form_score=90)
+
+        first = logger.get_history_page(0, page_size=3)
+        assert [w["reps"] for w in first["rows"]] == [6, 5, 4], "Newest entries should come first"
+        assert first["has_next"], "More pages expected"
+        last = logger.get_history_page(2, page_size=3)
+        assert [w["reps"] for w in last["rows"]] == [0] and not last["has_next"], "Wrong last page"
+
+        pushups = logger.get_history_page(0, page_size=10, exercise_type="pushup", descending=False)
+        assert [w["reps"] for w in pushups["rows"]] == [1, 3, 5], "Exercise filter not applied"
+        by_reps = logger.get_history_page(0, page_size=2, sort_by="reps", exercise_type="squat")
+        assert [w["reps"] for w in by_reps["rows"]] == [6, 4], "Sort by reps not applied"
+        logger.close()
+
+    print("✅ Paginated history tests passed!")
+
+def test_dashboard_cache():
+    """Test that dashboard results are reused until the log changes or they expire"""
+    print("🗂️ Testing dashboard cache...")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        log_dir = os.path.join(tmp_dir, "workout_logs")
+        logger = WorkoutLogger(user_id="default", log_dir=log_dir, auto_save=False)
+        logger.log_workout("pushup", reps=10, duration=60, form_score=90)
+        calls = []
+        get_weekly_summary = logger.get_weekly_summary
+
+        def counted():
+            calls.append(logger.version)
+            return get_weekly_summary()
+
+        logger.get_weekly_summary = counted
+        dashboard = DashboardData(logger, max_age=60)
+
+        first = dashboard.weekly_summary()
+        assert dashboard.weekly_summary() is first and len(calls) == 1, "Unchanged log recomputed"
+        assert first["total_reps_this_week"] == 10
+
+        # Logging here bumps the version
+        logger.log_workout("squat", reps=5, duration=30, form_score=80)
+        second = dashboard.weekly_summary()
+        assert len(calls) == 2 and second["total_reps_this_week"] == 15, "Cache not invalidated by log_workout"
+        assert dashboard.weekly_summary() is second and len(calls) == 2
+
+        # Entries for an old version are dropped once the log moves on
+        dashboard.recent_workouts()
+        logger.log_workout("plank", reps=1, duration=30, form_score=95)
+        dashboard.weekly_summary()
+        assert list(dashboard._cache) == [("weekly_summary",)], f"Stale entries kept: {list(dashboard._cache)}"
+
+        # So do writes from another session, picked up by refresh()
+        logger.flush()
+        other = WorkoutLogger(user_id="default", log_dir=log_dir, auto_save=False)
+        other.log_workout("lunge", reps=8, duration=40, form_score=85)
+        other.flush()
+        assert dashboard.weekly_summary()["total_reps_this_week"] == 24 and len(calls) == 4, "Other session's write not seen"
+
+        # Results expire after max_age even if nothing changed
+        dashboard.max_age = 0.05
+        dashboard.weekly_summary()
+        calls.clear()
+        time.sleep(0.1)
+        dashboard.weekly_summary()
+        assert len(calls) == 1, "Expired result reused"
+        logger.close()
+        other.close()
+
+    print("✅ Dashboard cache tests passed!")
+
+def test_concurrent_writers():
+    """Stress test: many processes appending to one log must not lose entries"""
+    print(f"🏋️ Testing {WRITER_PROCESSES} concurrent writer processes...")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        log_dir = os.path.join(tmp_dir, "workout_logs")
+        reader = WorkoutLogger(user_id="default", log_dir=log_dir, auto_save=False)
+        reader.log_workout("seed", reps=0, duration=0, form_score=0)
+        reader.flush()
+
+        start = time.perf_counter()
+        processes = [
+            multiprocessing.Process(
+                target=_write_entries, args=(log_dir, writer_id, ENTRIES_PER_WRITER)
+            )
+            for writer_id in range(WRITER_PROCESSES)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - start
+
+        assert all(p.exitcode == 0 for p in processes), "A writer process failed"
+
+        expected = WRITER_PROCESSES * ENTRIES_PER_WRITER + 1
+        assert len(reader.logs) == expected, f"Expected {expected} entries, got {len(reader.logs)}"
+        assert len({w["id"] for w in reader.logs}) == expected, "Duplicate entries found"
+
+        fresh = WorkoutLogger(user_id="default", log_dir=log_dir, auto_save=False)
+        assert len(fresh.logs) == expected, "Entries lost on disk"
+        for writer_id in range(WRITER_PROCESSES):
+            reps = [w["reps"] for w in fresh.logs if w["exercise_type"] == f"writer-{writer_id}"]
+            assert reps == list(range(ENTRIES_PER_WRITER)), f"Writer {writer_id} entries lost or reordered"
+
+        print(f"   ✅ {expected - 1} entries from {WRITER_PROCESSES} processes in {elapsed:.2f}s "
+              f"({(expected - 1) / elapsed:.0f} entries/s)")
+
+    print("✅ Concurrent writer tests passed!")
+
+def test_batched_writer_flushes():
+    """Test that the log writer flushes at the batch size, on the interval, with fsync and on close"""
+    print("📦 Testing batched log writer flushes...")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = LogStore(os.path.join(tmp_dir, "batches.jsonl"))
+        batches = []
+
+        def sink(batch, fsync):
+            batches.append((len(batch), fsync))
+            store.append(batch, fsync)
+
+        def on_disk():
+            return len(LogStore(store.path).read_new()[0])
+
+        def wait_for(count, timeout=5.0):
+            deadline = time.monotonic() + timeout
+            while on_disk() < count and time.monotonic() < deadline:
+                time.sleep(0.01)
+            return on_disk()
+
+        # Size limit: a full batch goes out long before the interval
+        writer = BatchedLogWriter(sink, save_interval=60, batch_size=5)
+        for i in range(5):
+            writer.submit({"n": i})
+        assert wait_for(5) == 5 and batches == [(5, False)], f"Full batch not flushed: {batches}"
+        writer.submit({"n": 5})
+        time.sleep(0.2)
+        assert on_disk() == 5, "Partial batch flushed before its interval"
+
+        # Close: the partial batch is flushed on shutdown
+        writer.close()
+        assert on_disk() == 6 and batches[-1] == (1, False), "Pending entries not flushed on close"
+        assert not writer.running
+        try:
+            writer.submit({"n": 6})
+            assert False, "Closed writer accepted an entry"
+        except RuntimeError:
+            pass
+
+        # Interval: a partial batch goes out save_interval after its first entry
+        writer = BatchedLogWriter(sink, save_interval=0.2, batch_size=100)
+        start = time.monotonic()
+        writer.submit({"n": 7})
+        writer.submit({"n": 8})
+        assert wait_for(8) == 8, "Partial batch not flushed on the interval"
+        assert time.monotonic() - start >= 0.15, "Flushed before the interval"
+        writer.close()
+
+        # fsync durability: every batch is fsynced before it is acknowledged
+        synced = []
+        fsync = log_writer.os.fsync
+        log_writer.os.fsync = lambda fd: synced.append(fd)
+        try:
+            writer = BatchedLogWriter(sink, save_interval=60, batch_size=2, durability="fsync")
+            for i in range(3):
+                writer.submit({"n": 9 + i})
+            writer.flush(timeout=5)
+            writer.close()
+        finally:
+            log_writer.os.fsync = fsync
+        assert batches[-2:] == [(2, True), (1, True)] and len(synced) == 2, f"Batches not fsynced: {batches}"
+        assert on_disk() == 11
+        try:
+            BatchedLogWriter(sink, durability="sometimes")
+            assert False, "Unknown durability policy accepted"
+        except ValueError:
+            pass
+
+        # save_logs(fsync=True) also forces entries already written without fsync to disk
+        logger = WorkoutLogger(user_id="default", log_dir=os.path.join(tmp_dir, "workout_logs"),
+                               save_interval=60)
+        logger.log_workout("squat", 10, 60, 90)
+        logger.flush()
+        synced = []
+        log_writer.os.fsync = lambda fd: synced.append(fd)
+        try:
+            logger.save_logs()
+            assert synced == [], "save_logs() fsynced without being asked"
+            logger.save_logs(fsync=True)
+        finally:
+            log_writer.os.fsync = fsync
+            logger.close()
+        assert len(synced) == len(logger.store.paths()) == 1, f"Partitions not fsynced: {synced}"
+
+    print("✅ Batched log writer flush tests passed!")
+
+def test_export_formats():
+    """Test that Parquet is only offered when pyarrow is installed"""
+    print("📤 Testing export formats...")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        logger = WorkoutLogger(user_id="default", log_dir=os.path.join(tmp_dir, "workout_logs"), auto_save=False)
+        logger.log_workout("pushup", reps=10, duration=60, form_score=90)
+        for fmt in log_exporter.export_formats():
+            result = logger.export(fmt, os.path.join(tmp_dir, f"export.{fmt}"))
+            assert result["rows"] == 1, f"{fmt} export wrote {result['rows']} rows"
+
+        pq = log_exporter.pq
+        log_exporter.pq = None
+        try:
+            assert "parquet" not in log_exporter.export_formats(), "Parquet offered without pyarrow"
+            assert log_exporter.export_formats() == ["csv", "jsonl"]
+            try:
+                logger.export("parquet", os.path.join(tmp_dir, "missing.parquet"))
+                assert False, "Parquet export without pyarrow did not fail"
+            except ImportError as e:
+                assert "pyarrow" in str(e)
+        finally:
+            log_exporter.pq = pq
+        logger.close()
+
+    print("✅ Export format tests passed!")
+
+def test_export_streaming():
+    """Test export filters, chunked output, progress and the background job"""
+    print("🚚 Testing streamed export...")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        log_dir = os.path.join(tmp_dir, "workout_logs")
+        logger = WorkoutLogger(user_id="default", log_dir=log_dir, auto_save=False)
+        entries = [
+            {"id": f"e{i}", "user_id": "default", "timestamp": f"2024-{month:02d}-{day:02d}T10:00:00",
+             "date": f"2024-{month:02d}-{day:02d}", "exercise_type": exercise, "reps": i,
+             "duration_minutes": 1.0, "form_score": 80.0, "calories_estimate": 5.0}
+            for i, (month, day, exercise) in enumerate([
+                (1, 5, "pushup"), (1, 20, "squat"), (2, 3, "pushup"), (2, 14, "pushup"),
+                (2, 28, "squat"), (3, 9, "pushup"), (3, 30, "squat")
+            ])
+        ]
+        logger.store.append(entries)
+
+        def exported_ids(**kwargs):
+            path = os.path.join(tmp_dir, "filtered.jsonl")
+            logger.export("jsonl", path, **kwargs)
+            with open(path) as f:
+                return [json.loads(line)["id"] for line in f]
+
+        assert exported_ids() == [e["id"] for e in entries], "Unfiltered export incomplete"
+        assert exported_ids(start_date="2024-01-20", end_date="2024-02-14") == ["e1", "e2", "e3"], \
+            "Date filter wrong (bounds are inclusive, other months skipped)"
+        assert exported_ids(exercise_type="squat") == ["e1", "e4", "e6"], "Exercise filter wrong"
+        assert exported_ids(start_date="2024-02-01", exercise_type="pushup") == ["e2", "e3", "e5"]
+
+        # Chunks hold at most chunk_size entries; progress ends at the total size
+        files = logger.store.paths()
+        chunks = list(log_exporter.iter_log_chunks(files, chunk_size=2))
+        assert [len(chunk) for chunk in chunks] == [2, 2, 2, 1], f"Unexpected chunks: {chunks}"
+        progress = []
+        result = log_exporter.export_logs(files, os.path.join(tmp_dir, "chunked.csv"), chunk_size=3,
+                                          progress=lambda done, total: progress.append((done, total)))
+        assert result["rows"] == 7
+        total = sum(os.path.getsize(path) for path in files)
+        assert progress[-1] == (total, total) and len(progress) >= 3, f"Progress not reported per chunk: {progress}"
+        assert [done for done, _ in progress] == sorted(done for done, _ in progress), "Progress went backwards"
+        if log_exporter.pq is not None:
+            path = os.path.join(tmp_dir, "chunked.parquet")
+            log_exporter.export_logs(files, path, fmt="parquet", chunk_size=3)
+            parquet = log_exporter.pq.ParquetFile(path)
+            assert parquet.num_row_groups == 3 and parquet.metadata.num_rows == 7, "One row group per chunk expected"
+
+        # Background job: pending entries are flushed on the job's thread, not the caller's
+        flushed_on = []
+        flush = logger.flush
+        logger.flush = lambda timeout=None: (flushed_on.append(threading.current_thread().name), flush(timeout))
+        logger.log_workout("plank", reps=30, duration=30, form_score=95)
+        job = logger.export("csv", os.path.join(tmp_dir, "background.csv"), background=True)
+        result = job.wait(30)
+        assert job.done and job.error is None and job.progress == 1.0
+        assert result["rows"] == 8, "Pending entry not flushed before the background export"
+        assert flushed_on == ["workout-log-export"], f"Flushed on {flushed_on}"
+        logger.flush = flush
+
+        # Any failure in the job is reported through error, with no result
+        writer = log_exporter.EXPORT_WRITERS["csv"]
+
+        def mixed_types(chunks, filename):
+            raise TypeError("Expected an integer for reps")
+
+        log_exporter.EXPORT_WRITERS["csv"] = mixed_types
+        try:
+            job = logger.export("csv", os.path.join(tmp_dir, "failed.csv"), background=True)
+            job.wait(30)
+        finally:
+            log_exporter.EXPORT_WRITERS["csv"] = writer
+        assert job.done and job.result is None and isinstance(job.error, TypeError), f"Error lost: {job.error!r}"
+        logger.close()
+
+    print("✅ Streamed export tests passed!")
+
+def test_failed_batch_retried():
+    """Test that a batch the sink fails to write is kept, reported and written first next time"""
+    print("🔁 Testing failed log batch retry...")
+
+    written, failures = [], [3]
+
+    def flaky_sink(batch, fsync):
+        if failures[0]:
+            failures[0] -= 1
+            raise OSError("disk full")
+        written.extend(entry["n"] for entry in batch)
+
+    writer = BatchedLogWriter(flaky_sink, save_interval=60, batch_size=100)
+    writer.submit({"n": 0})
+    writer.submit({"n": 1})
+    try:
+        writer.flush(timeout=5)
+        assert False, "Failed write not reported by flush()"
+    except OSError as e:
+        assert "2 log entries" in str(e) and isinstance(writer.error, OSError)
+    writer.submit({"n": 2})
+    try:
+        writer.close()
+        assert False, "Failed write not reported by close()"
+    except OSError:
+        pass
+    assert written == [], "Nothing should have been written yet"
+
+    # Once the sink recovers, the kept entries go out first, in order
+    writer = BatchedLogWriter(flaky_sink, save_interval=60, batch_size=100, auto_start=False)
+    failures[0] = 1
+    writer.submit({"n": 0})
+    try:
+        writer.flush()
+    except OSError:
+        pass
+    writer.submit({"n": 1})
+    writer.close()
+    assert written == [0, 1] and writer.error is None, f"Kept batch not retried: {written}"
+
+    print("✅ Failed log batch retry tests passed!")
+
+def main():
+    """Run all tests"""
+    print("🧪 Running WorkoutLogger tests...")
+    print("=" * 50)
+
+    tests = [
+        test_merge_on_read,
+        test_legacy_log_migration,
+        test_user_partitions,
+        test_query_api,
+        test_history_pages,
+        test_dashboard_cache,
+        test_concurrent_writers,
+        test_batched_writer_flushes,
+        test_export_formats,
+        test_export_streaming,
+        test_failed_batch_retried
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except Exception as e:
+            print(f"❌ Test {test.__name__} failed with error: {e}")
+
+    print("\n" + "=" * 50)
+    print(f"📊 Test Results: {passed}/{total} tests passed")
+
+    return passed == total
+
+if __name__ == "__main__":
+    main()
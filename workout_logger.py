@@ -1,34 +1,192 @@
-import json
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Union
 import os
+import threading
+import uuid
+from collections import OrderedDict
+
+from config import STORAGE_CONFIG, WORKOUT_CONFIG
+from log_exporter import ExportJob, export_logs
+from log_store import PartitionedLogStore, migrate_single_file_log, partition_key
+from log_writer import BatchedLogWriter
+
+# query() vocabulary: group keys, metric columns and reductions
+QUERY_GROUPS = ("exercise", "day", "week", "month")
+QUERY_METRICS = ("sum", "mean", "max", "count")
+METRIC_COLUMNS = ("reps", "duration_minutes", "form_score", "calories_estimate")
+FRAME_COLUMNS = ("timestamp", "exercise_type") + METRIC_COLUMNS
 
 class WorkoutLogger:
-    def __init__(self, log_file: str = "workout_logs.json"):
-        """Initialize workout logger"""
-        self.log_file = log_file
-        self.logs = self.load_logs()
-        
+    def __init__(self, *, user_id: str = STORAGE_CONFIG["default_user"],
+                 log_dir: str = STORAGE_CONFIG["log_dir"],
+                 auto_save: bool = WORKOUT_CONFIG["auto_save"],
+                 save_interval: float = WORKOUT_CONFIG["save_interval"]):
+        """Initialize workout logger for one user
+
+        Entries are stored per user and month under ``log_dir``, and only
+        the months a query covers are read. New entries are only enqueued on
+        the caller's thread; a background writer persists them in batches.
+        With ``auto_save`` off nothing is written until ``flush()``/
+        ``save_logs()`` or interpreter shutdown. Other sessions and processes
+        may write to the same partitions; their appends are merged in by
+        ``refresh()``.
+
+        Arguments are keyword-only: the first positional argument used to
+        be the path of a single JSON log file.
+        """
+        self.user_id = user_id
+        self.log_dir = log_dir
+        self.auto_save = auto_save
+        self.save_interval = save_interval
+        if user_id == STORAGE_CONFIG["default_user"]:
+            # Logs from before per-user storage belong to the default user
+            migrate_single_file_log(f"{log_dir}.json", log_dir, user_id)
+        self.store = PartitionedLogStore(log_dir, user_id)
+        self._lock = threading.RLock()
+        # Loaded partitions, month -> entries
+        self._partitions = {}
+        # Bumped whenever loaded data changes; keys the query/dashboard caches
+        self.version = 0
+        self._partition_versions = {}
+        # month -> (partition version, columnar DataFrame)
+        self._frames = {}
+        # month -> (partition version, row positions in timestamp order)
+        self._timestamp_index = {}
+        self._query_cache = OrderedDict()
+        # Entries logged here that have not yet been read back from the file
+        self._pending = {}
+        self.writer = self._open_writer()
+    
+    def _open_writer(self) -> BatchedLogWriter:
+        return BatchedLogWriter(
+            self._write_batch, save_interval=self.save_interval, auto_start=self.auto_save
+        )
+    
+    @property
+    def logs(self) -> List[Dict]:
+        """All of this user's workouts, oldest month first"""
+        return self._logs_since(None)
+    
     def load_logs(self) -> List[Dict]:
         """Load existing workout logs from file"""
-        if os.path.exists(self.log_file):
-            try:
-                with open(self.log_file, 'r') as f:
-                    return json.load(f)
-            except (json.JSONDecodeError, FileNotFoundError):
-                return []
-        return []
+        with self._lock:
+            self._drop_partitions()
+            return self.logs
+    
+    def _touch(self, month: str):
+        """Record that a partition's contents changed"""
+        self._partition_versions[month] = self._partition_versions.get(month, 0) + 1
+        self.version += 1
+    
+    def _drop_partitions(self):
+        self._partitions = {}
+        self._frames = {}
+        self._timestamp_index = {}
+        self.version += 1
+    
+    def _months_since(self, cutoff: Optional[datetime]) -> List[str]:
+        months = set(self.store.months())
+        months.update(partition_key(entry["timestamp"]) for entry in self._pending.values())
+        if cutoff is not None:
+            cutoff_month = cutoff.strftime("%Y-%m")
+            months = {month for month in months if month >= cutoff_month}
+        return sorted(months)
+    
+    def _logs_since(self, cutoff: Optional[datetime]) -> List[Dict]:
+        """Entries from the partitions that can contain workouts after ``cutoff``"""
+        with self._lock:
+            logs = []
+            for month in self._months_since(cutoff):
+                logs.extend(self._partition(month))
+            return logs
+    
+    def _partition(self, month: str) -> List[Dict]:
+        """Entries of one month, loading or refreshing the partition as needed"""
+        if month not in self._partitions:
+            entries, _ = self.store.store(month).read_new()
+            self._partitions[month] = self._reload(month, entries)
+            self._touch(month)
+        else:
+            self._refresh_partition(month)
+        return self._partitions[month]
+    
+    def _reload(self, month: str, entries: List[Dict]) -> List[Dict]:
+        """Full partition from file plus our entries still waiting in the writer queue"""
+        for entry in entries:
+            self._pending.pop(entry.get("id"), None)
+        return entries + [
+            entry for entry in self._pending.values()
+            if partition_key(entry["timestamp"]) == month
+        ]
+    
+    def _refresh_partition(self, month: str) -> bool:
+        store = self.store.store(month)
+        if not store.changed():
+            return False
+        entries, reset = store.read_new()
+        if reset:
+            self._partitions[month] = self._reload(month, entries)
+            self._touch(month)
+            return True
+        logs = self._partitions[month]
+        new_entries = False
+        for entry in entries:
+            # Our own entries are already in the partition
+            if self._pending.pop(entry.get("id"), None) is None:
+                logs.append(entry)
+                new_entries = True
+        if new_entries:
+            self._touch(month)
+        return new_entries
     
-    def save_logs(self):
-        """Save workout logs to file"""
-        with open(self.log_file, 'w') as f:
-            json.dump(self.logs, f, indent=2)
+    def refresh(self) -> bool:
+        """Pick up entries other writers appended; returns True if anything changed"""
+        with self._lock:
+            changed = False
+            for month in list(self._partitions):
+                changed |= self._refresh_partition(month)
+            return changed
+    
+    def save_logs(self, fsync: bool = False):
+        """Save workout logs to file
+
+        With ``fsync`` the partition files are also forced to disk, covering
+        entries the writer already wrote under the "none" durability policy.
+        """
+        self.flush()
+        if fsync:
+            self.store.sync()
+    
+    def _write_batch(self, batch: List[Dict], fsync: bool):
+        """Writer-thread sink: append the batch to the user's month partitions"""
+        self.store.append(batch, fsync=fsync)
+    
+    def flush(self, timeout: Optional[float] = None):
+        """Block until all logged entries have been written; raises OSError if some could not be"""
+        self.writer.flush(timeout)
+    
+    def close(self):
+        """Flush pending entries, stop the background writer and drop loaded partitions
+
+        Raises OSError if some entries could not be written; they stay
+        pending and are retried by a later ``flush()`` or ``log_workout()``.
+        Holds the logger lock so a concurrent ``log_workout()`` either lands
+        before the writer drains or opens a new writer afterwards.
+        """
+        with self._lock:
+            try:
+                self.writer.close()
+            finally:
+                self._drop_partitions()
     
     def log_workout(self, exercise_type: str, reps: int, duration: float, 
                    form_score: float, calories_estimate: float = 0):
         """Log a completed workout session"""
         workout_entry = {
+            "id": uuid.uuid4().hex,
+            "user_id": self.user_id,
             "timestamp": datetime.now().isoformat(),
             "date": datetime.now().strftime("%Y-%m-%d"),
             "exercise_type": exercise_type,
@@ -38,17 +196,222 @@ class WorkoutLogger:
             "calories_estimate": calories_estimate
         }
         
-        self.logs.append(workout_entry)
-        self.save_logs()
+        month = partition_key(workout_entry["timestamp"])
+        with self._lock:
+            if self.writer.closed:
+                # Evicted from the handle cache while a session still held it;
+                # entries the old writer failed to write go out with the new one
+                failed = self.writer.failed
+                self.writer = self._open_writer()
+                for entry in failed:
+                    self.writer.submit(entry)
+            self._partition(month)
+            self._pending[workout_entry["id"]] = workout_entry
+            self._partitions[month].append(workout_entry)
+            self._touch(month)
+            self.writer.submit(workout_entry)
         
         return workout_entry
     
+    def _partition_frame(self, month: str) -> pd.DataFrame:
+        """Columnar view of one partition, rebuilt only when that month changes"""
+        version = self._partition_versions.get(month, 0)
+        cached = self._frames.get(month)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        frame = pd.DataFrame.from_records(self._partitions[month], columns=FRAME_COLUMNS)
+        frame["timestamp"] = pd.to_datetime(frame["timestamp"], format="ISO8601")
+        self._frames[month] = (version, frame)
+        return frame
+    
+    def query(self, filters: Optional[Dict] = None, group_by: Optional[List[str]] = None,
+              metrics: Union[List[str], Dict[str, List[str]], None] = None) -> pd.DataFrame:
+        """Filter, group and reduce workouts in one vectorized pass
+        
+        ``filters`` may hold ``days`` (last N days), ``since``/``until``
+        (datetimes) and ``exercise_type`` (name or list of names).
+        ``group_by`` takes any of ``QUERY_GROUPS``. ``metrics`` is either a
+        list of reductions applied to every metric column, or a mapping of
+        column to reductions; columns come out as ``<column>_<reduction>``
+        plus a ``count`` column. Only the month partitions the window covers
+        are read, and results are memoized until the log changes.
+        The returned DataFrame is shared with the cache; do not modify it.
+        """
+        filters = dict(filters or {})
+        group_by = list(group_by or [])
+        if metrics is None:
+            metrics = list(QUERY_METRICS)
+        if not isinstance(metrics, dict):
+            metrics = {column: list(metrics) for column in METRIC_COLUMNS}
+        unknown = [key for key in group_by if key not in QUERY_GROUPS]
+        unknown += [agg for aggs in metrics.values() for agg in aggs if agg not in QUERY_METRICS]
+        if unknown:
+            raise ValueError(f"Unknown group keys or metrics: {unknown}")
+        
+        now = datetime.now()
+        since = filters.get("since")
+        if filters.get("days") is not None:
+            days_cutoff = now - timedelta(days=filters["days"])
+            since = days_cutoff if since is None else max(since, days_cutoff)
+        until = filters.get("until")
+        exercise_types = filters.get("exercise_type")
+        if isinstance(exercise_types, str):
+            exercise_types = [exercise_types]
+        
+        key = (
+            repr(sorted(filters.items())),
+            tuple(group_by),
+            tuple((column, tuple(aggs)) for column, aggs in sorted(metrics.items()))
+        )
+        with self._lock:
+            months = self._months_since(since)
+            if until is not None:
+                months = [month for month in months if month <= until.strftime("%Y-%m")]
+            for month in months:
+                self._partition(month)
+            
+            cached = self._query_cache.get(key)
+            if cached is not None:
+                version, expires, result = cached
+                # Relative windows stay valid until their oldest row slides out
+                if version == self.version and (expires is None or now < expires):
+                    self._query_cache.move_to_end(key)
+                    return result
+            
+            frames = [self._partition_frame(month) for month in months]
+        
+        frame = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(
+            {column: [] for column in FRAME_COLUMNS}
+        )
+        mask = pd.Series(True, index=frame.index)
+        if since is not None:
+            mask &= frame["timestamp"] >= since
+        if until is not None:
+            mask &= frame["timestamp"] <= until
+        if exercise_types is not None and None not in exercise_types:
+            mask &= frame["exercise_type"].isin(exercise_types)
+        frame = frame[mask]
+        
+        expires = None
+        if filters.get("days") is not None and not frame.empty:
+            expires = frame["timestamp"].min().to_pydatetime() + timedelta(days=filters["days"])
+        
+        result = self._reduce(frame, group_by, metrics)
+        with self._lock:
+            self._query_cache[key] = (self.version, expires, result)
+            while len(self._query_cache) > STORAGE_CONFIG["query_cache_size"]:
+                self._query_cache.popitem(last=False)
+        return result
+    
+    @staticmethod
+    def _reduce(frame: pd.DataFrame, group_by: List[str], metrics: Dict[str, List[str]]) -> pd.DataFrame:
+        """Vectorized group-by reduction behind query()"""
+        aggregations = {
+            f"{column}_{agg}": (column, agg)
+            for column, aggs in metrics.items() for agg in aggs if agg != "count"
+        }
+        aggregations["count"] = ("timestamp", "size")
+        if frame.empty:
+            return pd.DataFrame(columns=group_by + list(aggregations))
+        
+        timestamps = frame["timestamp"]
+        group_columns = {
+            "exercise": frame["exercise_type"],
+            "day": timestamps.dt.strftime("%Y-%m-%d"),
+            "week": (timestamps - pd.to_timedelta(timestamps.dt.weekday, unit="D")).dt.strftime("%Y-%m-%d"),
+            "month": timestamps.dt.strftime("%Y-%m"),
+        }
+        keys = [group_columns[name].rename(name) for name in group_by] or [
+            pd.Series(0, index=frame.index, name="_all")
+        ]
+        result = frame.groupby(keys, sort=True).agg(**aggregations).reset_index()
+        if not group_by:
+            result = result.drop(columns="_all")
+        return result
+    
+    def _partition_order(self, month: str) -> np.ndarray:
+        """Row positions of a partition sorted by timestamp (its timestamp index)"""
+        version = self._partition_versions.get(month, 0)
+        cached = self._timestamp_index.get(month)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        timestamps = self._partition_frame(month)["timestamp"].to_numpy()
+        order = np.argsort(timestamps, kind="stable")
+        self._timestamp_index[month] = (version, order)
+        return order
+    
+    def get_history_page(self, page: int = 0, page_size: int = STORAGE_CONFIG["history_page_size"],
+                         exercise_type: str = None, sort_by: str = "timestamp",
+                         descending: bool = True) -> Dict:
+        """One page of the workout history, sorted and filtered server-side
+        
+        Sorting by timestamp walks the month partitions in order through
+        their timestamp index and stops once the page is full, so recent
+        pages never touch older months. Other sort keys are vectorized over
+        this user's partitions. Returns the page's raw entries plus
+        ``has_next`` for pagination.
+        """
+        if sort_by != "timestamp" and sort_by not in METRIC_COLUMNS:
+            raise ValueError(f"Cannot sort history by: {sort_by}")
+        offset = max(0, page) * page_size
+        limit = page_size + 1  # one extra row tells us whether a next page exists
+        
+        with self._lock:
+            months = self._months_since(None)
+            if descending:
+                months.reverse()
+            selected = []
+            
+            if sort_by == "timestamp":
+                skipped = 0
+                for month in months:
+                    entries = self._partition(month)
+                    positions = self._partition_order(month)
+                    if exercise_type is not None:
+                        exercises = self._partition_frame(month)["exercise_type"].to_numpy()
+                        positions = positions[exercises[positions] == exercise_type]
+                    if descending:
+                        positions = positions[::-1]
+                    if skipped + len(positions) <= offset:
+                        skipped += len(positions)
+                        continue
+                    start = max(0, offset - skipped)
+                    take = positions[start:start + limit - len(selected)]
+                    selected.extend(entries[i] for i in take)
+                    skipped += len(positions)
+                    if len(selected) >= limit:
+                        break
+            else:
+                frames = []
+                for month in months:
+                    self._partition(month)
+                    frame = self._partition_frame(month)[["timestamp", "exercise_type", sort_by]]
+                    frames.append(frame.assign(_month=month, _position=np.arange(len(frame))))
+                if frames:
+                    frame = pd.concat(frames, ignore_index=True)
+                    if exercise_type is not None:
+                        frame = frame[frame["exercise_type"] == exercise_type]
+                    frame = frame.sort_values(
+                        [sort_by, "timestamp"], ascending=not descending, kind="stable"
+                    ).iloc[offset:offset + limit]
+                    selected = [
+                        self._partitions[month][position]
+                        for month, position in zip(frame["_month"], frame["_position"])
+                    ]
+        
+        return {
+            "rows": selected[:page_size],
+            "page": page,
+            "page_size": page_size,
+            "has_next": len(selected) > page_size
+        }
+    
     def get_recent_workouts(self, days: int = 7) -> List[Dict]:
         """Get workouts from the last N days"""
         cutoff_date = datetime.now() - timedelta(days=days)
         recent_workouts = []
         
-        for workout in self.logs:
+        for workout in self._logs_since(cutoff_date):
             workout_date = datetime.fromisoformat(workout["timestamp"])
             if workout_date >= cutoff_date:
                 recent_workouts.append(workout)
@@ -57,16 +420,17 @@ class WorkoutLogger:
     
     def get_exercise_stats(self, exercise_type: str = None, days: int = 30) -> Dict:
         """Get statistics for exercises"""
-        cutoff_date = datetime.now() - timedelta(days=days)
-        filtered_workouts = []
-        
-        for workout in self.logs:
-            workout_date = datetime.fromisoformat(workout["timestamp"])
-            if workout_date >= cutoff_date:
-                if exercise_type is None or workout["exercise_type"] == exercise_type:
-                    filtered_workouts.append(workout)
+        result = self.query(
+            {"days": days, "exercise_type": exercise_type},
+            metrics={
+                "reps": ["sum"],
+                "duration_minutes": ["sum"],
+                "form_score": ["mean", "max"],
+                "calories_estimate": ["sum"]
+            }
+        )
         
-        if not filtered_workouts:
+        if result.empty:
             return {
                 "total_workouts": 0,
                 "total_reps": 0,
@@ -76,72 +440,74 @@ class WorkoutLogger:
                 "total_calories": 0
             }
         
-        total_reps = sum(w["reps"] for w in filtered_workouts)
-        total_duration = sum(w["duration_minutes"] for w in filtered_workouts)
-        form_scores = [w["form_score"] for w in filtered_workouts]
-        total_calories = sum(w["calories_estimate"] for w in filtered_workouts)
-        
+        row = {column: result[column].iloc[0].item() for column in result.columns}
         return {
-            "total_workouts": len(filtered_workouts),
-            "total_reps": total_reps,
-            "total_duration": round(total_duration, 2),
-            "avg_form_score": round(sum(form_scores) / len(form_scores), 1),
-            "best_form_score": max(form_scores),
-            "total_calories": round(total_calories, 1)
+            "total_workouts": row["count"],
+            "total_reps": row["reps_sum"],
+            "total_duration": round(row["duration_minutes_sum"], 2),
+            "avg_form_score": round(row["form_score_mean"], 1),
+            "best_form_score": row["form_score_max"],
+            "total_calories": round(row["calories_estimate_sum"], 1)
         }
     
     def get_progress_data(self, exercise_type: str, days: int = 30) -> Dict:
         """Get progress data for plotting"""
-        cutoff_date = datetime.now() - timedelta(days=days)
-        progress_data = {}
+        result = self.query(
+            {"days": days, "exercise_type": exercise_type},
+            group_by=["day"],
+            metrics={"reps": ["sum"], "duration_minutes": ["sum"], "form_score": ["mean"]}
+        )
         
-        for workout in self.logs:
-            workout_date = datetime.fromisoformat(workout["timestamp"])
-            if workout_date >= cutoff_date and workout["exercise_type"] == exercise_type:
-                date_str = workout["date"]
-                if date_str not in progress_data:
-                    progress_data[date_str] = {
-                        "reps": 0,
-                        "duration": 0,
-                        "form_score": 0,
-                        "count": 0
-                    }
-                
-                progress_data[date_str]["reps"] += workout["reps"]
-                progress_data[date_str]["duration"] += workout["duration_minutes"]
-                progress_data[date_str]["form_score"] += workout["form_score"]
-                progress_data[date_str]["count"] += 1
-        
-        # Calculate averages
-        for date_str in progress_data:
-            count = progress_data[date_str]["count"]
-            progress_data[date_str]["form_score"] = round(
-                progress_data[date_str]["form_score"] / count, 1
+        return {
+            date_str: {
+                "reps": reps,
+                "duration": duration,
+                "form_score": round(form_score, 1),
+                "count": count
+            }
+            for date_str, reps, duration, form_score, count in zip(
+                result["day"].tolist(),
+                result["reps_sum"].tolist(),
+                result["duration_minutes_sum"].tolist(),
+                result["form_score_mean"].tolist(),
+                result["count"].tolist()
             )
-        
-        return progress_data
+        }
     
     def export_to_csv(self, filename: str = None):
         """Export workout logs to CSV"""
-        if filename is None:
-            filename = f"workout_logs_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-        
-        df = pd.DataFrame(self.logs)
-        df.to_csv(filename, index=False)
-        return filename
+        return self.export("csv", filename)["filename"]
+    
+    def export(self, fmt: str = "csv", filename: str = None, start_date=None,
+               end_date=None, exercise_type: str = None, background: bool = False):
+        """Stream the log to CSV, JSONL or Parquet in bounded-memory chunks
+
+        With ``background=True`` the export, including the flush of pending
+        entries, runs on its own thread and the started ``ExportJob`` is
+        returned for progress polling.
+        """
+        def log_files() -> List[str]:
+            self.flush()
+            return self.store.paths(start_date, end_date)
+
+        export_kwargs = dict(filename=filename, fmt=fmt, start_date=start_date,
+                             end_date=end_date, exercise_type=exercise_type)
+        if background:
+            return ExportJob(log_files, **export_kwargs).start()
+        return export_logs(log_files(), **export_kwargs)
     
     def get_weekly_summary(self) -> Dict:
         """Get summary of current week's workouts"""
         today = datetime.now()
-        start_of_week = today - timedelta(days=today.weekday())
-        
-        weekly_workouts = []
-        for workout in self.logs:
-            workout_date = datetime.fromisoformat(workout["timestamp"])
-            if workout_date >= start_of_week:
-                weekly_workouts.append(workout)
+        start_of_week = (today - timedelta(days=today.weekday())).replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+        result = self.query(
+            {"since": start_of_week},
+            metrics={"reps": ["sum"], "duration_minutes": ["sum"], "form_score": ["mean"]}
+        )
         
-        if not weekly_workouts:
+        if result.empty:
             return {
                 "workouts_this_week": 0,
                 "total_reps_this_week": 0,
@@ -149,18 +515,50 @@ class WorkoutLogger:
                 "avg_form_score_this_week": 0
             }
         
-        total_reps = sum(w["reps"] for w in weekly_workouts)
-        total_duration = sum(w["duration_minutes"] for w in weekly_workouts)
-        form_scores = [w["form_score"] for w in weekly_workouts]
-        
+        row = {column: result[column].iloc[0].item() for column in result.columns}
         return {
-            "workouts_this_week": len(weekly_workouts),
-            "total_reps_this_week": total_reps,
-            "total_duration_this_week": round(total_duration, 2),
-            "avg_form_score_this_week": round(sum(form_scores) / len(form_scores), 1)
+            "workouts_this_week": row["count"],
+            "total_reps_this_week": row["reps_sum"],
+            "total_duration_this_week": round(row["duration_minutes_sum"], 2),
+            "avg_form_score_this_week": round(row["form_score_mean"], 1)
         }
     
     def clear_logs(self):
         """Clear all workout logs"""
-        self.logs = []
-        self.save_logs() 
\ No newline at end of file
+        self.flush()
+        with self._lock:
+            for month in self.store.months():
+                self.store.store(month).rewrite([])
+            self._pending.clear()
+            self._drop_partitions() 
+
+_logger_cache = OrderedDict()
+_logger_cache_lock = threading.Lock()
+
+def get_workout_logger(user_id: str = STORAGE_CONFIG["default_user"],
+                       log_dir: str = STORAGE_CONFIG["log_dir"]) -> WorkoutLogger:
+    """Shared per-user logger, kept in an LRU cache of open handles
+
+    At most ``STORAGE_CONFIG["handle_cache_size"]`` loggers (each with its
+    loaded partitions and writer thread) stay open; the least recently used
+    one is flushed and closed when a new user arrives.
+    """
+    key = (log_dir, user_id)
+    with _logger_cache_lock:
+        logger = _logger_cache.get(key)
+        if logger is not None:
+            _logger_cache.move_to_end(key)
+            return logger
+        logger = WorkoutLogger(user_id=user_id, log_dir=log_dir)
+        _logger_cache[key] = logger
+        evicted = []
+        while len(_logger_cache) > STORAGE_CONFIG["handle_cache_size"]:
+            evicted.append(_logger_cache.popitem(last=False)[1])
+    for old_logger in evicted:
+        try:
+            old_logger.close()
+        except OSError:
+            # Unwritten entries stay with the old logger and go out with its
+            # next log_workout(); the new user's session must not fail for it
+            pass
+    return logger